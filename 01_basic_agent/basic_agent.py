@@ -9,25 +9,30 @@ This example demonstrates a Level 1 Agno agent that has:
 """
 
 import os
-from dotenv import load_dotenv
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
-from agno.tools.reasoning import ReasoningTools
-from agno.tools.calculator import CalculatorTools
+import sys
+from functools import lru_cache
+from pathlib import Path
 
-# Load environment variables
-load_dotenv()
+# Make the shared helpers at the repository root importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.agent_factory import AgentTemplate
+from shared.models import create_model
+from shared.startup import load_environment
 
-def create_basic_agent():
+@lru_cache(maxsize=None)
+def basic_agent_template():
     """
-    Create a basic Level 1 agent with reasoning and calculation tools.
+    Build the basic agent's tools, instructions and model once; every session
+    created by create_basic_agent() shares them.
     """
+    load_environment(__file__)
+    from agno.tools.reasoning import ReasoningTools
+    from agno.tools.calculator import CalculatorTools
     
-    # Create the agent
-    agent = Agent(
+    return AgentTemplate(
         name="Basic Helper Agent",
         role="A helpful assistant that can reason and calculate",
-        model=OpenAIChat(id="gpt-4o"),  # Using GPT-4o for best reasoning
+        model=create_model("gpt-4o"),  # GPT-4o by default; set AGNO_MODEL_BACKEND=stub to run offline
         tools=[
             ReasoningTools(add_instructions=True),  # Enables step-by-step reasoning
             CalculatorTools(),  # Enables mathematical calculations
@@ -41,8 +46,12 @@ def create_basic_agent():
         markdown=True,  # Enable markdown output
         show_tool_calls=True,  # Show which tools are being used
     )
-    
-    return agent
+
+def create_basic_agent():
+    """
+    Create a basic Level 1 agent with reasoning and calculation tools.
+    """
+    return basic_agent_template().new_session()
 
 def main():
     """
@@ -58,6 +67,8 @@ def main():
     print(f"📋 Role: {agent.role}")
     print(f"🛠️  Tools: {len(agent.tools)} tools available")
     print(f"📝 Instructions: {len(agent.instructions)} instructions set")
+    stats = basic_agent_template().stats()
+    print(f"⚡ Template built in {stats['build_ms']:.1f} ms, session created in {stats['mean_session_ms']:.2f} ms")
     print()
     
     # Example interactions
@@ -7,6 +7,8 @@ Run this to chat with your agent!
 import os
 from dotenv import load_dotenv
 from basic_agent import create_basic_agent
+from shared.models import requires_api_key
+from shared.startup import load_in_background
 
 def interactive_chat():
     """
@@ -18,10 +20,8 @@ def interactive_chat():
     print("Type 'help' to see available commands")
     print()
     
-    # Create the agent
-    agent = create_basic_agent()
-    print(f"✅ Agent '{agent.name}' is ready!")
-    print()
+    # Build the agent in the background so 'help' and 'quit' answer immediately
+    agent_future = load_in_background(create_basic_agent)
     
     while True:
         try:
@@ -43,6 +43,9 @@ def interactive_chat():
                 print()
                 continue
             
+            # The agent is built in the background; wait for it on first use
+            agent = agent_future.result()
+            
             # Check for tools command
             if user_input.lower() == 'tools':
                 print(f"\n🛠️  Available Tools ({len(agent.tools)}):")
@@ -76,12 +79,13 @@ if __name__ == "__main__":
     load_dotenv()
     
     # Check if API key is set
-    if not os.getenv("OPENAI_API_KEY"):
+    if requires_api_key() and not os.getenv("OPENAI_API_KEY"):
         print("❌ Error: OPENAI_API_KEY not found in environment!")
         print("💡 Please create a .env file with your OpenAI API key:")
         print("   OPENAI_API_KEY=your_api_key_here")
         print()
         print("🔗 Get your API key from: https://platform.openai.com/api-keys")
+        print("🧪 Or run offline with the stub model: AGNO_MODEL_BACKEND=stub")
         exit(1)
     
     # Start interactive chat
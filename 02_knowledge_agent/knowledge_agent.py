@@ -10,33 +10,32 @@ This example demonstrates a Level 2 Agno agent that has:
 """
 
 import os
+import sys
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
-from agno.agent import Agent, AgentKnowledge
-from agno.models.openai import OpenAIChat
-from agno.tools.reasoning import ReasoningTools
-from agno.document.base import Document
 
-# Load environment variables
-load_dotenv()
+# Make the shared helpers at the repository root importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.agent_factory import AgentTemplate
+from shared.models import create_model
+from shared.startup import load_environment
 
-def create_knowledge_agent():
+@lru_cache(maxsize=None)
+def knowledge_agent_template():
     """
-    Create a Level 2 agent with knowledge storage capabilities.
+    Build the knowledge agent's tools, instructions and model once; every
+    session created by create_knowledge_agent() shares them.
     """
+    load_environment(__file__)
+    from agno.tools.reasoning import ReasoningTools
     
-    # Initialize knowledge system
-    knowledge = AgentKnowledge()
-    
-    # Create the agent with built-in knowledge capabilities
-    agent = Agent(
+    return AgentTemplate(
         name="Company Knowledge Agent",
         role="Expert assistant with access to company policies and technical documentation",
-        model=OpenAIChat(id="gpt-4o"),
+        model=create_model("gpt-4o"),
         tools=[
             ReasoningTools(add_instructions=True),
         ],
-        knowledge=knowledge,
         instructions=[
             "You have access to company knowledge base including policies and technical guides",
             "Always cite your sources when answering questions",
@@ -51,13 +50,22 @@ def create_knowledge_agent():
         update_knowledge=True,
         add_references=True,
     )
+
+def create_knowledge_agent():
+    """
+    Create a Level 2 agent with knowledge storage capabilities.
+    """
+    template = knowledge_agent_template()
+    from agno.agent import AgentKnowledge
     
-    return agent
+    # Each session gets its own knowledge base
+    return template.new_session(knowledge=AgentKnowledge())
 
 def load_documents_to_knowledge(agent):
     """
     Load sample documents into the agent's knowledge base.
     """
+    from agno.document.base import Document
     print("📚 Loading documents into knowledge base...")
     
     # Get the sample documents directory
@@ -7,6 +7,8 @@ Run this to chat with your knowledge-enabled agent!
 import os
 from dotenv import load_dotenv
 from knowledge_agent import create_knowledge_agent, load_documents_to_knowledge
+from shared.models import requires_api_key
+from shared.startup import load_in_background
 
 def interactive_chat():
     """
@@ -20,14 +22,14 @@ def interactive_chat():
     print("Type 'reload' to reload the knowledge base")
     print()
     
-    # Create the agent
-    agent = create_knowledge_agent()
-    print(f"✅ Agent '{agent.name}' is ready!")
-    print()
+    # Build the agent and load its documents in the background so 'help' and
+    # 'quit' answer immediately
+    def build_agent():
+        agent = create_knowledge_agent()
+        load_documents_to_knowledge(agent)
+        return agent
     
-    # Load documents into knowledge base
-    load_documents_to_knowledge(agent)
-    print()
+    agent_future = load_in_background(build_agent)
     
     while True:
         try:
@@ -51,6 +53,9 @@ def interactive_chat():
                 print()
                 continue
             
+            # The agent is built in the background; wait for it on first use
+            agent = agent_future.result()
+            
             # Check for reload command
             if user_input.lower() == 'reload':
                 print("🔄 Reloading knowledge base...")
@@ -116,12 +121,13 @@ if __name__ == "__main__":
     load_dotenv()
     
     # Check if API key is set
-    if not os.getenv("OPENAI_API_KEY"):
+    if requires_api_key() and not os.getenv("OPENAI_API_KEY"):
         print("❌ Error: OPENAI_API_KEY not found in environment!")
         print("💡 Please create a .env file with your OpenAI API key:")
         print("   OPENAI_API_KEY=your_api_key_here")
         print()
         print("🔗 Get your API key from: https://platform.openai.com/api-keys")
+        print("🧪 Or run offline with the stub model: AGNO_MODEL_BACKEND=stub")
         exit(1)
     
     # Start interactive chat
@@ -0,0 +1,221 @@
+"""
+Token-budgeted conversation context for the memory agent.
+
+By default agno sends every user memory, the session summary and the last
+five responses verbatim with each turn, so prompts keep growing as a
+conversation goes on. ContextBuilder replaces that with one block that never
+exceeds a token ceiling:
+
+1. The most recent turns, verbatim (truncated if a single turn is huge)
+2. User memories ranked by relevance to the current question; with a
+   MemoryIndex only the top matches are read (see memory_index.py)
+3. A rolling summary of older turns, one compressed line per turn, plus
+   agno's session summary when one exists
+
+Each turn it prints how many tokens it used and how many it saved compared
+with agno's default context.
+"""
+
+import math
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.models import estimate_tokens
+from memory_index import MemoryIndex, tokenize
+
+@dataclass
+class ContextStats:
+    """What one turn's context cost, and what agno's default context would have cost."""
+    context_tokens: int
+    full_tokens: int
+    memories_used: int
+    memories_total: int
+    recent_turns: int
+    summarised_turns: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.full_tokens - self.context_tokens)
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to roughly ``max_tokens`` tokens at a word boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max(0, max_tokens * 4 - 3)].rsplit(" ", 1)[0]
+    return cut + "..."
+
+def _first_sentence(text: str, max_chars: int) -> str:
+    text = " ".join(str(text).split())
+    match = re.match(r"(.+?[.!?])(\s|$)", text)
+    sentence = match.group(1) if match else text
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 3].rsplit(" ", 1)[0] + "..."
+
+def rank_memories(question: str, memories: Sequence[str]) -> List[Tuple[float, str]]:
+    """
+    Score memories by the IDF-weighted terms they share with the question.
+
+    Memories are expected newest first; equal scores keep that order.
+    """
+    documents = [set(tokenize(m)) for m in memories]
+    document_frequency: Dict[str, int] = {}
+    for terms in documents:
+        for term in terms:
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+
+    question_terms = set(tokenize(question))
+    count = len(memories)
+    scored = []
+    for index, (memory, terms) in enumerate(zip(memories, documents)):
+        score = sum(math.log(1 + count / document_frequency[t]) for t in question_terms & terms)
+        scored.append((score, -index, memory))
+    scored.sort(reverse=True)
+    return [(score, memory) for score, _, memory in scored]
+
+class ContextBuilder:
+    """Builds a context block for each turn within a hard token ceiling."""
+
+    def __init__(self, max_tokens: int = 1200, recent_turns: int = 2, default_history_runs: int = 5,
+                 log_savings: bool = True, memory_index: Optional[MemoryIndex] = None, max_memories: int = 10):
+        """
+        Args:
+            max_tokens: Hard ceiling for the whole context block.
+            recent_turns: Turns kept verbatim; older turns are summarised.
+            default_history_runs: How many past responses agno would send
+                verbatim, used to report the tokens saved.
+            log_savings: Print the tokens used and saved after every turn.
+            memory_index: Retrieve only the most relevant memories through this
+                index instead of loading every memory of the user.
+            max_memories: How many memories to retrieve from the index.
+        """
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.default_history_runs = default_history_runs
+        self.log_savings = log_savings
+        self.memory_index = memory_index
+        self.max_memories = max_memories
+        self.history: List[ContextStats] = []
+        # Rolling summary lines, computed once per run id
+        self._summary_lines: Dict[str, str] = {}
+
+    def __call__(self, agent: Any, session_id: str, user_id: Optional[str] = None) -> Optional[str]:
+        """Context for the agent's current run, read from its agno Memory."""
+        memory = agent.memory
+        user_id = user_id or "default"
+        question = agent.run_input if isinstance(agent.run_input, str) else ""
+        memory_pool = None
+        if self.memory_index is not None:
+            retrieved = self.memory_index.search(question, user_id=user_id, k=self.max_memories)
+            memories = [m.memory for _, m in retrieved]
+            memory_pool = self.memory_index.count(user_id)
+        else:
+            memories = [m.memory for m in reversed(memory.get_user_memories(user_id=user_id) or [])]
+        turns = [turn for turn in (_turn(run) for run in memory.get_runs(session_id)) if turn]
+        summary = memory.get_session_summary(session_id=session_id, user_id=user_id)
+        return self.build(question, memories, turns, summary.summary if summary else None, memory_pool)
+
+    def build(self, question: str, memories: Sequence[str], turns: Sequence[Tuple[str, str, str]],
+              session_summary: Optional[str] = None,
+              memory_pool: Optional[Tuple[int, int]] = None) -> Optional[str]:
+        """
+        Assemble the context block.
+
+        Args:
+            question: The current user message, used to rank memories.
+            memories: User memories, newest first, or already ranked by a
+                MemoryIndex when ``memory_pool`` is given.
+            turns: Past (run_id, question, answer) turns, oldest first.
+            session_summary: agno's summary of the session, if any.
+            memory_pool: (count, tokens) of all the user's memories when
+                ``memories`` is only the retrieved top matches.
+        """
+        # Tags and headings take a few tokens of their own
+        remaining = self.max_tokens - 24
+        recent = list(turns[-self.recent_turns:]) if self.recent_turns else []
+        older = list(turns[:len(turns) - len(recent)])
+
+        # 1. Recent turns, newest first, each capped so one long answer cannot take the whole budget
+        recent_lines: List[str] = []
+        for _, turn_question, answer in reversed(recent):
+            line = f"User: {turn_question}\nAssistant: {_truncate(answer, self.max_tokens // 4)}"
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                break
+            recent_lines.insert(0, line)
+            remaining -= cost
+
+        # 2. Memories by relevance, keeping room for the summaries
+        reserve = min(remaining, self.max_tokens // 5) if older or session_summary else 0
+        memory_lines: List[str] = []
+        ranked = memories if memory_pool else [memory for _, memory in rank_memories(question, memories)]
+        for memory in ranked:
+            cost = estimate_tokens(memory) + 1
+            if cost > remaining - reserve:
+                continue
+            memory_lines.append(f"- {memory}")
+            remaining -= cost
+
+        # 3. Rolling summary of older turns (newest first) and the session summary
+        summary_lines: List[str] = []
+        for run_id, turn_question, answer in reversed(older):
+            line = self._summary_lines.get(run_id)
+            if line is None:
+                line = f"- {_first_sentence(turn_question, 120)} -> {_first_sentence(answer, 160)}"
+                self._summary_lines[run_id] = line
+            cost = estimate_tokens(line) + 1
+            if cost > remaining:
+                break
+            summary_lines.insert(0, line)
+            remaining -= cost
+        summary_text = _truncate(session_summary, remaining) if session_summary and remaining > 0 else None
+
+        sections = []
+        if summary_text:
+            sections.append(f"<session_summary>\n{summary_text}\n</session_summary>")
+        if summary_lines:
+            sections.append("<earlier_turns>\n" + "\n".join(summary_lines) + "\n</earlier_turns>")
+        if memory_lines:
+            sections.append("<relevant_memories>\n" + "\n".join(memory_lines) + "\n</relevant_memories>")
+        if recent_lines:
+            sections.append("<recent_turns>\n" + "\n\n".join(recent_lines) + "\n</recent_turns>")
+        context = "\n\n".join(sections) if sections else None
+
+        stats = ContextStats(
+            context_tokens=estimate_tokens(context) if context else 0,
+            full_tokens=self._default_context_tokens(memories, turns, session_summary, memory_pool),
+            memories_used=len(memory_lines),
+            memories_total=memory_pool[0] if memory_pool else len(memories),
+            recent_turns=len(recent_lines),
+            summarised_turns=len(summary_lines),
+        )
+        self.history.append(stats)
+        if self.log_savings:
+            print(f"🪙 Context: {stats.context_tokens}/{self.max_tokens} tokens "
+                  f"({stats.memories_used}/{stats.memories_total} memories, {stats.recent_turns} recent turns, "
+                  f"{stats.summarised_turns} summarised) | saved {stats.saved_tokens} tokens "
+                  f"vs full history ({stats.full_tokens})")
+        return context
+
+    def _default_context_tokens(self, memories: Sequence[str], turns: Sequence[Tuple[str, str, str]],
+                                session_summary: Optional[str], memory_pool: Optional[Tuple[int, int]] = None) -> int:
+        """Tokens agno's default context would send: all memories, the summary and recent turns verbatim."""
+        history = turns[-self.default_history_runs:] if self.default_history_runs else []
+        memory_tokens = memory_pool[1] if memory_pool else sum(estimate_tokens(m) + 1 for m in memories)
+        return (memory_tokens
+                + sum(estimate_tokens(q) + estimate_tokens(a) for _, q, a in history)
+                + (estimate_tokens(session_summary) if session_summary else 0))
+
+    @property
+    def total_saved_tokens(self) -> int:
+        return sum(stats.saved_tokens for stats in self.history)
+
+def _turn(run: Any) -> Optional[Tuple[str, str, str]]:
+    """(run_id, question, answer) for a finished agno run, or None."""
+    question = next((m.get_content_string() for m in run.messages or []
+                     if m.role == "user" and not m.from_history), None)
+    if question is None or run.content is None:
+        return None
+    return run.run_id, question, str(run.content)
@@ -10,43 +10,37 @@ This example demonstrates a Level 3 Agno agent that has:
 """
 
 import os
-from dotenv import load_dotenv
-from agno.agent import Agent
-from agno.models.openai import OpenAIChat
-from agno.tools.reasoning import ReasoningTools
-from agno.memory.v2.db.sqlite import SqliteMemoryDb
-from agno.memory.v2.memory import Memory
+import sys
+from functools import lru_cache
+from pathlib import Path
 
-# Load environment variables
-load_dotenv()
+# Make the shared helpers at the repository root importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.agent_factory import AgentTemplate, shared_agent_storage, shared_memory_db
+from shared.models import create_model
+from shared.rate_limit import limit_memory_in_background
+from shared.startup import load_environment
+from context_builder import ContextBuilder
+from memory_index import memory_index_for
 
-def create_memory_agent(session_name=None):
+# Token ceiling for the memories and history added to each prompt
+CONTEXT_BUDGET_TOKENS = 1200
+# Memories retrieved per turn, ranked by relevance to the user's message
+MEMORY_TOP_K = 10
+
+@lru_cache(maxsize=None)
+def memory_agent_template():
     """
-    Create a Level 3 agent with memory and reasoning capabilities.
-    
-    Args:
-        session_name: Optional name for the session. If None, a new session is created.
+    Build the memory agent's tools, instructions and model once; every
+    session created by create_memory_agent() shares them.
     """
+    load_environment(__file__)
+    from agno.tools.reasoning import ReasoningTools
     
-    # Initialize proper Agno memory system
-    memory = Memory(
-        # Use the same model for creating and managing memories
-        model=OpenAIChat(id="gpt-4o"),
-        # Store memories in a SQLite database
-        db=SqliteMemoryDb(
-            table_name=f"user_memories_{session_name or 'default'}", 
-            db_file=f"memory_{session_name or 'default'}.db"
-        ),
-        # We disable deletion by default, enable it if needed
-        delete_memories=True,
-        clear_memories=True,
-    )
-    
-    # Create the agent with memory and reasoning capabilities
-    agent = Agent(
+    return AgentTemplate(
         name="Memory-Enabled Assistant",
         role="A helpful assistant that remembers conversations and provides thoughtful responses",
-        model=OpenAIChat(id="gpt-4o"),
+        model=create_model("gpt-4o"),
         tools=[
             ReasoningTools(add_instructions=True),
         ],
@@ -70,19 +64,77 @@ def create_memory_agent(session_name=None):
         reasoning=False,
         # reasoning_min_steps=2,
         # reasoning_max_steps=8,
-        # Session management
-        session_name=session_name,
-        cache_session=True,
+        # Session management: runs are persisted through the storage passed
+        # to each session (see create_memory_agent and session_manager.py)
         add_history_to_messages=True,
         num_history_responses=5,
         num_history_sessions=3,
+    )
+
+def create_memory_agent(session_name=None, context_budget=CONTEXT_BUDGET_TOKENS, db_file=None):
+    """
+    Create a Level 3 agent with memory and reasoning capabilities.
+    
+    Args:
+        session_name: Optional name for the session. If None, a new session is created;
+            a named session resumes its conversation history from the database.
+        context_budget: Token ceiling for the memories and conversation history
+            added to each prompt (see context_builder.py). None restores agno's
+            default of sending every memory, the session summary and the last
+            5 responses verbatim. With a budget, only the MEMORY_TOP_K memories
+            most relevant to each message are retrieved (see memory_index.py).
+        db_file: Keep every session in this one SQLite file (one table, keyed
+            by user) instead of a memory_<session>.db file per session, e.g.
+            when serving many users through a SessionManager.
+    """
+    template = memory_agent_template()
+    from agno.memory.v2.memory import Memory
+    
+    if db_file is None:
+        db_file = f"memory_{session_name or 'default'}.db"
+        table_name = f"user_memories_{session_name or 'default'}"
+    else:
+        table_name = "user_memories"
+    
+    # Initialize proper Agno memory system
+    memory = Memory(
+        # Use the same model for creating and managing memories
+        model=template.model,
+        # Store memories in a SQLite database, shared by every agent using this session name
+        db=shared_memory_db(table_name=table_name, db_file=db_file),
+        # We disable deletion by default, enable it if needed
+        delete_memories=True,
+        clear_memories=True,
+    )
+    limit_memory_in_background(memory)
+    
+    # Replace agno's verbatim history, memories and summary with a budgeted context
+    budgeted = {}
+    if context_budget is not None:
+        budgeted = dict(
+            session_context=ContextBuilder(
+                max_tokens=context_budget,
+                default_history_runs=template.settings["num_history_responses"],
+                # Embeddings are cached next to the memories in the same database
+                memory_index=memory_index_for(memory.db),
+                max_memories=MEMORY_TOP_K,
+            ),
+            add_history_to_messages=False,
+            add_memory_references=False,
+            add_session_summary_references=False,
+        )
+    
+    return template.new_session(
+        session_name=session_name,
+        # A named session keeps its id, so its runs are reloaded from storage
+        session_id=session_name,
+        storage=shared_agent_storage(table_name="memory_agent_sessions", db_file=db_file),
         # Set the memory system
         memory=memory,
         # User ID for storing memories
         user_id=session_name or "default",
+        **budgeted,
     )
-    
-    return agent
 
 def demonstrate_memory_capabilities():
     """
@@ -0,0 +1,431 @@
+"""
+Relevance-ranked retrieval over the memory agent's user memories.
+
+With ``add_memory_references=True`` agno puts every memory stored for a user
+into the prompt, and reloads (and evals) every row of the memory table to do
+so. For a user with thousands of memories MemoryIndex answers "which memories
+matter for this message?" instead:
+
+- it reads the same SqliteMemoryDb table the agent's Memory writes to, and
+  only parses rows that are new or changed since the previous search
+- each memory is embedded once; vectors are cached in memory and in a
+  ``memory_embeddings`` table in the same database, so restarts reuse them
+- search blends BM25 keyword scores with embedding cosine similarity and
+  returns the top k
+
+    index = memory_index_for(memory.db)
+    for score, user_memory in index.search("Which framework should I use?", user_id="alex", k=8):
+        print(f"{score:.2f} {user_memory.memory}")
+"""
+
+import ast
+import hashlib
+import heapq
+import math
+import operator
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.models import create_embedder, estimate_tokens
+
+if TYPE_CHECKING:
+    from agno.embedder.base import Embedder
+    from agno.memory.v2.db.sqlite import SqliteMemoryDb
+    from agno.memory.v2.schema import UserMemory
+
+# Common words that carry no signal for relevance ranking
+STOPWORDS = frozenset("""
+a an and are as at be but by can could did do does for from had has have how i i'm if in into is it its
+me my of on or our should so that the their them then there these they this to was we were what when
+where which who why will with would you your about just like
+""".split())
+
+EMBEDDINGS_TABLE = "memory_embeddings"
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased search terms in ``text``, without stopwords."""
+    return [t for t in re.findall(r"[a-z0-9']+", text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+@dataclass
+class _Entry:
+    raw: str
+    memory: "UserMemory"
+    content_hash: str
+    terms: Dict[str, int]
+    length: int
+    # float32, normalised to unit length
+    vector: Optional["array[float]"] = None
+
+@dataclass
+class _UserIndex:
+    entries: Dict[str, _Entry] = field(default_factory=dict)
+    # term -> ids of the memories containing it
+    postings: Dict[str, Set[str]] = field(default_factory=dict)
+    total_length: int = 0
+
+    def add(self, memory_id: str, entry: _Entry):
+        self.entries[memory_id] = entry
+        self.total_length += entry.length
+        for term in entry.terms:
+            self.postings.setdefault(term, set()).add(memory_id)
+
+    def remove(self, memory_id: str):
+        entry = self.entries.pop(memory_id)
+        self.total_length -= entry.length
+        for term in entry.terms:
+            ids = self.postings[term]
+            ids.discard(memory_id)
+            if not ids:
+                del self.postings[term]
+
+@dataclass
+class IndexStats:
+    """Counters for one MemoryIndex."""
+    searches: int = 0
+    memories_parsed: int = 0
+    embeddings_computed: int = 0
+    embeddings_from_cache: int = 0
+    last_search_ms: float = 0.0
+
+class MemoryIndex:
+    """Hybrid keyword and embedding search over one agno memory table."""
+
+    def __init__(self, db: "SqliteMemoryDb", embedder: Optional["Embedder"] = None,
+                 keyword_weight: float = 0.4, query_cache_size: int = 64):
+        """
+        Args:
+            db: The SqliteMemoryDb the agent's Memory uses.
+            embedder: Embedding model; None ranks by keywords only.
+            keyword_weight: Share of the score from BM25 keyword matching; the
+                rest comes from embedding similarity.
+            query_cache_size: How many recent query embeddings to keep.
+        """
+        self.db = db
+        self.embedder = embedder
+        self.keyword_weight = keyword_weight if embedder is not None else 1.0
+        self.query_cache_size = query_cache_size
+        self.stats = IndexStats()
+        self._users: Dict[str, _UserIndex] = {}
+        self._query_vectors: "OrderedDict[str, array[float]]" = OrderedDict()
+        self._embeddings_table = None
+        self._lock = threading.RLock()
+
+    @property
+    def embedder_id(self) -> str:
+        if self.embedder is None:
+            return ""
+        return f"{getattr(self.embedder, 'id', type(self.embedder).__name__)}:{self.embedder.dimensions}"
+
+    def search(self, query: str, user_id: str = "default", k: int = 5) -> List[Tuple[float, "UserMemory"]]:
+        """
+        The ``k`` memories most relevant to ``query``, best first.
+
+        Scores are between 0 and 1. Memories with equal scores are ordered
+        newest first, so a query with no useful terms returns the latest ones.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            self.sync(user_id)
+            user = self._users.get(user_id)
+            if not user or not user.entries or k <= 0:
+                return []
+
+            scores = self._keyword_scores(user, tokenize(query))
+            if self.keyword_weight:
+                scores = {memory_id: score * self.keyword_weight for memory_id, score in scores.items()}
+            query_vector = self._query_vector(query) if self.keyword_weight < 1 else None
+            if query_vector:
+                vector_weight = 1 - self.keyword_weight
+                for memory_id, entry in user.entries.items():
+                    if entry.vector:
+                        similarity = sum(map(operator.mul, query_vector, entry.vector))
+                        if similarity > 0:
+                            scores[memory_id] = scores.get(memory_id, 0.0) + vector_weight * similarity
+
+            def sort_key(memory_id: str):
+                updated = user.entries[memory_id].memory.last_updated
+                return scores.get(memory_id, 0.0), updated.timestamp() if updated else 0.0
+
+            best = heapq.nlargest(k, user.entries, key=sort_key)
+            results = [(round(scores.get(memory_id, 0.0), 4), user.entries[memory_id].memory) for memory_id in best]
+            self.stats.searches += 1
+            self.stats.last_search_ms = (time.perf_counter() - started) * 1000
+            return results
+
+    def count(self, user_id: str = "default") -> Tuple[int, int]:
+        """(memories, estimated tokens) indexed for a user, as of the last sync."""
+        with self._lock:
+            user = self._users.get(user_id)
+            if not user:
+                return 0, 0
+            return len(user.entries), sum(estimate_tokens(e.memory.memory) + 1 for e in user.entries.values())
+
+    def footprint(self, user_id: str = "default") -> int:
+        """Approximate bytes held for a user: memory text, terms and vectors."""
+        with self._lock:
+            user = self._users.get(user_id)
+            if not user:
+                return 0
+            return sum(len(e.raw) + 64 * len(e.terms) + (e.vector.itemsize * len(e.vector) if e.vector else 0) + 400
+                       for e in user.entries.values())
+
+    def forget(self, user_id: str = "default") -> bool:
+        """
+        Drop a user's in-process index. Their embeddings stay cached in the
+        database, so the next search rebuilds it without calling the embedder.
+        """
+        with self._lock:
+            return self._users.pop(user_id, None) is not None
+
+    def sync(self, user_id: str = "default") -> int:
+        """
+        Bring a user's index up to date with the memory table.
+
+        Only the id and stored text of each row are read; rows whose text is
+        unchanged are not parsed or embedded again. Returns how many memories
+        were added or changed.
+        """
+        from agno.memory.v2.schema import UserMemory
+        from sqlalchemy import select
+        from sqlalchemy.exc import SQLAlchemyError
+
+        table = self.db.table
+        try:
+            with self.db.Session() as session:
+                rows = session.execute(
+                    select(table.c.id, table.c.memory, table.c.updated_at, table.c.created_at)
+                    .where(table.c.user_id == user_id)
+                ).all()
+        except SQLAlchemyError:
+            # The memory table is created on the first write
+            rows = []
+
+        with self._lock:
+            user = self._users.setdefault(user_id, _UserIndex())
+            seen = set()
+            changed: List[Tuple[str, _Entry]] = []
+            for memory_id, raw, updated_at, created_at in rows:
+                seen.add(memory_id)
+                entry = user.entries.get(memory_id)
+                if entry is not None and entry.raw == raw:
+                    continue
+                try:
+                    data = ast.literal_eval(raw)
+                    data["memory_id"] = memory_id
+                    user_memory = UserMemory.from_dict(data)
+                except (ValueError, SyntaxError, TypeError) as e:
+                    print(f"⚠️ Skipping unreadable memory {memory_id}: {e}")
+                    continue
+                if user_memory.last_updated is None:
+                    user_memory.last_updated = updated_at or created_at
+                terms: Dict[str, int] = {}
+                for term in tokenize(" ".join([user_memory.memory, *(user_memory.topics or [])])):
+                    terms[term] = terms.get(term, 0) + 1
+                content_hash = hashlib.sha256(user_memory.memory.encode("utf-8")).hexdigest()
+                changed.append((memory_id, _Entry(raw, user_memory, content_hash, terms, sum(terms.values()),
+                                                  entry.vector if entry and entry.content_hash == content_hash else None)))
+
+            for memory_id in [m for m in user.entries if m not in seen]:
+                user.remove(memory_id)
+            for memory_id, entry in changed:
+                if memory_id in user.entries:
+                    user.remove(memory_id)
+                user.add(memory_id, entry)
+            self.stats.memories_parsed += len(changed)
+
+            if self.embedder is not None:
+                self._embed([(memory_id, entry) for memory_id, entry in changed if entry.vector is None])
+            return len(changed)
+
+    def _keyword_scores(self, user: _UserIndex, query_terms: Sequence[str]) -> Dict[str, float]:
+        """BM25 scores for the memories sharing a term with the query, scaled to 0-1."""
+        count = len(user.entries)
+        average_length = user.total_length / count if count else 0.0
+        scores: Dict[str, float] = {}
+        for term in set(query_terms):
+            ids = user.postings.get(term)
+            if not ids:
+                continue
+            idf = math.log(1 + (count - len(ids) + 0.5) / (len(ids) + 0.5))
+            for memory_id in ids:
+                entry = user.entries[memory_id]
+                frequency = entry.terms[term]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * entry.length / average_length) if average_length else BM25_K1
+                scores[memory_id] = scores.get(memory_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        top = max(scores.values(), default=0.0)
+        return {memory_id: score / top for memory_id, score in scores.items()} if top else {}
+
+    def _query_vector(self, query: str) -> Optional["array[float]"]:
+        vector = self._query_vectors.get(query)
+        if vector is not None:
+            self._query_vectors.move_to_end(query)
+            return vector
+        vector = self._get_embedding(query)
+        if vector:
+            self._query_vectors[query] = vector
+            if len(self._query_vectors) > self.query_cache_size:
+                self._query_vectors.popitem(last=False)
+        return vector
+
+    def _get_embedding(self, text: str) -> Optional["array[float]"]:
+        try:
+            vector = self.embedder.get_embedding(text)
+        except Exception as e:
+            # Keep answering with keyword search if the embedding service fails
+            print(f"⚠️ Memory embeddings unavailable, using keyword search only: {e}")
+            self.embedder = None
+            self.keyword_weight = 1.0
+            return None
+        norm = math.sqrt(sum(v * v for v in vector)) if vector else 0.0
+        return array("f", (v / norm for v in vector)) if norm else None
+
+    def _embed(self, pending: List[Tuple[str, _Entry]]):
+        """Fill in vectors from the persistent cache, embedding only what is missing."""
+        if not pending:
+            return
+        cached = self._load_vectors([memory_id for memory_id, _ in pending])
+        computed = []
+        for memory_id, entry in pending:
+            hit = cached.get(memory_id)
+            if hit and hit[0] == entry.content_hash:
+                entry.vector = hit[1]
+                self.stats.embeddings_from_cache += 1
+                continue
+            if self.embedder is None:
+                break
+            entry.vector = self._get_embedding(entry.memory.memory)
+            if entry.vector:
+                self.stats.embeddings_computed += 1
+                computed.append((memory_id, entry))
+        self._store_vectors(computed)
+
+    def _table(self):
+        """The embeddings cache table, created on first use."""
+        if self._embeddings_table is None:
+            from sqlalchemy import Column, LargeBinary, MetaData, String, Table
+
+            self._embeddings_table = Table(
+                EMBEDDINGS_TABLE,
+                MetaData(),
+                Column("table_name", String, primary_key=True),
+                Column("memory_id", String, primary_key=True),
+                Column("embedder", String, primary_key=True),
+                Column("content_hash", String),
+                Column("vector", LargeBinary),
+            )
+            self._embeddings_table.create(self.db.db_engine, checkfirst=True)
+        return self._embeddings_table
+
+    def _load_vectors(self, memory_ids: List[str]) -> Dict[str, Tuple[str, "array[float]"]]:
+        from sqlalchemy import select
+
+        table = self._table()
+        vectors: Dict[str, Tuple[str, "array[float]"]] = {}
+        with self.db.db_engine.connect() as connection:
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(memory_ids), 500):
+                rows = connection.execute(
+                    select(table.c.memory_id, table.c.content_hash, table.c.vector).where(
+                        table.c.table_name == self.db.table_name,
+                        table.c.embedder == self.embedder_id,
+                        table.c.memory_id.in_(memory_ids[start:start + 500]),
+                    )
+                )
+                for memory_id, content_hash, blob in rows:
+                    vectors[memory_id] = (content_hash, array("f", blob))
+        return vectors
+
+    def _store_vectors(self, entries: List[Tuple[str, _Entry]]):
+        if not entries:
+            return
+        table = self._table()
+        with self.db.db_engine.begin() as connection:
+            connection.execute(table.insert().prefix_with("OR REPLACE"), [
+                {
+                    "table_name": self.db.table_name,
+                    "memory_id": memory_id,
+                    "embedder": self.embedder_id,
+                    "content_hash": entry.content_hash,
+                    "vector": entry.vector.tobytes(),
+                }
+                for memory_id, entry in entries
+            ])
+
+@lru_cache(maxsize=None)
+def memory_index_for(db: "SqliteMemoryDb") -> MemoryIndex:
+    """One MemoryIndex per memory database, shared by every session using it."""
+    return MemoryIndex(db, embedder=create_embedder())
+
+def _benchmark(count: int, k: int):
+    """Index ``count`` synthetic memories and compare search with loading them all."""
+    import random
+    import tempfile
+    import uuid
+
+    from agno.memory.v2.db.schema import MemoryRow
+    from agno.memory.v2.db.sqlite import SqliteMemoryDb
+    from agno.memory.v2.schema import UserMemory
+
+    subjects = ["Python", "JavaScript", "React", "Django", "Flask", "Postgres", "Docker", "hiking",
+                "coffee", "chess", "Berlin", "a task manager", "Kubernetes", "TypeScript", "cycling"]
+    verbs = ["likes", "is learning", "works with", "dislikes", "wants to try", "is building"]
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as directory:
+        db = SqliteMemoryDb(table_name="bench_memories", db_file=str(Path(directory) / "bench.db"))
+        db.create()
+        for _ in range(count):
+            text = f"The user {rng.choice(verbs)} {rng.choice(subjects)} and {rng.choice(verbs)} {rng.choice(subjects)}"
+            db.upsert_memory(MemoryRow(id=str(uuid.uuid4()), user_id="bench",
+                                       memory=UserMemory(memory=text).to_dict()))
+
+        started = time.perf_counter()
+        everything = db.read_memories(user_id="bench")
+        load_all_ms = (time.perf_counter() - started) * 1000
+
+        index = MemoryIndex(db, embedder=create_embedder())
+        started = time.perf_counter()
+        index.sync("bench")
+        first_sync_ms = (time.perf_counter() - started) * 1000
+        index.search("Which web framework should I use for my task manager?", user_id="bench", k=k)
+        warm_ms = index.stats.last_search_ms
+        restarted = MemoryIndex(db, embedder=create_embedder())
+        started = time.perf_counter()
+        restarted.sync("bench")
+        cached_sync_ms = (time.perf_counter() - started) * 1000
+
+        all_tokens = sum(estimate_tokens(row.memory["memory"]) + 1 for row in everything)
+        top = index.search("Which web framework should I use for my task manager?", user_id="bench", k=k)
+        top_tokens = sum(estimate_tokens(memory.memory) + 1 for _, memory in top)
+
+    print(f"📚 {count} memories, top {k}")
+    print(f"   Load all memories:      {load_all_ms:8.1f} ms, {all_tokens} prompt tokens")
+    print(f"   First index sync:       {first_sync_ms:8.1f} ms ({index.stats.embeddings_computed} embedded)")
+    print(f"   Sync after restart:     {cached_sync_ms:8.1f} ms ({restarted.stats.embeddings_from_cache} from cache)")
+    print(f"   Search (warm):          {warm_ms:8.1f} ms, {top_tokens} prompt tokens")
+    for score, memory in top:
+        print(f"   {score:.2f}  {memory.memory}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark memory retrieval on synthetic memories")
+    parser.add_argument("--memories", type=int, default=2000, help="number of synthetic memories")
+    parser.add_argument("-k", type=int, default=8, help="memories to retrieve")
+    args = parser.parse_args()
+
+    from shared.startup import load_environment
+    load_environment(__file__)
+    _benchmark(args.memories, args.k)
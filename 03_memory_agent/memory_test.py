@@ -10,6 +10,7 @@ Run this after running memory_agent.py to see memory persistence in action.
 import os
 from dotenv import load_dotenv
 from memory_agent import create_memory_agent
+from shared.models import requires_api_key
 
 def test_memory_persistence():
     """
@@ -126,12 +127,13 @@ def main():
     load_dotenv()
     
     # Check if API key is set
-    if not os.getenv("OPENAI_API_KEY"):
+    if requires_api_key() and not os.getenv("OPENAI_API_KEY"):
         print("❌ Error: OPENAI_API_KEY not found in environment!")
         print("💡 Please create a .env file with your OpenAI API key:")
         print("   OPENAI_API_KEY=your_api_key_here")
         print()
         print("🔗 Get your API key from: https://platform.openai.com/api-keys")
+        print("🧪 Or run offline with the stub model: AGNO_MODEL_BACKEND=stub")
         exit(1)
     
     # Run the memory test
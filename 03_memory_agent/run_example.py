@@ -4,9 +4,12 @@ Interactive script to test the memory agent.
 Run this to have a conversation with your memory-enabled agent!
 """
 
+import importlib
 import os
 from dotenv import load_dotenv
 from memory_agent import create_memory_agent
+from shared.models import requires_api_key
+from shared.startup import load_in_background
 
 def interactive_chat():
     """
@@ -21,6 +24,9 @@ def interactive_chat():
     print("Type 'memory' to see memory capabilities")
     print()
     
+    # Import agno in the background while the user types a session name
+    load_in_background(lambda: importlib.import_module("agno.agent"))
+    
     # Get session name from user
     session_name = input("Enter a session name (or press Enter for default): ").strip()
     if not session_name:
@@ -64,7 +70,7 @@ def interactive_chat():
                 print(f"\n📚 Session Information:")
                 print(f"  Session Name: {agent.session_name}")
                 print(f"  Session ID: {agent.session_id}")
-                print(f"  Cache Enabled: {agent.cache_session}")
+                print(f"  Storage: {agent.storage.__class__.__name__} ({agent.storage.table_name})")
                 print(f"  History Responses: {agent.num_history_responses}")
                 print(f"  History Sessions: {agent.num_history_sessions}")
                 print()
@@ -131,12 +137,13 @@ if __name__ == "__main__":
     load_dotenv()
     
     # Check if API key is set
-    if not os.getenv("OPENAI_API_KEY"):
+    if requires_api_key() and not os.getenv("OPENAI_API_KEY"):
         print("❌ Error: OPENAI_API_KEY not found in environment!")
         print("💡 Please create a .env file with your OpenAI API key:")
         print("   OPENAI_API_KEY=your_api_key_here")
         print()
         print("🔗 Get your API key from: https://platform.openai.com/api-keys")
+        print("🧪 Or run offline with the stub model: AGNO_MODEL_BACKEND=stub")
         exit(1)
     
     # Start interactive chat
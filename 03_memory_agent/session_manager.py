@@ -0,0 +1,192 @@
+"""
+Session cache for serving many users from one memory agent process.
+
+``create_memory_agent(session_name)`` builds a new Agent and Memory on every
+call. A server that does that per request rebuilds each user's state and
+reloads their history from the database every time. SessionManager keeps hot
+sessions in memory instead:
+
+- sessions (the agent, its run history and memory snapshot, and the user's
+  memory index) are kept in least-recently-used order
+- when there are more than ``max_sessions`` sessions, or their estimated size
+  passes ``memory_ceiling_mb``, the least recently used idle sessions are
+  written back to storage and dropped
+- agno also saves each run to storage as it finishes, so a crash loses no
+  history; write-back on eviction saves whatever changed outside a run
+- an evicted session is rebuilt on its next request; agno reloads its runs
+  from storage and the memory index reloads cached embeddings, so nothing is
+  recomputed
+
+    manager = SessionManager(max_sessions=1000, memory_ceiling_mb=512)
+    response = manager.run("alice", "What did we decide about the database?")
+    print(manager.stats())
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from memory_agent import create_memory_agent
+from memory_index import memory_index_for
+
+if TYPE_CHECKING:
+    from agno.agent import Agent, RunResponse
+
+# Size of an agent session before any history (agent, memory, tool copies);
+# measured at about 35 KB with tracemalloc, rounded up
+SESSION_OVERHEAD_BYTES = 64 * 1024
+# Per-message overhead on top of its text (Message model, metrics, ids)
+MESSAGE_OVERHEAD_BYTES = 1024
+
+@dataclass
+class _Session:
+    agent: "Agent"
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    size_bytes: int = SESSION_OVERHEAD_BYTES
+
+def estimate_session_bytes(agent: "Agent") -> int:
+    """Approximate memory held by a session: its runs, messages, memories and memory index."""
+    size = SESSION_OVERHEAD_BYTES
+    memory = agent.memory
+    for run in (memory.runs or {}).get(agent.session_id, []):
+        size += len(str(run.content or "")) + MESSAGE_OVERHEAD_BYTES
+        for message in run.messages or []:
+            size += len(str(message.content or "")) + MESSAGE_OVERHEAD_BYTES
+    for user_memory in ((memory.memories or {}).get(agent.user_id) or {}).values():
+        size += len(user_memory.memory) + MESSAGE_OVERHEAD_BYTES
+    size += memory_index_for(memory.db).footprint(agent.user_id or "default")
+    return size
+
+class SessionManager:
+    """LRU cache of memory agent sessions with a count and memory ceiling."""
+
+    def __init__(self, factory: Optional[Callable[[str], "Agent"]] = None, max_sessions: int = 512,
+                 memory_ceiling_mb: float = 256, db_file: str = "memory_sessions.db"):
+        """
+        Args:
+            factory: Builds the agent for a session name. Defaults to
+                create_memory_agent with every session in ``db_file``.
+            max_sessions: Most sessions kept in memory at once.
+            memory_ceiling_mb: Estimated memory the cached sessions may use.
+            db_file: SQLite file shared by all sessions when using the default factory.
+        """
+        self.factory = factory or partial(create_memory_agent, db_file=db_file)
+        self.max_sessions = max_sessions
+        self.memory_ceiling_bytes = int(memory_ceiling_mb * 1024 * 1024)
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rehydrate_ms = 0.0
+
+    def get(self, session_name: str) -> "Agent":
+        """The agent for a session, rebuilt from storage if it is not cached."""
+        return self._session(session_name).agent
+
+    def run(self, session_name: str, message: str, **kwargs: Any) -> "RunResponse":
+        """
+        Run one message in a session. Runs in the same session are serialised;
+        different sessions run concurrently.
+        """
+        session = self._session(session_name)
+        with session.lock:
+            response = session.agent.run(message, **kwargs)
+            size = estimate_session_bytes(session.agent)
+        with self._lock:
+            if self._sessions.get(session_name) is session:
+                self._size_bytes += size - session.size_bytes
+            session.size_bytes = size
+        self._enforce_limits(keep=session_name)
+        return response
+
+    def evict(self, session_name: str) -> bool:
+        """Write a session back to storage and drop it from the cache."""
+        with self._lock:
+            session = self._sessions.pop(session_name, None)
+            if session is None:
+                return False
+            self._size_bytes -= session.size_bytes
+            self.evictions += 1
+        with session.lock:
+            self._write_back(session)
+        return True
+
+    def close(self):
+        """Write every cached session back to storage and empty the cache."""
+        for session_name in list(self._sessions):
+            self.evict(session_name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size, hit rate and evictions."""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "size_mb": round(self._size_bytes / (1024 * 1024), 2),
+                "memory_ceiling_mb": round(self.memory_ceiling_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+                "evictions": self.evictions,
+                "mean_rehydrate_ms": round(self.rehydrate_ms / self.misses, 3) if self.misses else 0.0,
+            }
+
+    def _session(self, session_name: str) -> _Session:
+        with self._lock:
+            session = self._sessions.get(session_name)
+            if session is not None:
+                self._sessions.move_to_end(session_name)
+                self.hits += 1
+                return session
+
+        # Build outside the cache lock; if two requests race, the first one in wins
+        started = time.perf_counter()
+        agent = self.factory(session_name)
+        agent.load_session()
+        built = _Session(agent=agent)
+        built.size_bytes = estimate_session_bytes(agent)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            session = self._sessions.get(session_name)
+            if session is None:
+                session = self._sessions[session_name] = built
+                self._size_bytes += built.size_bytes
+                self.misses += 1
+                self.rehydrate_ms += elapsed_ms
+            else:
+                self._sessions.move_to_end(session_name)
+                self.hits += 1
+        self._enforce_limits(keep=session_name)
+        return session
+
+    def _enforce_limits(self, keep: str):
+        """Evict least recently used idle sessions until the cache is within its limits."""
+        while True:
+            with self._lock:
+                if len(self._sessions) <= self.max_sessions and self._size_bytes <= self.memory_ceiling_bytes:
+                    return
+                victim = None
+                for session_name, session in self._sessions.items():
+                    # Sessions with a run in progress are skipped, not waited for
+                    if session_name != keep and not session.lock.locked():
+                        victim = session_name
+                        break
+                if victim is None:
+                    return
+            self.evict(victim)
+
+    def _write_back(self, session: _Session):
+        agent = session.agent
+        try:
+            agent.write_to_storage(session_id=agent.session_id, user_id=agent.user_id)
+        except Exception as e:
+            print(f"❌ Error writing session '{agent.session_name}' back to storage: {e}")
+        # Embeddings stay cached in the database; only the in-process index is dropped
+        memory_index_for(agent.memory.db).forget(agent.user_id or "default")
@@ -11,32 +11,28 @@ This example demonstrates a Level 4 Agno system with multiple agents working tog
 """
 
 import os
-from dotenv import load_dotenv
-from agno.agent import Agent
-from agno.team import Team
-from agno.models.openai import OpenAIChat
-from agno.tools.reasoning import ReasoningTools
-from agno.tools.calculator import CalculatorTools
-from agno.memory.v2.db.sqlite import SqliteMemoryDb
-from agno.memory.v2.memory import Memory
+import sys
+from functools import lru_cache
+from pathlib import Path
 
-# Load environment variables
-load_dotenv()
+# Make the shared helpers at the repository root importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.agent_factory import AgentTemplate, shared_memory_db
+from shared.models import create_model
+from shared.rate_limit import limit_memory_in_background
+from shared.startup import load_environment
 
-def create_project_manager():
-    """Create a Project Manager agent that coordinates the team."""
+@lru_cache(maxsize=None)
+def project_manager_template():
+    """Build the Project Manager agent's tools, instructions and model once."""
+    load_environment(__file__)
+    from agno.tools.reasoning import ReasoningTools
+    from agno.tools.calculator import CalculatorTools
     
-    memory = Memory(
-        model=OpenAIChat(id="gpt-4o"),
-        db=SqliteMemoryDb(table_name="pm_memories", db_file="memory_pm.db"),
-        delete_memories=True,
-        clear_memories=True,
-    )
-    
-    agent = Agent(
+    return AgentTemplate(
         name="Project Manager",
         role="A project manager who coordinates team efforts, manages timelines, and ensures project success",
-        model=OpenAIChat(id="gpt-4o"),
+        model=create_model("gpt-4o"),
         tools=[
             ReasoningTools(add_instructions=True),
             CalculatorTools(),
@@ -52,29 +48,37 @@ def create_project_manager():
         ],
         markdown=True,
         show_tool_calls=True,
-        memory=memory,
-        user_id="pm",
         enable_agentic_memory=True,
         enable_user_memories=True,
         enable_session_summaries=True,
     )
-    
-    return agent
 
-def create_developer():
-    """Create a Developer agent that handles technical implementation."""
+def create_project_manager():
+    """Create a Project Manager agent that coordinates the team."""
+    template = project_manager_template()
+    from agno.memory.v2.memory import Memory
     
     memory = Memory(
-        model=OpenAIChat(id="gpt-4o"),
-        db=SqliteMemoryDb(table_name="dev_memories", db_file="memory_dev.db"),
+        model=template.model,
+        db=shared_memory_db(table_name="pm_memories", db_file="memory_pm.db"),
         delete_memories=True,
         clear_memories=True,
     )
+    limit_memory_in_background(memory)
+    
+    return template.new_session(memory=memory, user_id="pm")
+
+@lru_cache(maxsize=None)
+def developer_template():
+    """Build the Developer agent's tools, instructions and model once."""
+    load_environment(__file__)
+    from agno.tools.reasoning import ReasoningTools
+    from agno.tools.calculator import CalculatorTools
     
-    agent = Agent(
+    return AgentTemplate(
         name="Developer",
         role="A senior software developer with expertise in multiple programming languages and frameworks",
-        model=OpenAIChat(id="gpt-4o"),
+        model=create_model("gpt-4o"),
         tools=[
             ReasoningTools(add_instructions=True),
             CalculatorTools(),
@@ -90,29 +94,37 @@ def create_developer():
         ],
         markdown=True,
         show_tool_calls=True,
-        memory=memory,
-        user_id="dev",
         enable_agentic_memory=True,
         enable_user_memories=True,
         enable_session_summaries=True,
     )
-    
-    return agent
 
-def create_designer():
-    """Create a Designer agent that focuses on user experience."""
+def create_developer():
+    """Create a Developer agent that handles technical implementation."""
+    template = developer_template()
+    from agno.memory.v2.memory import Memory
     
     memory = Memory(
-        model=OpenAIChat(id="gpt-4o"),
-        db=SqliteMemoryDb(table_name="design_memories", db_file="memory_design.db"),
+        model=template.model,
+        db=shared_memory_db(table_name="dev_memories", db_file="memory_dev.db"),
         delete_memories=True,
         clear_memories=True,
     )
+    limit_memory_in_background(memory)
+    
+    return template.new_session(memory=memory, user_id="dev")
+
+@lru_cache(maxsize=None)
+def designer_template():
+    """Build the Designer agent's tools, instructions and model once."""
+    load_environment(__file__)
+    from agno.tools.reasoning import ReasoningTools
+    from agno.tools.calculator import CalculatorTools
     
-    agent = Agent(
+    return AgentTemplate(
         name="Designer",
         role="A UX/UI designer who creates intuitive and beautiful user interfaces",
-        model=OpenAIChat(id="gpt-4o"),
+        model=create_model("gpt-4o"),
         tools=[
             ReasoningTools(add_instructions=True),
             CalculatorTools(),
@@ -128,29 +140,37 @@ def create_designer():
         ],
         markdown=True,
         show_tool_calls=True,
-        memory=memory,
-        user_id="design",
         enable_agentic_memory=True,
         enable_user_memories=True,
         enable_session_summaries=True,
     )
-    
-    return agent
 
-def create_qa_tester():
-    """Create a QA Tester agent that ensures quality."""
+def create_designer():
+    """Create a Designer agent that focuses on user experience."""
+    template = designer_template()
+    from agno.memory.v2.memory import Memory
     
     memory = Memory(
-        model=OpenAIChat(id="gpt-4o"),
-        db=SqliteMemoryDb(table_name="qa_memories", db_file="memory_qa.db"),
+        model=template.model,
+        db=shared_memory_db(table_name="design_memories", db_file="memory_design.db"),
         delete_memories=True,
         clear_memories=True,
     )
+    limit_memory_in_background(memory)
+    
+    return template.new_session(memory=memory, user_id="design")
+
+@lru_cache(maxsize=None)
+def qa_tester_template():
+    """Build the QA Tester agent's tools, instructions and model once."""
+    load_environment(__file__)
+    from agno.tools.reasoning import ReasoningTools
+    from agno.tools.calculator import CalculatorTools
     
-    agent = Agent(
+    return AgentTemplate(
         name="QA Tester",
         role="A quality assurance specialist who ensures software meets high standards",
-        model=OpenAIChat(id="gpt-4o"),
+        model=create_model("gpt-4o"),
         tools=[
             ReasoningTools(add_instructions=True),
             CalculatorTools(),
@@ -166,17 +186,30 @@ def create_qa_tester():
         ],
         markdown=True,
         show_tool_calls=True,
-        memory=memory,
-        user_id="qa",
         enable_agentic_memory=True,
         enable_user_memories=True,
         enable_session_summaries=True,
     )
+
+def create_qa_tester():
+    """Create a QA Tester agent that ensures quality."""
+    template = qa_tester_template()
+    from agno.memory.v2.memory import Memory
+    
+    memory = Memory(
+        model=template.model,
+        db=shared_memory_db(table_name="qa_memories", db_file="memory_qa.db"),
+        delete_memories=True,
+        clear_memories=True,
+    )
+    limit_memory_in_background(memory)
     
-    return agent
+    return template.new_session(memory=memory, user_id="qa")
 
 def create_team():
     """Create a team of agents that can collaborate on projects."""
+    load_environment(__file__)
+    from agno.team import Team
     
     # Create individual agents
     pm = create_project_manager()
@@ -189,6 +222,7 @@ def create_team():
         name="Software Development Team",
         members=[pm, dev, designer, qa],
         mode="coordinate",
+        model=create_model("gpt-4o"),
         instructions=[
             "Work together to solve complex software development problems",
             "Each agent should contribute their expertise to the solution",
@@ -0,0 +1,488 @@
+"""
+Columnar Record Processing
+==========================
+
+The engine behind the data processing stage. Records are read in chunks and
+each chunk is loaded into columns, Arrow style: one NumPy array of values per
+field plus masks marking missing and malformed entries. Validation rules and
+transformations then run as vectorized kernels over whole columns, and their
+results are merged across chunks, so inputs larger than memory can be
+streamed from a file:
+
+    report = DataEngine(chunk_rows=50_000).process(
+        "orders.jsonl",                              # or a list / iterable of records
+        rules=["data_format", "data_range", "data_completeness"],
+        transformations=["clean", "aggregate", "calculate_metrics"],
+        group_by="region",
+    )
+    print(report["rows"], report["violations"], report["rows_per_sec"])
+
+Validation rules:
+- ``data_format``: a value does not have its column's type (a number column
+  holding "n/a", a text column holding a nested object)
+- ``data_range``: a number is not finite, or falls outside ``ranges[column]``
+- ``data_completeness``: a required field (default: every field) is missing
+
+Transformations:
+- ``clean``: rows failing any rule are left out of the steps below
+- ``aggregate``: row count and per-group sums and means of the number columns,
+  grouped by ``group_by`` (default: the first text column whose values
+  repeat, so IDs are not grouped by)
+- ``calculate_metrics``: count, missing, min, max, mean and standard
+  deviation of every number column
+
+Records are dictionaries; plain values (e.g. a list of IDs) become a single
+``value`` column. Column types are inferred from the first records, or given
+as ``schema``. Columns first seen in a later chunk are added then, and a
+column with no values so far is typed once it has some. A later chunk whose
+values contradict an inferred number column (mostly text) raises
+SchemaConflict rather than silently flagging the whole chunk as malformed.
+"""
+
+import csv
+import itertools
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+DEFAULT_CHUNK_ROWS = 50_000
+# Groups listed in an aggregate report, largest first; the rest are only counted
+MAX_REPORTED_GROUPS = 50
+# A column is numeric when at least this share of its values among the first
+# INFERENCE_ROWS records are numbers
+INFERENCE_ROWS = 1000
+NUMERIC_SHARE = 0.5
+# A text column is only grouped by default when it has at most this many distinct values per row
+MAX_GROUP_SHARE = 0.5
+MISSING_GROUP = "<missing>"
+# Values NumPy converts to float64 without parsing
+PLAIN_NUMBER_TYPES = {int, float, bool, type(None)}
+
+Source = Union[str, Path, Iterable[Any]]
+
+class SchemaConflict(ValueError):
+    """A chunk's values contradict the type a column was inferred as from earlier records."""
+
+@dataclass
+class Column:
+    """One column of a chunk, with Arrow-style validity information."""
+    kind: str               # "number" or "text"
+    values: np.ndarray      # float64 (NaN where missing) or object
+    missing: np.ndarray     # bool: no value
+    malformed: np.ndarray   # bool: a value that does not match the column's kind
+
+    @property
+    def valid(self) -> np.ndarray:
+        return ~(self.missing | self.malformed)
+
+@dataclass
+class Chunk:
+    """A batch of records loaded as columns."""
+    rows: int
+    columns: Dict[str, Column]
+
+def iter_records(source: Source) -> Iterator[Any]:
+    """Records from a list or iterable, or streamed from a .jsonl or .csv file."""
+    if not isinstance(source, (str, Path)):
+        yield from source
+        return
+    path = Path(source)
+    with open(path, newline="" if path.suffix == ".csv" else None) as f:
+        if path.suffix == ".csv":
+            yield from csv.DictReader(f)
+        elif path.suffix in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Cannot stream records from '{path}'; expected a .jsonl or .csv file")
+
+def iter_chunks(source: Source, chunk_rows: int) -> Iterator[List[Any]]:
+    """Split a source into lists of at most ``chunk_rows`` records."""
+    if isinstance(source, (list, tuple)):
+        for start in range(0, len(source), chunk_rows):
+            yield source[start:start + chunk_rows]
+        return
+    records = iter_records(source)
+    while True:
+        chunk = list(itertools.islice(records, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+def load_chunk(records: Sequence[Any], schema: Dict[str, str], untyped: Optional[Set[str]] = None) -> Chunk:
+    """
+    Load records into columns. ``schema`` maps column names to kinds; when it
+    is empty it is filled in from these records.
+
+    To keep inferring while streaming, pass the same ``untyped`` set with
+    every chunk: columns first seen in these records are then added to
+    ``schema`` as well, and columns without any value so far are kept in
+    ``untyped`` (loaded as text) until a chunk gives them a type.
+    """
+    rows = [record if isinstance(record, dict) else {"value": record} for record in records]
+    if untyped is not None:
+        for name in dict.fromkeys(key for row in rows for key in row):
+            if name in schema and name not in untyped:
+                continue
+            kind = _infer_kind([row.get(name) for row in rows[:INFERENCE_ROWS]])
+            schema[name] = kind or "text"
+            if kind is None:
+                untyped.add(name)
+            else:
+                untyped.discard(name)
+    elif not schema:
+        names = dict.fromkeys(key for row in rows for key in row)
+        for name in names:
+            schema[name] = _infer_kind([row.get(name) for row in rows[:INFERENCE_ROWS]]) or "text"
+
+    columns = {}
+    for name, kind in schema.items():
+        values = [row.get(name) for row in rows]
+        columns[name] = _number_column(values) if kind == "number" else _text_column(values)
+    return Chunk(rows=len(rows), columns=columns)
+
+def _infer_kind(values: List[Any]) -> Optional[str]:
+    """The kind of a column holding ``values``, or None when none of them is present."""
+    numbers, present = _number_counts(_number_column(values))
+    if not present:
+        return None
+    return "number" if numbers / present >= NUMERIC_SHARE else "text"
+
+def _number_counts(column: Column) -> Tuple[int, int]:
+    """How many values of a number column are numbers, and how many are present at all."""
+    numbers = int(np.count_nonzero(column.valid))
+    return numbers, numbers + int(np.count_nonzero(column.malformed))
+
+def _check_kinds(chunk: Chunk, pinned: Set[str], first_row: int):
+    """Raise SchemaConflict when an inferred number column holds mostly text in this chunk."""
+    for name, column in chunk.columns.items():
+        if column.kind != "number" or name in pinned:
+            continue
+        numbers, present = _number_counts(column)
+        if present and numbers / present < NUMERIC_SHARE:
+            raise SchemaConflict(
+                f"Column '{name}' was inferred as number from earlier records, but only {numbers} of its "
+                f"{present} values in rows {first_row}-{first_row + chunk.rows - 1} are numbers; pass "
+                f"schema={{'{name}': 'text'}} (or 'number') to read it as one type throughout")
+
+def _parse_number(value: Any) -> Optional[float]:
+    if isinstance(value, (dict, list)):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _number_column(values: List[Any]) -> Column:
+    try:
+        # Fast path: NumPy converts numbers, numeric strings and None (to NaN) in C
+        array = np.array(values, dtype=np.float64)
+        return Column("number", array, np.isnan(array), np.zeros(len(values), dtype=bool))
+    except (TypeError, ValueError):
+        pass
+    # Parse only the values that are not plain numbers one by one, then convert the rest in C
+    cleaned = list(values)
+    malformed = np.zeros(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        if type(value) not in PLAIN_NUMBER_TYPES:
+            number = None if value == "" else _parse_number(value)
+            malformed[i] = number is None and value != ""
+            cleaned[i] = number
+    array = np.array(cleaned, dtype=np.float64)
+    return Column("number", array, np.isnan(array) & ~malformed, malformed)
+
+def _text_column(values: List[Any]) -> Column:
+    array = np.fromiter(values, dtype=object, count=len(values))
+    missing = np.equal(array, None) | np.equal(array, "")
+    if set(map(type, values)) & {dict, list}:
+        malformed = np.fromiter((isinstance(v, (dict, list)) for v in values), dtype=bool, count=len(values))
+    else:
+        malformed = np.zeros(len(values), dtype=bool)
+    return Column("text", array, missing, malformed)
+
+# Validation kernels: each returns a mask of the rows that fail the rule
+def check_format(chunk: Chunk, options: Dict[str, Any]) -> np.ndarray:
+    failing = np.zeros(chunk.rows, dtype=bool)
+    for column in chunk.columns.values():
+        failing |= column.malformed
+    return failing
+
+def check_range(chunk: Chunk, options: Dict[str, Any]) -> np.ndarray:
+    failing = np.zeros(chunk.rows, dtype=bool)
+    ranges = options.get("ranges") or {}
+    for name, column in chunk.columns.items():
+        if column.kind != "number":
+            continue
+        present = ~column.missing & ~column.malformed
+        with np.errstate(invalid="ignore"):
+            out_of_range = ~np.isfinite(column.values)
+            low, high = ranges.get(name, (None, None))
+            if low is not None:
+                out_of_range |= column.values < low
+            if high is not None:
+                out_of_range |= column.values > high
+        failing |= present & out_of_range
+    return failing
+
+def check_completeness(chunk: Chunk, options: Dict[str, Any]) -> np.ndarray:
+    failing = np.zeros(chunk.rows, dtype=bool)
+    required = options.get("required") or list(chunk.columns)
+    for name in required:
+        column = chunk.columns.get(name)
+        failing |= column.missing if column is not None else True
+    return failing
+
+VALIDATION_KERNELS: Dict[str, Callable[[Chunk, Dict[str, Any]], np.ndarray]] = {
+    "data_format": check_format,
+    "data_range": check_range,
+    "data_completeness": check_completeness,
+}
+
+class _Metrics:
+    """Running count, sum, sum of squares, min and max of one number column."""
+
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.total = 0.0
+        self.squares = 0.0
+        self.low = np.inf
+        self.high = -np.inf
+
+    def add(self, column: Column, rows: np.ndarray):
+        values = column.values[rows & column.valid & np.isfinite(column.values)]
+        self.missing += int(np.count_nonzero(rows & column.missing))
+        if values.size:
+            self.count += values.size
+            self.total += float(values.sum())
+            self.squares += float(np.dot(values, values))
+            self.low = min(self.low, float(values.min()))
+            self.high = max(self.high, float(values.max()))
+
+    def report(self) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0, "missing": self.missing}
+        mean = self.total / self.count
+        variance = max(0.0, self.squares / self.count - mean * mean)
+        return {"count": self.count, "missing": self.missing, "min": self.low, "max": self.high,
+                "mean": round(mean, 6), "std": round(variance ** 0.5, 6)}
+
+class _Groups:
+    """Running per-group row counts and sums of the number columns."""
+
+    def __init__(self, key: Optional[str], measures: List[str]):
+        self.key = key
+        self.measures = measures
+        self.counts: Dict[Any, int] = {}
+        self.sums: Dict[Any, np.ndarray] = {}
+        self.present: Dict[Any, np.ndarray] = {}
+
+    def add(self, chunk: Chunk, rows: np.ndarray):
+        if not rows.any():
+            return
+        if self.key is None:
+            keys = np.full(int(np.count_nonzero(rows)), "all", dtype=object)
+        else:
+            column = chunk.columns[self.key]
+            keys = column.values.astype(str) if column.kind == "text" else column.values.astype(object)
+            keys = np.where(column.missing, MISSING_GROUP, keys)[rows]
+        groups, inverse = np.unique(keys.astype(str), return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(groups))
+        sums = np.zeros((len(groups), len(self.measures)))
+        present = np.zeros((len(groups), len(self.measures)))
+        for j, name in enumerate(self.measures):
+            column = chunk.columns[name]
+            valid = (column.valid & np.isfinite(column.values))[rows]
+            values = np.where(valid, column.values[rows], 0.0)
+            sums[:, j] = np.bincount(inverse, weights=values, minlength=len(groups))
+            present[:, j] = np.bincount(inverse, weights=valid, minlength=len(groups))
+        for i, group in enumerate(groups.tolist()):
+            if group in self.counts:
+                self.counts[group] += int(counts[i])
+                self.sums[group] += sums[i]
+                self.present[group] += present[i]
+            else:
+                self.counts[group] = int(counts[i])
+                self.sums[group] = sums[i]
+                self.present[group] = present[i]
+
+    def report(self) -> Dict[str, Any]:
+        largest = sorted(self.counts, key=self.counts.get, reverse=True)[:MAX_REPORTED_GROUPS]
+        top = {}
+        for group in largest:
+            sums, present = self.sums[group], self.present[group]
+            top[group] = {
+                "rows": self.counts[group],
+                "sum": {name: round(float(sums[j]), 6) for j, name in enumerate(self.measures)},
+                "mean": {name: round(float(sums[j] / present[j]), 6)
+                         for j, name in enumerate(self.measures) if present[j]},
+            }
+        return {"group_by": self.key, "groups": len(self.counts), "top_groups": top}
+
+def _default_group_key(chunk: Chunk) -> Optional[str]:
+    """The first text column that repeats values, i.e. looks like a category rather than an ID."""
+    for name, column in chunk.columns.items():
+        if column.kind != "text":
+            continue
+        present = column.values[column.valid]
+        if present.size and len(np.unique(present.astype(str))) <= present.size * MAX_GROUP_SHARE:
+            return name
+    return None
+
+class DataEngine:
+    """Validates and transforms records chunk by chunk with vectorized kernels."""
+
+    def __init__(self, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        """
+        Args:
+            chunk_rows: Records loaded into memory at a time.
+        """
+        self.chunk_rows = chunk_rows
+
+    def process(self, source: Source, rules: Sequence[str] = tuple(VALIDATION_KERNELS),
+                transformations: Sequence[str] = (), ranges: Optional[Dict[str, Tuple[float, float]]] = None,
+                required: Optional[Sequence[str]] = None, group_by: Optional[str] = None,
+                schema: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Run validation rules and transformations over every record of ``source``.
+
+        Args:
+            source: Records (a list or iterable), or a .jsonl / .csv file path.
+            rules: Validation rules to apply (see VALIDATION_KERNELS).
+            transformations: Steps to run, in any order: clean, aggregate, calculate_metrics.
+            ranges: Allowed (low, high) per number column for data_range; None for no bound.
+            required: Fields data_completeness requires; defaults to every field.
+            group_by: Column to aggregate by; defaults to the first text column
+                with repeating values.
+            schema: Kinds ("number" or "text") of columns not to infer.
+
+        Raises:
+            SchemaConflict: A chunk holds mostly text in a column inferred as
+                number from earlier records.
+        """
+        started = time.perf_counter()
+        options = {"ranges": ranges, "required": required}
+        kernels = {rule: VALIDATION_KERNELS[rule] for rule in rules if rule in VALIDATION_KERNELS}
+        handled = {"clean", "validate", "aggregate", "calculate_metrics"}
+        skipped = [name for name in list(rules) + list(transformations)
+                   if name not in VALIDATION_KERNELS and name not in handled]
+        clean = "clean" in transformations
+
+        schema = dict(schema or {})
+        pinned, untyped = set(schema), set()
+        violations = {rule: 0 for rule in kernels}
+        total_rows = valid_rows = chunks = 0
+        metrics: Dict[str, _Metrics] = {}
+        groups: Optional[_Groups] = None
+
+        for records in iter_chunks(source, self.chunk_rows):
+            chunk = load_chunk(records, schema, untyped)
+            _check_kinds(chunk, pinned, total_rows)
+            chunks += 1
+            invalid = np.zeros(chunk.rows, dtype=bool)
+            for rule, kernel in kernels.items():
+                failing = kernel(chunk, options)
+                violations[rule] += int(np.count_nonzero(failing))
+                invalid |= failing
+            total_rows += chunk.rows
+            valid_rows += chunk.rows - int(np.count_nonzero(invalid))
+            rows = ~invalid if clean else np.ones(chunk.rows, dtype=bool)
+
+            numbers = [name for name, kind in schema.items() if kind == "number"]
+            if "calculate_metrics" in transformations:
+                for name in numbers:
+                    metrics.setdefault(name, _Metrics()).add(chunk.columns[name], rows)
+            if "aggregate" in transformations:
+                if groups is None:
+                    key = group_by if group_by in schema else _default_group_key(chunk)
+                    groups = _Groups(key, [name for name in numbers if name != key])
+                groups.add(chunk, rows)
+
+        elapsed = time.perf_counter() - started
+        report: Dict[str, Any] = {
+            "rows": total_rows,
+            "valid_rows": valid_rows,
+            "quality": round(valid_rows / total_rows, 4) if total_rows else None,
+            "columns": dict(schema),
+            "violations": violations,
+            "chunks": chunks,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "rows_per_sec": round(total_rows / elapsed) if elapsed > 0 else None,
+        }
+        if clean:
+            report["rows_dropped"] = total_rows - valid_rows
+        if "calculate_metrics" in transformations:
+            report["metrics"] = {name: m.report() for name, m in metrics.items()}
+        if "aggregate" in transformations:
+            report["aggregates"] = groups.report() if groups else {"group_by": group_by, "groups": 0,
+                                                                   "top_groups": {}}
+        if skipped:
+            report["skipped"] = skipped
+        return report
+
+def process_workflow_input(workflow_input: Dict[str, Any], rules: Sequence[str],
+                           chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dict[str, Any]:
+    """
+    Process a workflow input's ``data`` the way the data processing stage does,
+    taking ``transformations``, ``ranges``, ``required_fields``, ``group_by``
+    and ``schema`` from the input.
+    """
+    return DataEngine(chunk_rows).process(
+        workflow_input.get("data", []),
+        rules=rules,
+        transformations=workflow_input.get("transformations", []),
+        ranges=workflow_input.get("ranges"),
+        required=workflow_input.get("required_fields"),
+        group_by=workflow_input.get("group_by"),
+        schema=workflow_input.get("schema"),
+    )
+
+def _benchmark(rows: int, chunk_rows: int):
+    """Process ``rows`` synthetic order records, in memory and streamed from a file."""
+    import random
+    import tempfile
+
+    rng = random.Random(7)
+    regions = ["north", "south", "east", "west"]
+    records = [
+        {
+            "order_id": f"ORD-{i}",
+            "region": rng.choice(regions),
+            "quantity": rng.randint(1, 20) if rng.random() > 0.01 else None,
+            "price": round(rng.uniform(1, 500), 2) if rng.random() > 0.005 else "n/a",
+        }
+        for i in range(rows)
+    ]
+    engine = DataEngine(chunk_rows=chunk_rows)
+    options = {"transformations": ["clean", "aggregate", "calculate_metrics"],
+               "ranges": {"quantity": (1, 10_000), "price": (0, None)}}
+
+    in_memory = engine.process(records, **options)
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "orders.jsonl"
+        with open(path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        streamed = engine.process(path, **options)
+
+    print(f"⚙️  {rows} records, {chunk_rows} per chunk")
+    for label, report in (("In memory", in_memory), ("Streamed (.jsonl)", streamed)):
+        print(f"   {label:<18} {report['elapsed_ms']:9.1f} ms  {report['rows_per_sec']:>10} rows/s  "
+              f"{report['chunks']} chunks")
+    print(f"   Valid rows: {in_memory['valid_rows']} of {in_memory['rows']}  violations: {in_memory['violations']}")
+    for region, group in in_memory["aggregates"]["top_groups"].items():
+        print(f"   {region:<6} {group['rows']:>8} rows  mean price {group['mean'].get('price', 0):.2f}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the columnar record processing engine")
+    parser.add_argument("--rows", type=int, default=200_000, help="number of synthetic records")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="records per chunk")
+    args = parser.parse_args()
+    _benchmark(args.rows, args.chunk_rows)
@@ -0,0 +1,45 @@
+"""
+Tests for the columnar record engine's schema handling across chunks.
+
+    python -m pytest data_engine_test.py -q
+"""
+
+import pytest
+
+from data_engine import DataEngine, SchemaConflict
+
+def _process(records, chunk_rows=2, **options):
+    return DataEngine(chunk_rows=chunk_rows).process(
+        records, transformations=["calculate_metrics"], **options)
+
+def test_chunking_does_not_change_the_report():
+    records = [{"region": "north" if i % 2 else "south", "amount": i} for i in range(10)]
+    chunked, whole = _process(records), _process(records, chunk_rows=100)
+    assert chunked["chunks"] == 5
+    for key in ("columns", "violations", "valid_rows", "metrics"):
+        assert chunked[key] == whole[key]
+
+def test_column_first_seen_in_a_later_chunk_is_added():
+    records = [{"amount": 1}, {"amount": 2}, {"amount": 3, "discount": 0.5}, {"amount": 4, "discount": "n/a"}]
+    report = _process(records, rules=["data_format"])
+    assert report["columns"] == {"amount": "number", "discount": "number"}
+    assert report["metrics"]["discount"]["count"] == 1
+    assert report["violations"]["data_format"] == 1
+
+def test_column_without_values_is_typed_once_it_has_some():
+    records = [{"amount": 1, "fee": None}, {"amount": 2}, {"amount": 3, "fee": 2.5}, {"amount": 4, "fee": 1.5}]
+    report = _process(records)
+    assert report["columns"]["fee"] == "number"
+    assert report["metrics"]["fee"]["mean"] == 2.0
+
+def test_number_column_holding_text_later_raises():
+    records = [{"code": 1}, {"code": 2}, {"code": "A-1"}, {"code": "B-2"}]
+    with pytest.raises(SchemaConflict, match=r"'code'.*rows 2-3"):
+        _process(records)
+
+def test_schema_pins_a_column_kind():
+    records = [{"code": 1}, {"code": 2}, {"code": "A-1"}, {"code": "B-2"}]
+    assert _process(records, schema={"code": "text"})["columns"] == {"code": "text"}
+    # Pinned as number, the text values are format violations instead of an error
+    report = _process(records, rules=["data_format"], schema={"code": "number"})
+    assert report["violations"]["data_format"] == 2
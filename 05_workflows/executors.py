@@ -0,0 +1,191 @@
+"""
+Stage Executors
+===============
+
+The CPU-heavy part of a workflow holds the GIL, so workflows running side by
+side on threads take turns instead of using more cores. That part is:
+
+- summarizing the input for prompts
+- validating and aggregating ``data``
+- evaluating the business rules over ``line_items``
+
+A stage executor decides where this work runs:
+
+- ``StageExecutor`` (the default) runs it on the workflow's own thread
+- ``ProcessExecutor`` runs it in a pool of worker processes, one per core by
+  default
+
+The process backend puts the workflow input in shared memory once per run
+(``share``). It is serialized once, with pickle protocol 5, rather than with
+every task. A task only sends the name of the block to a worker. The worker
+maps the block and decodes it once, so later tasks for the same input skip
+even that. Results, which are small reports, come back the usual way.
+
+    executor = ProcessExecutor(workers=4)
+    workflow = ComplexWorkflow("wf-1", manager, executor=executor)
+
+AGNO_STAGE_EXECUTOR=process (with AGNO_STAGE_WORKERS, default: one per core)
+selects the process backend for every workflow that is not given one.
+"""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+# Decoded payloads a worker process keeps, most recently used last
+WORKER_PAYLOAD_CACHE = 4
+
+@dataclass(frozen=True)
+class SharedPayload:
+    """A handle to a value placed in shared memory; cheap to send to a worker."""
+    name: str
+    size: int
+
+    def load(self) -> Any:
+        """The value, decoded from shared memory (once per worker process)."""
+        value = _worker_payloads.get(self.name)
+        if value is not None:
+            _worker_payloads.move_to_end(self.name)
+            return value
+        from multiprocessing import shared_memory
+
+        block = shared_memory.SharedMemory(name=self.name)
+        try:
+            value = pickle.loads(block.buf[:self.size])
+        finally:
+            block.close()
+        _worker_payloads[self.name] = value
+        while len(_worker_payloads) > WORKER_PAYLOAD_CACHE:
+            _worker_payloads.popitem(last=False)
+        return value
+
+_worker_payloads: "OrderedDict[str, Any]" = OrderedDict()
+
+class StageExecutor:
+    """Runs stage work inline, on the calling thread."""
+    name = "inline"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks = 0
+        self._task_ms = 0.0
+        self._shared_bytes = 0
+
+    def share(self, payload: Any) -> Any:
+        """Prepare ``payload`` to be passed to ``run`` by several tasks; inline, that is the payload itself."""
+        return payload
+
+    def release(self, handle: Any):
+        """Free what ``share`` allocated for ``handle``."""
+
+    def run(self, task: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call ``task(*args, **kwargs)`` and return its result."""
+        started = time.perf_counter()
+        try:
+            return self._call(task, args, kwargs)
+        finally:
+            with self._lock:
+                self._tasks += 1
+                self._task_ms += (time.perf_counter() - started) * 1000
+
+    def shutdown(self):
+        """Stop any workers."""
+
+    def stats(self) -> Dict[str, Any]:
+        """Tasks run, the time the callers waited for them, and bytes placed in shared memory."""
+        with self._lock:
+            return {
+                "executor": self.name,
+                "tasks": self._tasks,
+                "task_ms": round(self._task_ms, 2),
+                "shared_bytes": self._shared_bytes,
+            }
+
+    def _call(self, task: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+        return task(*args, **kwargs)
+
+class ProcessExecutor(StageExecutor):
+    """Runs stage work in worker processes, passing shared payloads through shared memory."""
+    name = "process"
+
+    def __init__(self, workers: Optional[int] = None, start_method: str = "spawn"):
+        """
+        Args:
+            workers: Worker processes; defaults to one per core.
+            start_method: multiprocessing start method. "spawn" is the safe
+                choice in a process that already runs threads.
+        """
+        super().__init__()
+        self.workers = workers or os.cpu_count() or 1
+        self.start_method = start_method
+        self._pool = None
+        self._blocks: Dict[str, Any] = {}
+
+    def share(self, payload: Any) -> SharedPayload:
+        from multiprocessing import shared_memory
+
+        data = pickle.dumps(payload, protocol=5)
+        block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        block.buf[:len(data)] = data
+        with self._lock:
+            self._blocks[block.name] = block
+            self._shared_bytes += len(data)
+        return SharedPayload(block.name, len(data))
+
+    def release(self, handle: Any):
+        if not isinstance(handle, SharedPayload):
+            return
+        with self._lock:
+            block = self._blocks.pop(handle.name, None)
+        if block is not None:
+            block.close()
+            block.unlink()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            blocks, self._blocks = list(self._blocks.values()), {}
+        if pool is not None:
+            pool.shutdown()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    def _call(self, task: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+        return self._get_pool().submit(_run_task, task, args, kwargs).result()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context(self.start_method))
+            return self._pool
+
+def _run_task(task: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> Any:
+    """Worker side: resolve shared payloads, then run the task."""
+    args = tuple(arg.load() if isinstance(arg, SharedPayload) else arg for arg in args)
+    kwargs = {key: value.load() if isinstance(value, SharedPayload) else value for key, value in kwargs.items()}
+    return task(*args, **kwargs)
+
+def executor_from_env() -> StageExecutor:
+    """The backend named by AGNO_STAGE_EXECUTOR ("inline", the default, or "process")."""
+    backend = os.getenv("AGNO_STAGE_EXECUTOR", "inline")
+    if backend == "process":
+        workers = os.getenv("AGNO_STAGE_WORKERS")
+        return ProcessExecutor(workers=int(workers) if workers else None)
+    if backend != "inline":
+        raise ValueError(f"Unknown AGNO_STAGE_EXECUTOR '{backend}', expected 'inline' or 'process'")
+    return StageExecutor()
+
+@lru_cache(maxsize=None)
+def shared_executor() -> StageExecutor:
+    """The process-wide executor configured by AGNO_STAGE_EXECUTOR, shared by all workflows."""
+    return executor_from_env()
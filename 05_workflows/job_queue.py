@@ -0,0 +1,550 @@
+"""
+Durable Job Queue
+=================
+
+Workflows submitted to a JobQueue outlive the process that submitted them.
+Every workflow stage is a job in the ``workflow_jobs`` table of the workflow
+SQLite database. Worker processes lease one job at a time; they may run on
+this machine or on any node that opens the same database file (the table is a
+local stand-in for a shared queue service).
+
+- A lease lasts ``visibility_timeout_s``, and the worker's heartbeat extends
+  it while the stage runs.
+- A crashed worker stops heartbeating. Once its lease expires, the next worker
+  asking for work reclaims the job and runs the stage again. Completed stages
+  are kept in the workflow state, so only the interrupted stage is repeated.
+- Finishing a stage and queuing the next one commit together. Both check the
+  lease token, so a worker whose lease was reclaimed cannot finish the stage
+  a second time.
+- A failed stage is retried with backoff up to ``max_attempts`` times. After
+  that, the job is marked failed.
+
+    queue = JobQueue("workflow_states.db")
+    queue.submit("inventory_001", {"type": "standard", "process": "inventory_check"})
+
+    python job_queue.py worker --threads 2     # start as many as needed
+    python job_queue.py stats
+
+Throughput grows with the number of worker processes. Which due job is
+leased next is up to the queue's SchedulingPolicy (``scheduler.py``):
+priority classes, weighted fair queueing between workflow types and
+departments, and per-tenant concurrency caps.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from scheduler import PRIORITY_CLASSES, Backlog, SchedulingPolicy
+
+DEFAULT_VISIBILITY_TIMEOUT_S = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+# Retries of a failed stage wait 2, 4, 8, ... seconds, at most this long
+MAX_RETRY_BACKOFF_S = 60.0
+JOB_STATUSES = ("queued", "leased", "done", "failed")
+# Recent window of leases and completions that per-class stats cover
+DEFAULT_STATS_WINDOW_S = 300.0
+# Columns added to workflow_jobs after its first release
+SCHEDULING_COLUMNS = {
+    "priority_class": "TEXT NOT NULL DEFAULT 'standard'",
+    "flow": "TEXT NOT NULL DEFAULT 'standard'",
+    "tenant": "TEXT NOT NULL DEFAULT 'default'",
+    "weight": "REAL NOT NULL DEFAULT 1.0",
+    "queue_wait_s": "REAL",
+}
+# Due to run: queued and past its backoff, or leased by a worker that stopped heartbeating
+DUE_CONDITION = "((status = 'queued' AND available_at <= :now) OR (status = 'leased' AND lease_expires_at <= :now))"
+
+@dataclass
+class Job:
+    """A leased workflow stage."""
+    job_id: int
+    workflow_id: str
+    stage: str
+    # The workflow input; only set on a workflow's first job, later stages read it from the state
+    payload: Optional[Dict[str, Any]]
+    priority: int
+    priority_class: str
+    tenant: str
+    attempts: int
+    max_attempts: int
+    lease_token: str
+    lease_expires_at: float
+    reclaimed: bool = False
+
+class JobQueue:
+    """Workflow stage jobs in SQLite, leased to workers with a visibility timeout."""
+
+    def __init__(self, db_file: str = "workflow_states.db",
+                 visibility_timeout_s: float = DEFAULT_VISIBILITY_TIMEOUT_S,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, policy: Optional[SchedulingPolicy] = None):
+        """
+        Args:
+            db_file: Path to the SQLite database file (normally the workflow state database)
+            visibility_timeout_s: How long a lease lasts without a heartbeat
+            max_attempts: Leases of a job before it is marked failed
+            policy: Decides which due job is leased next (default: SchedulingPolicy())
+        """
+        self.db_file = db_file
+        self.visibility_timeout_s = visibility_timeout_s
+        self.max_attempts = max_attempts
+        self.policy = policy or SchedulingPolicy()
+        self.init_database()
+
+    def init_database(self):
+        """Create the jobs and flows tables."""
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS workflow_jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                workflow_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                payload TEXT,
+                priority INTEGER NOT NULL DEFAULT 0,
+                priority_class TEXT NOT NULL DEFAULT 'standard',
+                flow TEXT NOT NULL DEFAULT 'standard',
+                tenant TEXT NOT NULL DEFAULT 'default',
+                weight REAL NOT NULL DEFAULT 1.0,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                reclaims INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_token TEXT,
+                leased_at REAL,
+                lease_expires_at REAL,
+                queue_wait_s REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                last_error TEXT
+            )
+        ''')
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(workflow_jobs)')}
+        for column, definition in SCHEDULING_COLUMNS.items():
+            if column not in columns:
+                conn.execute(f'ALTER TABLE workflow_jobs ADD COLUMN {column} {definition}')
+        
+        # Weighted fair queueing state: a flow's virtual finish time and the start time of its latest lease
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS workflow_job_flows (
+                flow TEXT PRIMARY KEY,
+                virtual_time REAL NOT NULL,
+                last_start REAL NOT NULL,
+                leases INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_ready ON workflow_jobs (status, available_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_lease ON workflow_jobs (status, lease_expires_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_workflow ON workflow_jobs (workflow_id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_class ON workflow_jobs (priority_class, leased_at)')
+        conn.close()
+
+    def submit(self, workflow_id: str, workflow_input: Dict[str, Any], priority_class: Optional[str] = None,
+               stage: Optional[str] = None) -> int:
+        """
+        Queue a workflow, starting at ``stage`` (default: its first stage).
+        Its class, flow and tenant come from the input (see SchedulingPolicy.place);
+        ``priority_class`` overrides the class. Returns the job ID.
+        """
+        if stage is None:
+            from workflows import WORKFLOW_STAGES
+            stage = WORKFLOW_STAGES[0]
+        placement = self.policy.place(workflow_input, priority_class)
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            job_id = conn.execute('''
+                INSERT INTO workflow_jobs
+                (workflow_id, stage, payload, priority, priority_class, flow, tenant, weight, status, max_attempts,
+                 available_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?, ?)
+            ''', (workflow_id, stage, json.dumps(workflow_input), placement.priority, placement.priority_class,
+                  placement.flow, placement.tenant, placement.weight, self.max_attempts, now, now, now)).lastrowid
+        conn.close()
+        return job_id
+
+    def lease(self, worker_id: str) -> Optional[Job]:
+        """
+        Lease the next job the policy picks among the due ones: queued jobs
+        past their backoff, and jobs whose lease has expired. Jobs that have
+        used up their attempts are marked failed on the way.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                while True:
+                    now = time.time()
+                    choice = self._choose(conn, now)
+                    if choice is None:
+                        return None
+                    backlog, start = choice
+                    row = conn.execute(f'''
+                        SELECT job_id, workflow_id, stage, payload, priority, priority_class, tenant, status,
+                               attempts, max_attempts, available_at, lease_expires_at
+                        FROM workflow_jobs
+                        WHERE {DUE_CONDITION} AND priority = :priority AND flow = :flow AND tenant = :tenant
+                        ORDER BY available_at, job_id
+                        LIMIT 1
+                    ''', {"now": now, "priority": backlog.priority, "flow": backlog.flow,
+                          "tenant": backlog.tenant}).fetchone()
+                    (job_id, workflow_id, stage, payload, priority, priority_class, tenant, status,
+                     attempts, max_attempts, available_at, lease_expires_at) = row
+                    reclaimed = status == "leased"
+                    if attempts >= max_attempts:
+                        conn.execute('''
+                            UPDATE workflow_jobs SET status = 'failed', lease_token = NULL, updated_at = ?,
+                                last_error = COALESCE(last_error, 'lease expired')
+                            WHERE job_id = ?
+                        ''', (now, job_id))
+                        continue
+
+                    token = uuid.uuid4().hex
+                    expires_at = now + self.visibility_timeout_s
+                    # A reclaimed job has been waiting since its previous lease expired
+                    waited = now - (lease_expires_at if reclaimed else available_at)
+                    conn.execute('''
+                        UPDATE workflow_jobs
+                        SET status = 'leased', lease_owner = ?, lease_token = ?, leased_at = ?, lease_expires_at = ?,
+                            queue_wait_s = ?, attempts = attempts + 1, reclaims = reclaims + ?, updated_at = ?
+                        WHERE job_id = ?
+                    ''', (worker_id, token, now, expires_at, waited, int(reclaimed), now, job_id))
+                    conn.execute('''
+                        INSERT INTO workflow_job_flows (flow, virtual_time, last_start, leases) VALUES (?, ?, ?, 1)
+                        ON CONFLICT (flow) DO UPDATE SET virtual_time = excluded.virtual_time,
+                            last_start = excluded.last_start, leases = leases + 1
+                    ''', (backlog.flow, start + 1.0 / max(backlog.weight, 1e-9), start))
+                    return Job(job_id, workflow_id, stage, json.loads(payload) if payload else None, priority,
+                               priority_class, tenant, attempts + 1, max_attempts, token, expires_at, reclaimed)
+        finally:
+            conn.close()
+
+    def _choose(self, conn: sqlite3.Connection, now: float):
+        """Group the due jobs and let the policy pick one group (inside the lease transaction)."""
+        backlogs = [Backlog(*row) for row in conn.execute(f'''
+            SELECT priority, flow, tenant, MAX(weight),
+                   MIN(CASE WHEN status = 'leased' THEN lease_expires_at ELSE available_at END)
+            FROM workflow_jobs WHERE {DUE_CONDITION}
+            GROUP BY priority, flow, tenant
+        ''', {"now": now})]
+        if not backlogs:
+            return None
+        running = dict(conn.execute('''
+            SELECT tenant, COUNT(*) FROM workflow_jobs
+            WHERE status = 'leased' AND lease_expires_at > ? GROUP BY tenant
+        ''', (now,)).fetchall())
+        flows = conn.execute('SELECT flow, virtual_time, last_start FROM workflow_job_flows').fetchall()
+        virtual_times = {flow: virtual_time for flow, virtual_time, _ in flows}
+        clock = max((last_start for _, _, last_start in flows), default=0.0)
+        return self.policy.choose(backlogs, running, virtual_times, clock, now)
+
+    def heartbeat(self, job: Job) -> bool:
+        """Extend a lease; False if it was lost (expired and reclaimed, or finished)."""
+        expires_at = time.time() + self.visibility_timeout_s
+        updated = self._execute('''
+            UPDATE workflow_jobs SET lease_expires_at = ?
+            WHERE job_id = ? AND lease_token = ? AND status = 'leased'
+        ''', (expires_at, job.job_id, job.lease_token))
+        if updated:
+            job.lease_expires_at = expires_at
+        return bool(updated)
+
+    def complete(self, job: Job, next_stage: Optional[str] = None) -> bool:
+        """
+        Mark a job done and, in the same transaction, queue the workflow's
+        next stage. False if the lease was lost, in which case nothing changes.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                finished = conn.execute('''
+                    UPDATE workflow_jobs SET status = 'done', lease_token = NULL, updated_at = ?
+                    WHERE job_id = ? AND lease_token = ? AND status = 'leased'
+                ''', (now, job.job_id, job.lease_token)).rowcount
+                if finished and next_stage is not None:
+                    # The next stage keeps the workflow's class, flow and tenant
+                    conn.execute('''
+                        INSERT INTO workflow_jobs
+                        (workflow_id, stage, priority, priority_class, flow, tenant, weight, status, max_attempts,
+                         available_at, created_at, updated_at)
+                        SELECT workflow_id, ?, priority, priority_class, flow, tenant, weight, 'queued', ?, ?, ?, ?
+                        FROM workflow_jobs WHERE job_id = ?
+                    ''', (next_stage, self.max_attempts, now, now, now, job.job_id))
+            return bool(finished)
+        finally:
+            conn.close()
+
+    def fail(self, job: Job, error: str) -> bool:
+        """
+        Record a failed attempt. The job is queued again after a backoff while
+        it has attempts left; returns True if it was.
+        """
+        now = time.time()
+        retry = job.attempts < job.max_attempts
+        backoff = min(MAX_RETRY_BACKOFF_S, 2.0 ** job.attempts)
+        self._execute('''
+            UPDATE workflow_jobs
+            SET status = ?, available_at = ?, lease_token = NULL, lease_expires_at = NULL,
+                last_error = ?, updated_at = ?
+            WHERE job_id = ? AND lease_token = ? AND status = 'leased'
+        ''', ("queued" if retry else "failed", now + backoff, error[:2000], now, job.job_id, job.lease_token))
+        return retry
+
+    def release(self, job: Job):
+        """Hand a job back unprocessed (e.g. on shutdown); the attempt is not counted."""
+        now = time.time()
+        self._execute('''
+            UPDATE workflow_jobs
+            SET status = 'queued', attempts = attempts - 1, available_at = ?,
+                lease_token = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE job_id = ? AND lease_token = ? AND status = 'leased'
+        ''', (now, now, job.job_id, job.lease_token))
+
+    def jobs(self, workflow_id: str) -> List[Dict[str, Any]]:
+        """A workflow's jobs, oldest first."""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute('''
+            SELECT job_id, workflow_id, stage, priority, priority_class, flow, tenant, status, attempts,
+                   max_attempts, reclaims, lease_owner, leased_at, lease_expires_at, queue_wait_s,
+                   created_at, updated_at, last_error
+            FROM workflow_jobs WHERE workflow_id = ? ORDER BY job_id
+        ''', (workflow_id,)).fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """Jobs per status, expired leases waiting to be reclaimed, reclaims so far, and per-class stats."""
+        now = time.time()
+        conn = self._connect()
+        counts = dict(conn.execute('SELECT status, COUNT(*) FROM workflow_jobs GROUP BY status').fetchall())
+        expired = conn.execute("SELECT COUNT(*) FROM workflow_jobs WHERE status = 'leased' AND lease_expires_at <= ?",
+                               (now,)).fetchone()[0]
+        reclaims, oldest = conn.execute('''
+            SELECT COALESCE(SUM(reclaims), 0),
+                   (SELECT MIN(available_at) FROM workflow_jobs WHERE status = 'queued' AND available_at <= ?)
+            FROM workflow_jobs
+        ''', (now,)).fetchone()
+        conn.close()
+        return {
+            **{status: counts.get(status, 0) for status in JOB_STATUSES},
+            "expired_leases": expired,
+            "reclaims": reclaims,
+            "oldest_queued_s": round(now - oldest, 3) if oldest is not None else 0.0,
+            "classes": self.class_stats(),
+        }
+
+    def class_stats(self, window_s: float = DEFAULT_STATS_WINDOW_S) -> Dict[str, Dict[str, Any]]:
+        """
+        Per priority class: jobs queued and running now, the oldest due job's
+        wait, and over the last ``window_s``: stages completed per second and
+        the queue wait of leased jobs (p50, p95, max).
+        """
+        now = time.time()
+        since = now - window_s
+        conn = self._connect()
+        backlog = conn.execute(f'''
+            SELECT priority_class, SUM(status = 'queued'), SUM(status = 'leased'),
+                   MIN(CASE WHEN {DUE_CONDITION} THEN available_at END)
+            FROM workflow_jobs WHERE status IN ('queued', 'leased') GROUP BY priority_class
+        ''', {"now": now}).fetchall()
+        completed = dict(conn.execute('''
+            SELECT priority_class, COUNT(*) FROM workflow_jobs
+            WHERE status = 'done' AND updated_at >= ? GROUP BY priority_class
+        ''', (since,)).fetchall())
+        waits: Dict[str, List[float]] = {}
+        for priority_class, waited in conn.execute('''
+            SELECT priority_class, queue_wait_s FROM workflow_jobs
+            WHERE leased_at >= ? AND queue_wait_s IS NOT NULL
+        ''', (since,)):
+            waits.setdefault(priority_class, []).append(waited)
+        conn.close()
+
+        counts = {priority_class: (queued, running, oldest) for priority_class, queued, running, oldest in backlog}
+        stats = {}
+        for priority_class in PRIORITY_CLASSES:
+            queued, running, oldest = counts.get(priority_class, (0, 0, None))
+            class_waits = sorted(waits.get(priority_class, []))
+            stats[priority_class] = {
+                "queued": queued,
+                "running": running,
+                "oldest_queued_s": round(now - oldest, 3) if oldest is not None else 0.0,
+                "completed": completed.get(priority_class, 0),
+                "throughput_per_s": round(completed.get(priority_class, 0) / window_s, 4),
+                "wait_p50_s": round(_percentile(class_waits, 0.50), 3),
+                "wait_p95_s": round(_percentile(class_waits, 0.95), 3),
+                "wait_max_s": round(class_waits[-1], 3) if class_waits else 0.0,
+            }
+        return stats
+
+    def purge_finished(self, older_than_s: float = 7 * 24 * 3600) -> int:
+        """Delete done and failed jobs last updated more than ``older_than_s`` ago."""
+        return self._execute("DELETE FROM workflow_jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                             (time.time() - older_than_s,))
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode, so lease() can take the write lock up front with BEGIN IMMEDIATE
+        return sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+
+    def _execute(self, sql: str, params: tuple) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).rowcount
+        finally:
+            conn.close()
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted ``values``; 0.0 when empty."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+class JobWorker:
+    """Leases stage jobs and runs them, heartbeating while a stage runs."""
+
+    def __init__(self, queue: JobQueue, state_manager, worker_id: Optional[str] = None,
+                 poll_interval_s: float = 1.0,
+                 workflow_factory: Optional[Callable[[str, Any], Any]] = None):
+        """
+        Args:
+            queue: The queue to lease jobs from
+            state_manager: WorkflowStateManager for the workflows' state
+            worker_id: Recorded as the lease owner; defaults to host:pid:thread
+            poll_interval_s: Wait between lease attempts while the queue is empty
+            workflow_factory: Builds the workflow for a job (default: ComplexWorkflow)
+        """
+        self.queue = queue
+        self.state_manager = state_manager
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.poll_interval_s = poll_interval_s
+        self.workflow_factory = workflow_factory
+        self.processed = 0
+        self.failed = 0
+
+    def run(self, stop: Optional[threading.Event] = None, max_jobs: Optional[int] = None,
+            exit_when_idle: bool = False) -> int:
+        """Process jobs until ``stop`` is set, ``max_jobs`` ran or, optionally, no job is due."""
+        stop = stop or threading.Event()
+        done = 0
+        while not stop.is_set() and (max_jobs is None or done < max_jobs):
+            job = self.queue.lease(self.worker_id)
+            if job is None:
+                if exit_when_idle:
+                    break
+                stop.wait(self.poll_interval_s)
+                continue
+            self.process(job)
+            done += 1
+        return done
+
+    def process(self, job: Job) -> bool:
+        """Run one leased stage and record the outcome on the queue; True if it succeeded."""
+        from workflows import WORKFLOW_STAGES, ComplexWorkflow
+
+        if job.reclaimed:
+            print(f"♻️  Reclaimed {job.workflow_id}/{job.stage} after an expired lease (attempt {job.attempts})")
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop_heartbeat),
+                                     name=f"job-heartbeat-{job.job_id}", daemon=True)
+        heartbeat.start()
+        try:
+            factory = self.workflow_factory or ComplexWorkflow
+            result = factory(job.workflow_id, self.state_manager).run_stage(job.stage, job.payload)
+        except Exception as e:
+            result = {"success": False, "error": f"{type(e).__name__}: {e}"}
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+
+        # The stage result must be on disk before the job is marked done
+        try:
+            self.state_manager.flush()
+        except Exception as e:
+            result = {"success": False, "error": f"Stage result not saved: {type(e).__name__}: {e}"}
+        if result["success"]:
+            position = WORKFLOW_STAGES.index(job.stage)
+            next_stage = WORKFLOW_STAGES[position + 1] if position + 1 < len(WORKFLOW_STAGES) else None
+            if not self.queue.complete(job, next_stage):
+                print(f"⚠️ Lease on {job.workflow_id}/{job.stage} was lost; another worker owns it now")
+            self.processed += 1
+            return True
+
+        retried = self.queue.fail(job, result.get("error", "unknown error"))
+        self.failed += 1
+        print(f"{'🔁' if retried else '❌'} {job.workflow_id}/{job.stage} failed (attempt {job.attempts} "
+              f"of {job.max_attempts}){'; queued for retry' if retried else ''}")
+        return False
+
+    def _heartbeat(self, job: Job, stop: threading.Event):
+        interval = self.queue.visibility_timeout_s / 3
+        while not stop.wait(interval):
+            if not self.queue.heartbeat(job):
+                return
+
+def run_workers(db_file: str, threads: int = 1, exit_when_idle: bool = False,
+                visibility_timeout_s: float = DEFAULT_VISIBILITY_TIMEOUT_S,
+                policy: Optional[SchedulingPolicy] = None) -> int:
+    """Run ``threads`` workers in this process until interrupted; returns the jobs processed."""
+    from workflow_state import WorkflowStateManager
+
+    queue = JobQueue(db_file, visibility_timeout_s=visibility_timeout_s, policy=policy)
+    manager = WorkflowStateManager(db_file)
+    stop = threading.Event()
+    workers = [JobWorker(queue, manager, worker_id=f"{socket.gethostname()}:{os.getpid()}:{i}")
+               for i in range(threads)]
+    pool = [threading.Thread(target=worker.run, args=(stop,), kwargs={"exit_when_idle": exit_when_idle},
+                             name=f"job-worker-{i}") for i, worker in enumerate(workers)]
+    for thread in pool:
+        thread.start()
+    try:
+        for thread in pool:
+            while thread.is_alive():
+                thread.join(0.5)
+    except KeyboardInterrupt:
+        # Let the running stages finish; their leases are still heartbeated
+        print("\n🛑 Stopping workers after their current jobs...")
+        stop.set()
+        for thread in pool:
+            thread.join()
+    return sum(worker.processed + worker.failed for worker in workers)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Durable workflow job queue")
+    parser.add_argument("--db", default="workflow_states.db", help="workflow state database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker_parser = commands.add_parser("worker", help="lease and run workflow stages")
+    worker_parser.add_argument("--threads", type=int, default=1, help="workers in this process")
+    worker_parser.add_argument("--visibility-timeout", type=float, default=DEFAULT_VISIBILITY_TIMEOUT_S,
+                               help="seconds a lease lasts without a heartbeat")
+    worker_parser.add_argument("--exit-when-idle", action="store_true", help="stop once no job is due")
+    worker_parser.add_argument("--tenant-cap", type=int, help="stages a tenant may run at once (default: no cap)")
+    submit_parser = commands.add_parser("submit", help="queue a workflow")
+    submit_parser.add_argument("workflow_id")
+    submit_parser.add_argument("workflow_input", help="workflow input as JSON")
+    submit_parser.add_argument("--class", dest="priority_class", choices=PRIORITY_CLASSES,
+                               help="priority class (default: from the workflow type)")
+    commands.add_parser("stats", help="show job counts")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        policy = SchedulingPolicy(default_tenant_cap=args.tenant_cap)
+        count = run_workers(args.db, args.threads, args.exit_when_idle, args.visibility_timeout, policy)
+        print(f"✅ Worker processed {count} jobs")
+    elif args.command == "submit":
+        job_id = JobQueue(args.db).submit(args.workflow_id, json.loads(args.workflow_input), args.priority_class)
+        print(f"📥 Queued {args.workflow_id} as job {job_id}")
+    else:
+        print(json.dumps(JobQueue(args.db).stats(), indent=2))
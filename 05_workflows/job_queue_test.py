@@ -0,0 +1,82 @@
+"""
+Tests for the durable job queue: leases, heartbeats, expiry and reclaim,
+retries and stage hand-off.
+
+    python -m pytest job_queue_test.py -q
+"""
+
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+INPUT = {"type": "standard", "department": "Ops"}
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.db"), visibility_timeout_s=0.1, max_attempts=2)
+
+def test_leased_job_is_not_leased_twice(queue):
+    queue.submit("wf", INPUT, stage="planning")
+    job = queue.lease("w1")
+    assert (job.workflow_id, job.stage, job.attempts, job.reclaimed) == ("wf", "planning", 1, False)
+    assert job.payload == INPUT
+    assert queue.lease("w2") is None
+
+def test_heartbeat_keeps_the_lease(queue):
+    queue.submit("wf", INPUT, stage="planning")
+    job = queue.lease("w1")
+    for _ in range(3):
+        time.sleep(0.05)
+        assert queue.heartbeat(job)
+    assert queue.lease("w2") is None
+
+def test_expired_lease_is_reclaimed_and_the_old_owner_is_fenced_off(queue):
+    queue.submit("wf", INPUT, stage="planning")
+    stale = queue.lease("w1")
+    time.sleep(0.15)
+    job = queue.lease("w2")
+    assert job.job_id == stale.job_id
+    assert (job.attempts, job.reclaimed) == (2, True)
+    # The crashed worker's token no longer counts
+    assert not queue.heartbeat(stale)
+    assert not queue.complete(stale, next_stage="data_processing")
+    assert queue.complete(job)
+    assert queue.jobs("wf")[0]["reclaims"] == 1
+    assert [j["status"] for j in queue.jobs("wf")] == ["done"]
+
+def test_expired_lease_without_attempts_left_fails(queue):
+    queue.submit("wf", INPUT, stage="planning")
+    queue.lease("w1")
+    time.sleep(0.15)
+    queue.lease("w2")
+    time.sleep(0.15)
+    assert queue.lease("w3") is None
+    job = queue.jobs("wf")[0]
+    assert (job["status"], job["last_error"]) == ("failed", "lease expired")
+
+def test_complete_queues_the_next_stage_with_the_same_placement(queue):
+    queue.submit("wf", INPUT, priority_class="interactive", stage="planning")
+    queue.complete(queue.lease("w1"), next_stage="data_processing")
+    job = queue.lease("w1")
+    assert (job.stage, job.priority_class, job.tenant, job.attempts) == ("data_processing", "interactive", "Ops", 1)
+    # Later stages read the input from the workflow state
+    assert job.payload is None
+
+def test_failed_attempt_is_retried_after_a_backoff_then_fails(queue):
+    queue.submit("wf", INPUT, stage="planning")
+    assert queue.fail(queue.lease("w1"), "boom")
+    # Backing off
+    assert queue.lease("w1") is None
+    queue._execute("UPDATE workflow_jobs SET available_at = 0", ())
+    job = queue.lease("w1")
+    assert job.attempts == 2
+    assert not queue.fail(job, "boom again")
+    assert queue.jobs("wf")[0]["status"] == "failed"
+    assert queue.jobs("wf")[0]["last_error"] == "boom again"
+
+def test_released_job_does_not_use_up_an_attempt(queue):
+    queue.submit("wf", INPUT, stage="planning")
+    queue.release(queue.lease("w1"))
+    assert queue.lease("w2").attempts == 1
@@ -0,0 +1,190 @@
+"""
+Prompt Inputs
+=============
+
+The planning, data processing and approval stages all put the workflow input
+in their prompt. ``PromptInputBuilder`` serializes it once per workflow
+instead of once per stage, and keeps it within a token budget:
+
+- an input that fits the budget is used as is
+- otherwise the largest lists are replaced, biggest first, with a summary:
+  the item count, the item types, per-field statistics (numeric ranges and
+  means, distinct and most common values) and a few sample items
+- if that is still too much, the samples are dropped and long strings are
+  shortened
+
+    prompt_input = PromptInputBuilder(token_budget=1000).build(workflow_input)
+    prompt = f"Workflow Input: {prompt_input.text}"
+    prompt_input.tokens_saved     # prompt tokens saved per stage that uses it
+"""
+
+import hashlib
+import json
+import sys
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Make the shared helpers at the repository root importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.models import estimate_tokens
+
+DEFAULT_PROMPT_INPUT_TOKENS = 1000
+# Lists shorter than this are always shown in full
+MIN_SUMMARIZED_ITEMS = 8
+# Per-field statistics are kept for at most this many fields of a list's items
+MAX_SUMMARY_FIELDS = 30
+# Strings are shortened to this many characters in the last trimming step
+MAX_STRING_CHARS = 200
+
+# Keys and indexes leading from the input to a nested value
+KeyPath = Tuple[Union[str, int], ...]
+
+def canonical_json(value: Any) -> str:
+    """Serialization that ignores key order and formatting, for hashing."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+def input_fingerprint(workflow_input: Dict[str, Any]) -> str:
+    """Hash of a workflow input's canonical serialization."""
+    return hashlib.sha256(canonical_json(workflow_input).encode("utf-8")).hexdigest()
+
+@dataclass(frozen=True)
+class PromptInput:
+    """A workflow input rendered for prompts, and what trimming it saved."""
+    # The input with large lists summarized, and its prompt rendering
+    value: Dict[str, Any]
+    text: str
+    fingerprint: str
+    full_tokens: int
+    tokens: int
+    summarized: Tuple[str, ...] = ()
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.full_tokens - self.tokens
+
+class PromptInputBuilder:
+    """Renders workflow inputs for prompts within a token budget."""
+
+    def __init__(self, token_budget: int = DEFAULT_PROMPT_INPUT_TOKENS, sample_size: int = 3):
+        """
+        Args:
+            token_budget: Tokens the rendered input may take in a prompt.
+            sample_size: Items shown from each summarized list.
+        """
+        self.token_budget = token_budget
+        self.sample_size = sample_size
+
+    def build(self, workflow_input: Dict[str, Any]) -> PromptInput:
+        """Render ``workflow_input``, summarizing its largest lists if it is over budget."""
+        canonical = canonical_json(workflow_input)
+        fingerprint = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        # Indented JSON is encoded in pure Python, so large inputs are only
+        # measured in compact form; their savings are then a lower bound
+        full_tokens = estimate_tokens(canonical)
+        if full_tokens <= self.token_budget:
+            text = json.dumps(workflow_input, indent=2, default=str)
+            full_tokens = estimate_tokens(text)
+            if full_tokens <= self.token_budget:
+                return PromptInput(workflow_input, text, fingerprint, full_tokens, full_tokens)
+
+        summaries: Dict[KeyPath, Dict[str, Any]] = {}
+        value = workflow_input
+        for path, _ in _collections_by_size(workflow_input):
+            if any(path[:len(done)] == done for done in summaries):
+                continue  # inside a list that is already summarized
+            summaries[path] = summarize_collection(_at(workflow_input, path), self.sample_size)
+            value = _trimmed(workflow_input, (), summaries, None)
+            text = json.dumps(value, indent=2, default=str)
+            if estimate_tokens(text) <= self.token_budget:
+                break
+        else:
+            # Still over budget: drop the samples, then shorten long strings
+            for summary in summaries.values():
+                summary.pop("samples", None)
+            value = _trimmed(workflow_input, (), summaries, MAX_STRING_CHARS)
+            text = json.dumps(value, indent=2, default=str)
+
+        summarized = tuple(_format_path(path) for path in summaries)
+        return PromptInput(value, text, fingerprint, full_tokens, estimate_tokens(text), summarized)
+
+def summarize_collection(items: List[Any], sample_size: int = 3) -> Dict[str, Any]:
+    """Count, item types, per-field statistics and samples of a list."""
+    summary: Dict[str, Any] = {
+        "summary": f"{len(items)} items, summarized",
+        "item_types": dict(Counter(type(item).__name__ for item in items)),
+    }
+    records = [item for item in items if isinstance(item, dict)]
+    if records:
+        fields: Dict[str, List[Any]] = {}
+        for record in records:
+            for key, value in record.items():
+                if key in fields or len(fields) < MAX_SUMMARY_FIELDS:
+                    fields.setdefault(key, []).append(value)
+        summary["fields"] = {key: _value_stats(values, len(records)) for key, values in fields.items()}
+    scalars = [item for item in items if not isinstance(item, (dict, list))]
+    if scalars:
+        summary["values"] = _value_stats(scalars, len(scalars))
+    if sample_size > 0:
+        summary["samples"] = items[:sample_size]
+    return summary
+
+def _value_stats(values: List[Any], total: int) -> Dict[str, Any]:
+    """Statistics of one field's values: presence, types, numeric range, common values."""
+    stats: Dict[str, Any] = {"types": sorted({type(value).__name__ for value in values})}
+    if len(values) < total:
+        stats["present"] = len(values)
+    numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    if numbers:
+        stats.update(min=min(numbers), max=max(numbers), mean=round(sum(numbers) / len(numbers), 4))
+    hashable = [v for v in values if isinstance(v, (str, bool)) or v is None]
+    if hashable:
+        counts = Counter(hashable)
+        stats["distinct"] = len(counts)
+        stats["most_common"] = [value if not isinstance(value, str) else value[:40]
+                                for value, _ in counts.most_common(3)]
+    return stats
+
+def _collections_by_size(value: Any, path: KeyPath = ()) -> List[Tuple[KeyPath, int]]:
+    """Every list worth summarizing, with its serialized size, largest first."""
+    found: List[Tuple[KeyPath, int]] = []
+
+    def walk(node: Any, node_path: KeyPath):
+        if isinstance(node, dict):
+            for key, child in node.items():
+                if isinstance(child, (dict, list)):
+                    walk(child, node_path + (key,))
+        else:
+            if len(node) >= MIN_SUMMARIZED_ITEMS:
+                found.append((node_path, len(json.dumps(node, default=str))))
+            for index, child in enumerate(node):
+                if isinstance(child, (dict, list)):
+                    walk(child, node_path + (index,))
+
+    if isinstance(value, (dict, list)):
+        walk(value, path)
+    return sorted(found, key=lambda entry: entry[1], reverse=True)
+
+def _at(value: Any, path: KeyPath) -> Any:
+    for key in path:
+        value = value[key]
+    return value
+
+def _trimmed(node: Any, path: KeyPath, summaries: Dict[KeyPath, Dict[str, Any]], max_chars: Optional[int]) -> Any:
+    """A copy of ``node`` with summarized lists replaced and, optionally, strings shortened."""
+    if path in summaries:
+        return summaries[path]
+    if isinstance(node, dict):
+        return {key: _trimmed(child, path + (key,), summaries, max_chars) for key, child in node.items()}
+    if isinstance(node, list):
+        return [_trimmed(child, path + (index,), summaries, max_chars) for index, child in enumerate(node)]
+    if max_chars is not None and isinstance(node, str) and len(node) > max_chars:
+        return node[:max_chars] + "…"
+    return node
+
+def _format_path(path: KeyPath) -> str:
+    text = ""
+    for key in path:
+        text += f"[{key}]" if isinstance(key, int) else (f".{key}" if text else str(key))
+    return text or "<input>"
@@ -4,38 +4,88 @@ Enhanced Flask backend for React UI with WebSocket support
 Serves workflow data and provides real-time execution monitoring
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import sqlite3
 import os
 import json
-import subprocess
 import threading
 import time
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
+import socket
+import metrics
+
+# The workflow modules and database live in the parent directory
+WORKFLOW_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKFLOW_DB = os.path.join(WORKFLOW_DIR, "workflow_states.db")
+sys.path.insert(0, WORKFLOW_DIR)
+from job_queue import JobQueue, JobWorker
+from workflow_retention import RetentionPolicy, RetentionWorker
+from workflow_state import WorkflowStateManager
+from workflows import WORKFLOW_STAGES
+
+# How often queued workflows are polled for progress, and how many queue
+# workers the backend runs itself (0 to leave all work to job_queue.py workers)
+WATCH_INTERVAL_S = 0.5
+LOCAL_WORKERS = int(os.getenv("AGNO_UI_WORKERS", "1"))
+# Finished workflows older than this many days are archived once an hour (0 turns retention off)
+RETENTION_DAYS = float(os.getenv("AGNO_RETENTION_DAYS", "7"))
+# Flask debug mode, with the auto-reloader (AGNO_UI_DEBUG=0 turns both off)
+DEBUG = os.getenv("AGNO_UI_DEBUG", "1") != "0"
+
+# Icon and message type per job status
+JOB_STATUS_MESSAGES = {
+    'queued': ('📥', 'info'),
+    'leased': ('🔧', 'command'),
+    'done': ('✅', 'success'),
+    'failed': ('❌', 'error'),
+}
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'agno-workflow-secret-key'
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+job_queue = JobQueue(WORKFLOW_DB)
+
+def emit_event(event, data, room=None):
+    """Emit a SocketIO event and count it."""
+    metrics.socketio_emits.inc(event=event)
+    socketio.emit(event, data, room=room)
 
 def get_workflows():
     """Get all workflows from the database"""
     try:
-        db_path = "../workflow_states.db"
+        db_path = WORKFLOW_DB
         if not os.path.exists(db_path):
             return []
         
+        query_started = time.perf_counter()
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
-        # Get all workflows
+        # Stage payloads live in the append-only results table; older
+        # databases only have the snapshot stored on the header row
         cursor.execute("""
-            SELECT workflow_id, current_stage, status, created_at, updated_at, stage_data
-            FROM workflow_states
-            ORDER BY created_at DESC
+            SELECT name FROM sqlite_master
+            WHERE type='table' AND name='workflow_stage_results'
+        """)
+        if cursor.fetchone():
+            stage_data_column = """COALESCE((
+                SELECT payload FROM workflow_stage_results r
+                WHERE r.workflow_id = s.workflow_id
+                ORDER BY r.result_id DESC LIMIT 1
+            ), s.stage_data)"""
+        else:
+            stage_data_column = "s.stage_data"
+        
+        # Get all workflows
+        cursor.execute(f"""
+            SELECT s.workflow_id, s.current_stage, s.status, s.created_at, s.updated_at,
+                   {stage_data_column}
+            FROM workflow_states s
+            ORDER BY s.created_at DESC
         """)
         
         workflows = []
@@ -51,107 +101,97 @@ def get_workflows():
             workflows.append(workflow)
         
         conn.close()
+        metrics.db_query_duration.observe(time.perf_counter() - query_started, query="get_workflows")
         return workflows
         
     except Exception as e:
+        metrics.db_query_errors.inc(query="get_workflows")
         print(f"Error getting workflows: {e}")
         return []
 
-def execute_workflow(workflow_id, socket_id):
-    """Execute a workflow and stream output via WebSocket"""
+def watch_workflow(workflow_id, first_job_id, socket_id):
+    """Relay a queued workflow's stage jobs to the client until it finishes"""
+    metrics.workflow_executions_in_progress.inc()
+    run_started = time.perf_counter()
+    reported = {}
     try:
-        # Emit start message
-        socketio.emit('workflow_started', {
-            'workflow_id': workflow_id,
-            'message': f'🚀 Starting workflow execution for {workflow_id}',
-            'timestamp': datetime.now().isoformat(),
-            'type': 'info'
-        }, room=socket_id)
-        
-        # Change to the parent directory where the main workflow script is
-        workflow_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        os.chdir(workflow_dir)
-        
-        # Emit directory change message
-        socketio.emit('workflow_output', {
-            'workflow_id': workflow_id,
-            'message': f'📁 Working directory: {workflow_dir}',
-            'timestamp': datetime.now().isoformat(),
-            'type': 'info'
-        }, room=socket_id)
-        
-        # Execute the main workflow script
-        cmd = [sys.executable, 'main.py']
-        
-        socketio.emit('workflow_output', {
-            'workflow_id': workflow_id,
-            'message': f'🔧 Executing: {" ".join(cmd)}',
-            'timestamp': datetime.now().isoformat(),
-            'type': 'command'
-        }, room=socket_id)
-        
-        # Start the process
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1
-        )
-        
-        # Stream output in real-time
-        for line in iter(process.stdout.readline, ''):
-            if line:
-                line = line.strip()
-                if line:  # Skip empty lines
-                    # Determine message type based on content
-                    msg_type = 'output'
-                    if 'error' in line.lower() or 'exception' in line.lower():
-                        msg_type = 'error'
-                    elif 'success' in line.lower() or 'completed' in line.lower():
-                        msg_type = 'success'
-                    elif 'warning' in line.lower():
-                        msg_type = 'warning'
-                    elif line.startswith('🔧') or line.startswith('📊') or line.startswith('✅'):
-                        msg_type = 'info'
-                    
-                    socketio.emit('workflow_output', {
-                        'workflow_id': workflow_id,
-                        'message': line,
-                        'timestamp': datetime.now().isoformat(),
-                        'type': msg_type
-                    }, room=socket_id)
-        
-        # Wait for process to complete
-        return_code = process.wait()
-        
-        # Emit completion message
-        if return_code == 0:
-            socketio.emit('workflow_completed', {
-                'workflow_id': workflow_id,
-                'message': f'✅ Workflow {workflow_id} completed successfully',
-                'timestamp': datetime.now().isoformat(),
-                'type': 'success',
-                'return_code': return_code
-            }, room=socket_id)
-        else:
-            socketio.emit('workflow_failed', {
-                'workflow_id': workflow_id,
-                'message': f'❌ Workflow {workflow_id} failed with return code {return_code}',
-                'timestamp': datetime.now().isoformat(),
-                'type': 'error',
-                'return_code': return_code
-            }, room=socket_id)
+        while True:
+            jobs = [job for job in job_queue.jobs(workflow_id) if job['job_id'] >= first_job_id]
+            for job in jobs:
+                progress = (job['status'], job['attempts'])
+                if reported.get(job['job_id']) == progress:
+                    continue
+                reported[job['job_id']] = progress
+                icon, msg_type = JOB_STATUS_MESSAGES[job['status']]
+                detail = ''
+                if job['status'] == 'leased':
+                    detail = f" on {job['lease_owner']} after {job['queue_wait_s']:.1f}s in the {job['priority_class']} queue"
+                if job['last_error'] and job['status'] != 'done':
+                    detail += f": {job['last_error']}"
+                emit_event('workflow_output', {
+                    'workflow_id': workflow_id,
+                    'message': f"{icon} {job['stage']}: {job['status']} (attempt {job['attempts']}){detail}",
+                    'timestamp': datetime.now().isoformat(),
+                    'type': msg_type
+                }, room=socket_id)
+                if job['status'] in ('done', 'failed') and job['leased_at']:
+                    metrics.workflow_stage_duration.observe(job['updated_at'] - job['leased_at'], stage=job['stage'],
+                                                            outcome='completed' if job['status'] == 'done' else 'failed')
+            
+            last = jobs[-1] if jobs else None
+            if last and last['status'] == 'failed':
+                metrics.workflow_runs_failed.inc(reason="stage_failed")
+                emit_event('workflow_failed', {
+                    'workflow_id': workflow_id,
+                    'message': f"❌ Workflow {workflow_id} failed at stage {last['stage']}",
+                    'timestamp': datetime.now().isoformat(),
+                    'type': 'error'
+                }, room=socket_id)
+                return
+            if last and last['status'] == 'done' and last['stage'] == WORKFLOW_STAGES[-1]:
+                metrics.workflow_runs_completed.inc()
+                emit_event('workflow_completed', {
+                    'workflow_id': workflow_id,
+                    'message': f'✅ Workflow {workflow_id} completed successfully',
+                    'timestamp': datetime.now().isoformat(),
+                    'type': 'success'
+                }, room=socket_id)
+                return
+            time.sleep(WATCH_INTERVAL_S)
             
     except Exception as e:
-        error_msg = f'💥 Error executing workflow {workflow_id}: {str(e)}'
-        socketio.emit('workflow_error', {
+        metrics.workflow_runs_failed.inc(reason="exception")
+        error_msg = f'💥 Error watching workflow {workflow_id}: {str(e)}'
+        emit_event('workflow_error', {
             'workflow_id': workflow_id,
             'message': error_msg,
             'timestamp': datetime.now().isoformat(),
             'type': 'error',
             'error': str(e)
         }, room=socket_id)
+    finally:
+        metrics.workflow_executions_in_progress.dec()
+        metrics.workflow_run_duration.observe(time.perf_counter() - run_started)
+
+def start_retention(days):
+    """Archive finished workflows in the background so the database stays bounded"""
+    if days <= 0:
+        return None
+    worker = RetentionWorker(WorkflowStateManager(WORKFLOW_DB), RetentionPolicy(max_age=timedelta(days=days)))
+    worker.start()
+    return worker
+
+def start_local_workers(count):
+    """Run queue workers inside the backend; jobs survive it, since leases expire and are reclaimed"""
+    state_manager = WorkflowStateManager(WORKFLOW_DB)
+    for i in range(count):
+        worker = JobWorker(job_queue, state_manager, worker_id=f"{socket.gethostname()}:{os.getpid()}:ui-{i}")
+        threading.Thread(target=worker.run, name=f"ui-job-worker-{i}", daemon=True).start()
+
+def start_background_work():
+    """Start the local queue workers and retention; call once per process serving the app"""
+    start_local_workers(LOCAL_WORKERS)
+    start_retention(RETENTION_DAYS)
 
 @app.route('/api/workflows', methods=['GET'])
 def workflows():
@@ -171,18 +211,34 @@ def run_workflow(workflow_id):
         if not socket_id:
             return jsonify({'error': 'Socket ID required'}), 400
         
-        # Start workflow execution in a separate thread
+        # Queue the workflow durably; workers run it even if this process dies
+        workflow_input = request.json.get('workflow_input')
+        if workflow_input is None:
+            state = WorkflowStateManager(WORKFLOW_DB).load_state(workflow_id)
+            workflow_input = state.workflow_data if state else {}
+        job_id = job_queue.submit(workflow_id, workflow_input, priority_class=request.json.get('priority_class'))
+        metrics.workflow_runs_started.inc()
+        
+        emit_event('workflow_started', {
+            'workflow_id': workflow_id,
+            'message': f'🚀 Queued workflow {workflow_id} as job {job_id}',
+            'timestamp': datetime.now().isoformat(),
+            'type': 'info'
+        }, room=socket_id)
+        
+        # Progress is relayed from the queue; losing this thread loses no work
         thread = threading.Thread(
-            target=execute_workflow,
-            args=(workflow_id, socket_id)
+            target=watch_workflow,
+            args=(workflow_id, job_id, socket_id)
         )
         thread.daemon = True
         thread.start()
         
         return jsonify({
-            'message': f'Workflow {workflow_id} execution started',
+            'message': f'Workflow {workflow_id} queued as job {job_id}',
             'workflow_id': workflow_id,
-            'status': 'started'
+            'job_id': job_id,
+            'status': 'queued'
         })
         
     except Exception as e:
@@ -193,23 +249,49 @@ def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'message': 'Enhanced React UI backend is running'})
 
+def refresh_queue_metrics():
+    """Set the job queue gauges from the database; the workers may run in other processes"""
+    query_started = time.perf_counter()
+    try:
+        class_stats = job_queue.class_stats()
+        metrics.db_query_duration.observe(time.perf_counter() - query_started, query="queue_stats")
+    except Exception:
+        metrics.db_query_errors.inc(query="queue_stats")
+        return
+    for priority_class, stats in class_stats.items():
+        metrics.queue_jobs.set(stats['queued'], priority_class=priority_class, status='queued')
+        metrics.queue_jobs.set(stats['running'], priority_class=priority_class, status='running')
+        metrics.queue_oldest_wait.set(stats['oldest_queued_s'], priority_class=priority_class)
+        metrics.queue_wait.set(stats['wait_p50_s'], priority_class=priority_class, quantile='0.5')
+        metrics.queue_wait.set(stats['wait_p95_s'], priority_class=priority_class, quantile='0.95')
+        metrics.class_throughput.set(stats['throughput_per_s'], priority_class=priority_class)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    refresh_queue_metrics()
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 @socketio.on('connect')
 def handle_connect():
     """Handle WebSocket connection"""
     print(f'Client connected: {request.sid}')
+    metrics.socketio_connections.inc()
+    metrics.socketio_emits.inc(event='connected')
     emit('connected', {'message': 'Connected to workflow backend', 'socket_id': request.sid})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle WebSocket disconnection"""
     print(f'Client disconnected: {request.sid}')
+    metrics.socketio_connections.dec()
 
 @socketio.on('join_workflow')
 def handle_join_workflow(data):
     """Handle joining a specific workflow room"""
     workflow_id = data.get('workflow_id')
     if workflow_id:
-        socketio.emit('workflow_joined', {
+        emit_event('workflow_joined', {
             'workflow_id': workflow_id,
             'message': f'Joined workflow {workflow_id} monitoring'
         }, room=request.sid)
@@ -217,7 +299,16 @@ def handle_join_workflow(data):
 if __name__ == '__main__':
     print("🚀 Starting Enhanced React UI Backend with WebSocket Support...")
     print("📊 API: http://localhost:5002/api/workflows")
+    print("📈 Metrics: http://localhost:5002/metrics")
     print("🔌 CORS: Enabled for React frontend")
     print("📡 WebSocket: Enabled for real-time workflow monitoring")
+    print(f"📥 Job queue: {WORKFLOW_DB} ({LOCAL_WORKERS} local workers)")
+    if RETENTION_DAYS > 0:
+        print(f"🗄️ Retention: archiving finished workflows after {RETENTION_DAYS:g} days")
     
-    socketio.run(app, host='0.0.0.0', port=5002, debug=True)
+    # With the reloader the app is served from a child process and the parent
+    # only restarts it; start workers everywhere except in that parent
+    use_reloader = DEBUG
+    if not use_reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_work()
+    socketio.run(app, host='0.0.0.0', port=5002, debug=DEBUG, use_reloader=use_reloader)
@@ -0,0 +1,174 @@
+"""
+In-process Prometheus metrics for the workflow UI backend.
+
+A minimal registry of counters, gauges and histograms that renders the
+Prometheus text exposition format. Updates are a dictionary lookup and an
+addition under a per-metric lock, so instrumenting hot paths (every SocketIO
+emit) stays cheap; nothing is aggregated until /metrics is scraped.
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# Prometheus client defaults, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+class Counter(_Metric):
+    """A value that only goes up, e.g. runs started."""
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {} if labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return super().render() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values
+        ]
+
+class Gauge(Counter):
+    """A value that goes up and down, e.g. open connections."""
+    metric_type = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    """Bucketed observations, e.g. durations in seconds."""
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last)], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        lines = super().render()
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Holds every metric and renders them for a scrape."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = MetricsRegistry()
+
+workflow_runs_started = registry.counter(
+    "workflow_runs_started_total", "Workflow executions started from the UI")
+workflow_runs_completed = registry.counter(
+    "workflow_runs_completed_total", "Workflow executions that exited successfully")
+workflow_runs_failed = registry.counter(
+    "workflow_runs_failed_total", "Workflow executions that exited non-zero or raised", ["reason"])
+workflow_executions_in_progress = registry.gauge(
+    "workflow_executions_in_progress", "Workflow executions currently running (execution queue depth)")
+workflow_run_duration = registry.histogram(
+    "workflow_run_duration_seconds", "Wall time of a workflow execution",
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800))
+workflow_stage_duration = registry.histogram(
+    "workflow_stage_duration_seconds", "Wall time of a workflow stage, from lease to completion of its job",
+    ["stage", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+queue_jobs = registry.gauge(
+    "workflow_queue_jobs", "Stage jobs in the job queue, per priority class", ["priority_class", "status"])
+queue_oldest_wait = registry.gauge(
+    "workflow_queue_oldest_wait_seconds", "How long the oldest due job of a priority class has waited",
+    ["priority_class"])
+queue_wait = registry.gauge(
+    "workflow_queue_wait_seconds", "Queue wait of recently leased jobs, per priority class", ["priority_class", "quantile"])
+class_throughput = registry.gauge(
+    "workflow_class_throughput_per_second", "Stages completed per second over the recent window, per priority class",
+    ["priority_class"])
+socketio_connections = registry.gauge(
+    "socketio_active_connections", "Currently connected SocketIO clients")
+socketio_emits = registry.counter(
+    "socketio_emits_total", "SocketIO events emitted; use rate() for emits per second", ["event"])
+db_query_duration = registry.histogram(
+    "workflow_db_query_duration_seconds", "SQLite query latency", ["query"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+db_query_errors = registry.counter(
+    "workflow_db_query_errors_total", "SQLite queries that raised", ["query"])
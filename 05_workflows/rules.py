@@ -0,0 +1,316 @@
+"""
+Business Rules
+==============
+
+The rules the business logic stage applies, defined once as data and compiled
+into evaluation plans. A rule says when a record *hits* it and what a hit
+means (``reject`` the record, or ``flag`` it for attention):
+
+    Rule("approval_threshold", {"field": "amount", "op": ">", "param": "approval_threshold"}, action="flag")
+
+Conditions are leaves, ``{"field", "op", "value" | "param" | "ref"}``, combined
+with ``{"all": [...]}``, ``{"any": [...]}`` and ``{"not": ...}``. Operators:
+``< <= > >= == !=``, ``in`` / ``not_in`` (a list), ``missing``, ``present`` and
+``invalid`` (present, but not a number). ``param`` takes the value from the
+rule parameters (RULE_DEFAULTS, overridden by the workflow input's scalar
+keys), and ``ref`` compares against another field of the same record. A
+missing value never matches a comparison; test for it with ``missing``.
+
+Compiling a rule set resolves the parameters, decides which fields are loaded
+as number or text columns, and turns each condition into a NumPy predicate.
+Identical sub-conditions are compiled once and evaluated once per chunk. The
+plan then runs over the records in chunks (see data_engine), loading only the
+fields the rules use:
+
+    report = evaluate_rules("financial", {"amount": 0, "line_items": items, "budget": 25_000})
+    report["rules"]["budget_check"]     # {"action": "reject", "hits": 412, "ms": 3.1, ...}
+"""
+
+import json
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data_engine import DEFAULT_CHUNK_ROWS, Chunk, iter_chunks, load_chunk
+
+# Parameters rules may refer to, unless the workflow input sets them
+RULE_DEFAULTS: Dict[str, Any] = {
+    "approval_threshold": 5_000,
+    "escalation_amount": 50_000,
+    "escalation_days": 5,
+    "approver_roles": ["manager", "director", "finance", "executive"],
+}
+
+COMPARISONS = {
+    "<": np.less, "<=": np.less_equal, ">": np.greater,
+    ">=": np.greater_equal, "==": np.equal, "!=": np.not_equal,
+}
+OPERATORS = set(COMPARISONS) | {"in", "not_in", "missing", "present", "invalid"}
+# Operators whose field is always loaded as a number column
+NUMERIC_OPERATORS = {"<", "<=", ">", ">=", "invalid"}
+
+# Mask of the rows in a chunk that match a condition; the dict caches shared sub-conditions
+Predicate = Callable[[Chunk, Dict[str, np.ndarray]], np.ndarray]
+
+@dataclass(frozen=True)
+class Rule:
+    """A named condition and what a record matching it means."""
+    name: str
+    when: Dict[str, Any]
+    action: str = "reject"       # "reject" or "flag"
+    description: str = ""
+    # "record": evaluated per record; "input": evaluated once on the workflow input
+    scope: str = "record"
+
+RULE_SETS: Dict[str, Tuple[Rule, ...]] = {
+    "financial": (
+        Rule("amount_validation",
+             {"any": [{"field": "amount", "op": "missing"}, {"field": "amount", "op": "invalid"},
+                      {"field": "amount", "op": "<=", "value": 0}]},
+             description="Amount is missing, not a number, or not positive"),
+        Rule("budget_check", {"field": "amount", "op": ">", "param": "budget"},
+             description="Amount exceeds the budget"),
+        Rule("approval_threshold", {"field": "amount", "op": ">", "param": "approval_threshold"},
+             action="flag", description="Amount needs an approval"),
+    ),
+    "approval": (
+        Rule("role_based_access", {"field": "approver_role", "op": "not_in", "param": "approver_roles"},
+             description="Approver's role may not approve"),
+        Rule("delegation_rules", {"field": "delegated_to", "op": "==", "ref": "requested_by"},
+             description="Request delegated back to its requester"),
+        Rule("escalation_criteria",
+             {"any": [{"field": "amount", "op": ">", "param": "escalation_amount"},
+                      {"field": "days_pending", "op": ">", "param": "escalation_days"}]},
+             action="flag", description="Large or long-pending request to escalate"),
+    ),
+    "standard": (
+        Rule("business_validation",
+             {"any": [{"field": "amount", "op": "<", "value": 0}, {"field": "quantity", "op": "<", "value": 0}]},
+             description="Negative amount or quantity"),
+        Rule("data_integrity",
+             {"any": [{"field": "amount", "op": "invalid"}, {"field": "quantity", "op": "invalid"}]},
+             description="Amount or quantity is not a number"),
+        Rule("process_compliance", {"field": "process", "op": "missing"}, action="flag", scope="input",
+             description="No process named for the workflow"),
+    ),
+}
+
+def rule_set(workflow_type: str) -> Tuple[Rule, ...]:
+    """The rules for a workflow type; unknown types get the standard rules."""
+    return RULE_SETS.get(workflow_type, RULE_SETS["standard"])
+
+class RulePlan:
+    """Compiled rules: the columns they need and one predicate per rule."""
+
+    def __init__(self, predicates: List[Tuple[Rule, Predicate]], schema: Dict[str, str], skipped: Dict[str, str]):
+        self.predicates = predicates
+        self.schema = schema
+        self.skipped = skipped
+
+    def evaluate(self, source: Iterable[Any], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dict[str, Any]:
+        """Run every rule over the records of ``source``, counting hits and time per rule."""
+        started = time.perf_counter()
+        hits = {rule.name: 0 for rule, _ in self.predicates}
+        seconds = {rule.name: 0.0 for rule, _ in self.predicates}
+        records = chunks = rejected = flagged = 0
+
+        for batch in iter_chunks(source, chunk_rows):
+            chunk = load_chunk(batch, dict(self.schema))
+            cache: Dict[str, np.ndarray] = {}
+            rejects = np.zeros(chunk.rows, dtype=bool)
+            flags = np.zeros(chunk.rows, dtype=bool)
+            for rule, predicate in self.predicates:
+                rule_started = time.perf_counter()
+                mask = predicate(chunk, cache)
+                seconds[rule.name] += time.perf_counter() - rule_started
+                hits[rule.name] += int(np.count_nonzero(mask))
+                if rule.action == "reject":
+                    rejects |= mask
+                else:
+                    flags |= mask
+            records += chunk.rows
+            chunks += 1
+            rejected += int(np.count_nonzero(rejects))
+            flagged += int(np.count_nonzero(flags & ~rejects))
+
+        elapsed = time.perf_counter() - started
+        return {
+            "records": records,
+            "rejected": rejected,
+            "flagged": flagged,
+            "rules": {
+                rule.name: {"action": rule.action, "hits": hits[rule.name],
+                            "ms": round(seconds[rule.name] * 1000, 3), "description": rule.description}
+                for rule, _ in self.predicates
+            },
+            "skipped": dict(self.skipped),
+            "chunks": chunks,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "records_per_sec": round(records / elapsed) if elapsed > 0 else None,
+        }
+
+def compile_rules(rules: Sequence[Rule], params: Optional[Dict[str, Any]] = None) -> RulePlan:
+    """
+    Compile ``rules`` with ``params`` (on top of RULE_DEFAULTS). Rules whose
+    parameters are not set, such as ``budget_check`` without a ``budget``, are
+    skipped and listed in the plan's ``skipped``.
+    """
+    params = {**RULE_DEFAULTS, **(params or {})}
+    schema: Dict[str, str] = {}
+    resolved: Dict[str, Dict[str, Any]] = {}
+    skipped: Dict[str, str] = {}
+    for rule in rules:
+        if rule.action not in ("reject", "flag"):
+            raise ValueError(f"Rule '{rule.name}' has unknown action '{rule.action}'")
+        try:
+            resolved[rule.name] = _resolve(rule.name, rule.when, params, schema)
+        except KeyError as missing:
+            skipped[rule.name] = f"parameter '{missing.args[0]}' is not set"
+
+    nodes: Dict[str, Predicate] = {}
+    predicates = [(rule, _compile(resolved[rule.name], schema, nodes)) for rule in rules if rule.name in resolved]
+    return RulePlan(predicates, schema, skipped)
+
+def evaluate_rules(workflow_type: str, workflow_input: Dict[str, Any],
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dict[str, Any]:
+    """
+    Apply a workflow type's rules. Record rules run over ``line_items`` (or over
+    the input itself when it has none); input rules run on the input. The
+    input's scalar keys override RULE_DEFAULTS as rule parameters.
+    """
+    params = tuple(sorted((key, value) for key, value in workflow_input.items()
+                          if isinstance(value, (str, int, float, bool)) or value is None))
+    record_plan, input_plan = _compiled_plans(workflow_type, params)
+    report = record_plan.evaluate(workflow_input.get("line_items") or [workflow_input], chunk_rows)
+    if input_plan.predicates or input_plan.skipped:
+        input_report = input_plan.evaluate([workflow_input])
+        report["rules"].update(input_report["rules"])
+        report["skipped"].update(input_report["skipped"])
+    return report
+
+@lru_cache(maxsize=64)
+def _compiled_plans(workflow_type: str, params: Tuple[Tuple[str, Any], ...]) -> Tuple[RulePlan, RulePlan]:
+    """Plans for record and input rules, compiled once per rule set and parameters."""
+    rules = rule_set(workflow_type)
+    return (compile_rules([rule for rule in rules if rule.scope == "record"], dict(params)),
+            compile_rules([rule for rule in rules if rule.scope == "input"], dict(params)))
+
+def _resolve(name: str, spec: Dict[str, Any], params: Dict[str, Any], schema: Dict[str, str]) -> Dict[str, Any]:
+    """Substitute parameters into a condition and record the column kind of each field it uses."""
+    for combinator in ("all", "any"):
+        if combinator in spec:
+            return {combinator: [_resolve(name, part, params, schema) for part in spec[combinator]]}
+    if "not" in spec:
+        return {"not": _resolve(name, spec["not"], params, schema)}
+
+    field, op = spec["field"], spec["op"]
+    if op not in OPERATORS:
+        raise ValueError(f"Rule '{name}' uses unknown operator '{op}'")
+    resolved: Dict[str, Any] = {"field": field, "op": op}
+    if "param" in spec:
+        if params.get(spec["param"]) is None:
+            raise KeyError(spec["param"])
+        resolved["value"] = params[spec["param"]]
+    elif "value" in spec:
+        resolved["value"] = spec["value"]
+    elif "ref" in spec:
+        resolved["ref"] = spec["ref"]
+    elif op in COMPARISONS or op in ("in", "not_in"):
+        raise ValueError(f"Rule '{name}': operator '{op}' needs a value, param or ref")
+
+    values = resolved.get("value")
+    values = values if isinstance(values, (list, tuple)) else [values]
+    numeric = op in NUMERIC_OPERATORS or (
+        "value" in resolved and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values))
+    for column in [field] + ([resolved["ref"]] if "ref" in resolved else []):
+        if numeric:
+            schema[column] = "number"
+        else:
+            schema.setdefault(column, "text")
+    return resolved
+
+def _compile(spec: Dict[str, Any], schema: Dict[str, str], nodes: Dict[str, Predicate]) -> Predicate:
+    """A predicate for a resolved condition, shared with identical conditions compiled earlier."""
+    key = json.dumps(spec, sort_keys=True, default=str)
+    if key in nodes:
+        return nodes[key]
+
+    if "all" in spec or "any" in spec:
+        combine = np.logical_and if "all" in spec else np.logical_or
+        parts = [_compile(part, schema, nodes) for part in spec.get("all", spec.get("any"))]
+        def compute(chunk, cache):
+            return combine.reduce([part(chunk, cache) for part in parts])
+    elif "not" in spec:
+        inner = _compile(spec["not"], schema, nodes)
+        def compute(chunk, cache):
+            return ~inner(chunk, cache)
+    else:
+        compute = _leaf(spec)
+
+    def predicate(chunk: Chunk, cache: Dict[str, np.ndarray]) -> np.ndarray:
+        mask = cache.get(key)
+        if mask is None:
+            mask = cache[key] = compute(chunk, cache)
+        return mask
+
+    nodes[key] = predicate
+    return predicate
+
+def _leaf(spec: Dict[str, Any]) -> Callable[[Chunk, Dict[str, np.ndarray]], np.ndarray]:
+    field, op = spec["field"], spec["op"]
+    if op == "missing":
+        return lambda chunk, cache: chunk.columns[field].missing
+    if op == "present":
+        return lambda chunk, cache: ~chunk.columns[field].missing
+    if op == "invalid":
+        return lambda chunk, cache: chunk.columns[field].malformed
+    if op in ("in", "not_in"):
+        members = list(spec["value"]) if isinstance(spec["value"], (list, tuple)) else [spec["value"]]
+        def membership(chunk, cache):
+            column = chunk.columns[field]
+            found = np.isin(column.values, members)
+            return (found if op == "in" else ~found) & column.valid
+        return membership
+
+    compare = COMPARISONS[op]
+    if "ref" in spec:
+        other = spec["ref"]
+        def against_field(chunk, cache):
+            left, right = chunk.columns[field], chunk.columns[other]
+            return compare(left.values, right.values) & left.valid & right.valid
+        return against_field
+    value = spec["value"]
+    def against_value(chunk, cache):
+        column = chunk.columns[field]
+        return compare(column.values, value) & column.valid
+    return against_value
+
+def _benchmark(rows: int, chunk_rows: int):
+    """Validate ``rows`` synthetic financial line items against the financial rules."""
+    import random
+
+    rng = random.Random(11)
+    line_items = [
+        {"item": f"LI-{i}", "amount": round(rng.uniform(-50, 40_000), 2) if rng.random() > 0.001 else None}
+        for i in range(rows)
+    ]
+    workflow_input = {"type": "financial", "department": "Finance", "budget": 30_000, "line_items": line_items}
+
+    report = evaluate_rules("financial", workflow_input, chunk_rows)
+    print(f"📏 {report['records']} line items in {report['elapsed_ms']:.1f} ms "
+          f"({report['records_per_sec']} records/s, {report['chunks']} chunks)")
+    print(f"   Rejected: {report['rejected']}  flagged: {report['flagged']}")
+    for name, result in report["rules"].items():
+        print(f"   {name:<20} {result['action']:<7} {result['hits']:>9} hits  {result['ms']:8.2f} ms")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the compiled business rules")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of synthetic line items")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="records per chunk")
+    args = parser.parse_args()
+    _benchmark(args.rows, args.chunk_rows)
@@ -0,0 +1,85 @@
+"""
+Tests for the scheduling policy: priority classes, aging, weighted fair
+queueing and tenant caps, on their own and through a JobQueue.
+
+    python -m pytest scheduler_test.py -q
+"""
+
+from collections import Counter
+
+import pytest
+
+from job_queue import JobQueue
+from scheduler import Backlog, FifoPolicy, SchedulingPolicy
+
+NOW = 10_000.0
+
+def _backlog(priority=1, flow="standard", tenant="default", weight=1.0, waited_s=0.0):
+    return Backlog(priority, flow, tenant, weight, NOW - waited_s)
+
+def _chosen(policy, backlogs, running=None, virtual_times=None, clock=0.0):
+    choice = policy.choose(backlogs, running or {}, virtual_times or {}, clock, NOW)
+    return choice[0] if choice else None
+
+def test_place_by_workflow_type():
+    policy = SchedulingPolicy()
+    approval = policy.place({"type": "approval", "department": "Finance"})
+    assert (approval.priority_class, approval.flow, approval.tenant) == ("interactive", "approval/Finance", "Finance")
+    bulk = policy.place({"type": "data_processing", "tenant": "acme"})
+    assert (bulk.priority_class, bulk.flow, bulk.tenant) == ("bulk", "data_processing", "acme")
+    assert policy.place({"type": "data_processing"}, priority_class="interactive").priority == 0
+    with pytest.raises(ValueError):
+        policy.place({}, priority_class="urgent")
+
+def test_higher_class_goes_first():
+    bulk = _backlog(priority=2, flow="data_processing", waited_s=60)
+    interactive = _backlog(priority=0, flow="approval")
+    assert _chosen(SchedulingPolicy(), [bulk, interactive]) is interactive
+
+def test_waiting_bulk_work_ages_into_a_higher_class():
+    policy = SchedulingPolicy(aging_s=100)
+    standard = _backlog(priority=1, flow="standard", waited_s=10)
+    bulk = _backlog(priority=2, flow="data_processing", waited_s=250)
+    assert policy.effective_priority(bulk, NOW) == 0
+    assert _chosen(policy, [standard, bulk]) is bulk
+    assert _chosen(SchedulingPolicy(aging_s=None), [standard, bulk]) is standard
+
+def test_lowest_virtual_time_goes_first_within_a_class():
+    behind, ahead = _backlog(flow="a"), _backlog(flow="b")
+    assert _chosen(SchedulingPolicy(), [ahead, behind], virtual_times={"a": 1.0, "b": 3.0}, clock=1.0) is behind
+
+def test_capped_tenant_is_skipped():
+    policy = SchedulingPolicy(tenant_caps={"busy": 1})
+    busy, other = _backlog(tenant="busy", priority=0), _backlog(tenant="other", priority=2)
+    assert _chosen(policy, [busy, other], running={"busy": 1}) is other
+    assert _chosen(policy, [busy], running={"busy": 1}) is None
+
+def test_fifo_takes_the_oldest():
+    old, new = _backlog(priority=2, waited_s=30), _backlog(priority=0, waited_s=1)
+    assert _chosen(FifoPolicy(), [new, old]) is old
+
+def test_queue_shares_leases_by_flow_weight(tmp_path):
+    policy = SchedulingPolicy(type_weights={"financial": 2.0, "standard": 1.0})
+    queue = JobQueue(str(tmp_path / "jobs.db"), policy=policy)
+    for i in range(30):
+        queue.submit(f"fin-{i}", {"type": "financial"}, stage="planning")
+        queue.submit(f"std-{i}", {"type": "standard"}, stage="planning")
+    leased = Counter(queue.lease("w").workflow_id.split("-")[0] for _ in range(30))
+    # Both are standard-class flows; financial has twice the weight
+    assert leased == {"fin": 20, "std": 10}
+
+def test_queue_leases_interactive_work_ahead_of_a_bulk_flood(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    for i in range(20):
+        queue.submit(f"bulk-{i}", {"type": "data_processing"}, stage="planning")
+    queue.submit("approval", {"type": "approval"}, stage="planning")
+    assert queue.lease("w").workflow_id == "approval"
+
+def test_queue_enforces_tenant_caps(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), policy=SchedulingPolicy(default_tenant_cap=1))
+    for i in range(3):
+        queue.submit(f"a-{i}", {"type": "standard", "tenant": "a"}, stage="planning")
+    queue.submit("b-0", {"type": "standard", "tenant": "b"}, stage="planning")
+    leased = {queue.lease("w").tenant, queue.lease("w").tenant}
+    assert leased == {"a", "b"}
+    assert queue.lease("w") is None
@@ -0,0 +1,174 @@
+"""
+Stage Result Cache
+==================
+
+Recurring workflows often run with exactly the same input (a nightly
+``inventory_check``, repeat ``financial`` requests from one department), and
+the planning, data processing and approval stages then ask their agent the
+same question every time. A StageCache keeps each stage's agent output in a
+local SQLite file, keyed by:
+
+- the stage
+- a hash of the stage agent's configuration (model, instructions, tools,
+  settings), so changing the agent invalidates its entries
+- a hash of the canonical workflow input (keys sorted, so key order does not
+  matter)
+- the token budget the input was rendered within for the prompt, since a
+  smaller budget summarizes more of it
+- the model backend and model that answered (``AGNO_MODEL_BACKEND``), so
+  stub answers are never served to a real-model run and vice versa
+
+Entries expire after ``ttl_seconds``. Caching is opt-in:
+
+    cache = StageCache(ttl_seconds=24 * 3600)
+    workflow = ComplexWorkflow("nightly_inventory", WorkflowStateManager(), stage_cache=cache)
+    result = workflow.run_workflow(workflow_input)
+    print(result["cached_stages"])     # stages served from the cache
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+# Make the shared helpers at the repository root importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.models import get_model_backend
+
+if TYPE_CHECKING:
+    from agno.models.base import Model
+
+# Bump when the stage prompts change, so outputs of the old prompts are not reused
+STAGE_CACHE_VERSION = 2
+
+def model_identity(model: "Model") -> str:
+    """The configured backend, and the class, provider and ID of ``model``."""
+    return "/".join(str(part) for part in (get_model_backend(), type(model).__name__,
+                                           getattr(model, "provider", None), getattr(model, "id", None)))
+
+def stage_cache_key(stage: str, agent_config_hash: str, input_fingerprint: str,
+                    prompt_token_budget: int, model: str) -> str:
+    """
+    The cache key of one stage's output for one agent configuration and input.
+
+    ``input_fingerprint`` is the hash of the canonical workflow input
+    (``prompt_inputs.input_fingerprint``), computed once per workflow.
+    ``prompt_token_budget`` is the budget the input was rendered within and
+    ``model`` the answering model's ``model_identity``.
+    """
+    parts = f"{STAGE_CACHE_VERSION}:{stage}:{agent_config_hash}:{input_fingerprint}:{prompt_token_budget}:{model}"
+    return hashlib.sha256(parts.encode("utf-8")).hexdigest()
+
+class StageCache:
+    """Persistent, TTL-bound store of stage outputs."""
+
+    def __init__(self, db_file: str = "workflow_stage_cache.db", ttl_seconds: float = 24 * 3600):
+        """
+        Args:
+            db_file: Path to the SQLite database file
+            ttl_seconds: How long an entry may be served after it was stored
+        """
+        self.db_file = db_file
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.init_database()
+
+    @classmethod
+    def from_env(cls) -> Optional["StageCache"]:
+        """
+        A cache from AGNO_STAGE_CACHE_TTL_S and AGNO_STAGE_CACHE_FILE, or None
+        when AGNO_STAGE_CACHE_TTL_S is not set (caching is off by default).
+        """
+        ttl = os.getenv("AGNO_STAGE_CACHE_TTL_S")
+        if not ttl:
+            return None
+        return cls(db_file=os.getenv("AGNO_STAGE_CACHE_FILE", "workflow_stage_cache.db"), ttl_seconds=float(ttl))
+
+    def init_database(self):
+        """Create the cache table."""
+        conn = sqlite3.connect(self.db_file)
+        with conn:
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS stage_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    stage TEXT NOT NULL,
+                    output TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_stage_cache_expires ON stage_cache (expires_at)')
+        conn.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The stored output for ``key``, or None if there is none or it has expired."""
+        conn = sqlite3.connect(self.db_file)
+        with conn:
+            row = conn.execute('SELECT output, created_at FROM stage_cache WHERE cache_key = ? AND expires_at > ?',
+                               (key, time.time())).fetchone()
+            if row is not None:
+                conn.execute('UPDATE stage_cache SET hits = hits + 1 WHERE cache_key = ?', (key,))
+        conn.close()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        output = json.loads(row[0])
+        output["cached_at"] = row[1]
+        return output
+
+    def put(self, key: str, stage: str, output: Dict[str, Any]):
+        """Store a stage's output, replacing any earlier entry for the key."""
+        now = time.time()
+        conn = sqlite3.connect(self.db_file)
+        with conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO stage_cache (cache_key, stage, output, created_at, expires_at, hits)
+                VALUES (?, ?, ?, ?, ?, 0)
+            ''', (key, stage, json.dumps(output), now, now + self.ttl_seconds))
+        conn.close()
+
+    def purge_expired(self) -> int:
+        """Delete expired entries; returns how many were removed."""
+        conn = sqlite3.connect(self.db_file)
+        with conn:
+            removed = conn.execute('DELETE FROM stage_cache WHERE expires_at <= ?', (time.time(),)).rowcount
+        conn.close()
+        return removed
+
+    def clear(self, stage: Optional[str] = None):
+        """Drop every entry, or only those of ``stage``."""
+        conn = sqlite3.connect(self.db_file)
+        with conn:
+            if stage is None:
+                conn.execute('DELETE FROM stage_cache')
+            else:
+                conn.execute('DELETE FROM stage_cache WHERE stage = ?', (stage,))
+        conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits and misses in this process, and live entries per stage."""
+        conn = sqlite3.connect(self.db_file)
+        rows = conn.execute('SELECT stage, COUNT(*) FROM stage_cache WHERE expires_at > ? GROUP BY stage',
+                            (time.time(),)).fetchall()
+        conn.close()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": dict(rows),
+                "ttl_seconds": self.ttl_seconds,
+            }
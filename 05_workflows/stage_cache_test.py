@@ -0,0 +1,63 @@
+"""
+Tests for the stage result cache: what invalidates an entry, and expiry.
+
+    python -m pytest stage_cache_test.py -q
+"""
+
+import time
+
+import pytest
+
+from stage_cache import StageCache, model_identity, stage_cache_key
+from shared.stub_model import StubModel
+
+KEY_PARTS = ("planning", "config-hash", "input-fingerprint", 1000, "stub/StubModel/Stub/gpt-4o")
+
+@pytest.fixture
+def cache(tmp_path):
+    return StageCache(db_file=str(tmp_path / "cache.db"), ttl_seconds=60)
+
+def test_key_is_stable():
+    assert stage_cache_key(*KEY_PARTS) == stage_cache_key(*KEY_PARTS)
+
+@pytest.mark.parametrize("index, changed", [
+    (0, "approval"),
+    (1, "other-config-hash"),
+    (2, "other-input-fingerprint"),
+    (3, 500),
+    (4, "openai/OpenAIChat/OpenAI/gpt-4o"),
+])
+def test_every_key_part_invalidates(index, changed):
+    parts = list(KEY_PARTS)
+    parts[index] = changed
+    assert stage_cache_key(*parts) != stage_cache_key(*KEY_PARTS)
+
+def test_model_identity_names_the_backend_and_model(monkeypatch):
+    monkeypatch.setenv("AGNO_MODEL_BACKEND", "stub")
+    identity = model_identity(StubModel.from_env("gpt-4o-mini"))
+    assert identity.startswith("stub/StubModel/")
+    assert identity.endswith("gpt-4o-mini")
+    monkeypatch.setenv("AGNO_MODEL_BACKEND", "openai")
+    assert model_identity(StubModel.from_env("gpt-4o-mini")) != identity
+
+def test_put_then_get(cache):
+    key = stage_cache_key(*KEY_PARTS)
+    assert cache.get(key) is None
+    cache.put(key, "planning", {"content": "plan"})
+    assert cache.get(key)["content"] == "plan"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_expired_entries_are_not_served_and_are_purged(tmp_path):
+    cache = StageCache(db_file=str(tmp_path / "cache.db"), ttl_seconds=0.05)
+    key = stage_cache_key(*KEY_PARTS)
+    cache.put(key, "planning", {"content": "plan"})
+    time.sleep(0.1)
+    assert cache.get(key) is None
+    assert cache.purge_expired() == 1
+
+def test_clear_one_stage(cache):
+    cache.put("a", "planning", {"content": "plan"})
+    cache.put("b", "approval", {"content": "ok"})
+    cache.clear("planning")
+    assert cache.get("a") is None
+    assert cache.get("b")["content"] == "ok"
@@ -7,17 +7,23 @@ This script provides a simple visual representation of the workflow structure
 and execution flow in the terminal.
 """
 
+import argparse
 import time
 import os
 
+# Seconds per progress dot in print_stage; --no-sleep sets it to 0
+STAGE_DELAY_SECONDS = 1.0
+
 def print_header(title):
     """Print a formatted header."""
     print("\n" + "=" * 80)
     print(f" {title}")
     print("=" * 80)
 
-def print_stage(stage_name, description, duration=1):
+def print_stage(stage_name, description, duration=None):
     """Print a workflow stage with visual elements."""
+    if duration is None:
+        duration = STAGE_DELAY_SECONDS
     print(f"\n🔄 [{stage_name.upper()}]")
     print("-" * 50)
     print(f"📋 {description}")
@@ -25,7 +31,8 @@ def print_stage(stage_name, description, duration=1):
     # Simulate stage execution
     print("⏳ Executing...", end="", flush=True)
     for i in range(3):
-        time.sleep(duration)
+        if duration > 0:
+            time.sleep(duration)
         print(".", end="", flush=True)
     print(" ✅")
     
@@ -312,8 +319,16 @@ def print_key_insights():
     print("    • Each workflow has unique identifier")
     print("    • States include stage data and completion status")
 
-def main():
+def main(argv=None):
     """Main function to run the workflow visualization."""
+    global STAGE_DELAY_SECONDS
+    parser = argparse.ArgumentParser(description="Visualize the workflow system in the terminal")
+    parser.add_argument("--no-sleep", action="store_true", help="Print every stage without the simulated delay")
+    parser.add_argument("--stage-delay", type=float, default=STAGE_DELAY_SECONDS,
+                        help="Seconds per progress dot when simulating a stage (default: %(default)s)")
+    args = parser.parse_args(argv)
+    STAGE_DELAY_SECONDS = 0 if args.no_sleep else args.stage_delay
+    
     print_header("WORKFLOW VISUALIZATION GUIDE")
     print("This guide provides visual representations of the complex workflow system.")
     
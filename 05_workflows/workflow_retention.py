@@ -0,0 +1,104 @@
+"""
+Workflow Retention
+==================
+
+Keeps ``workflow_states.db`` bounded by archiving finished workflows.
+
+Completed and failed workflows older than the policy's ``max_age`` are moved
+into compressed archive segments (still readable through
+``WorkflowStateManager.load_state`` and ``query_workflows(include_archived=True)``),
+their live rows and indexes are pruned, and freed pages are returned to the
+filesystem with small incremental VACUUM steps so writers are never blocked
+for long.
+
+Example:
+    manager = WorkflowStateManager()
+    worker = RetentionWorker(manager, RetentionPolicy(max_age=timedelta(days=7)))
+    worker.start()
+    ...
+    worker.stop()
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+
+from workflow_state import WorkflowStateManager
+
+@dataclass
+class RetentionPolicy:
+    """How long finished workflows stay in the live tables and how cleanup is paced."""
+    max_age: timedelta = timedelta(days=7)
+    statuses: Tuple[str, ...] = ("completed", "failed")
+    segment_size: int = 500  # workflows per archive segment (one transaction each)
+    vacuum_pages: int = 200  # pages released per incremental VACUUM step
+    step_pause_seconds: float = 0.05  # pause between steps so writers can get in
+
+def apply_retention(manager: WorkflowStateManager, policy: RetentionPolicy,
+                    stop_event: threading.Event = None) -> Dict[str, int]:
+    """
+    Archive every eligible workflow, then release freed pages.
+
+    Work is done in short steps (one archive segment or one VACUUM step at a
+    time) so it can run next to live workflows.
+
+    Returns:
+        Counts of archived workflows, archive segments written and pages vacuumed.
+    """
+    stats = {"archived_workflows": 0, "segments_written": 0, "pages_vacuumed": 0}
+    cutoff = datetime.now() - policy.max_age
+
+    while not (stop_event and stop_event.is_set()):
+        archived = manager.archive_workflows(cutoff, statuses=policy.statuses, batch_size=policy.segment_size)
+        if not archived:
+            break
+        stats["archived_workflows"] += archived
+        stats["segments_written"] += 1
+        time.sleep(policy.step_pause_seconds)
+
+    remaining = manager.free_page_count() if stats["archived_workflows"] else 0
+    while remaining and not (stop_event and stop_event.is_set()):
+        left = manager.incremental_vacuum(policy.vacuum_pages)
+        stats["pages_vacuumed"] += remaining - left
+        # No progress means the database is not in incremental auto-vacuum mode
+        if left >= remaining:
+            break
+        remaining = left
+        time.sleep(policy.step_pause_seconds)
+
+    return stats
+
+class RetentionWorker:
+    """Runs apply_retention periodically on a background thread."""
+
+    def __init__(self, manager: WorkflowStateManager, policy: RetentionPolicy = None,
+                 interval_seconds: float = 3600):
+        self.manager = manager
+        self.policy = policy or RetentionPolicy()
+        self.interval_seconds = interval_seconds
+        self.last_stats: Dict[str, int] = {}
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="workflow-retention", daemon=True)
+
+    def start(self):
+        """Start the background retention loop."""
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """Ask the worker to stop after its current step and wait for it."""
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.last_stats = apply_retention(self.manager, self.policy, self._stop_event)
+                if self.last_stats["archived_workflows"]:
+                    print(f"🗄️ Retention: archived {self.last_stats['archived_workflows']} workflows "
+                          f"in {self.last_stats['segments_written']} segments, "
+                          f"released {self.last_stats['pages_vacuumed']} pages")
+            except Exception as e:
+                print(f"Error applying workflow retention: {e}")
+            self._stop_event.wait(self.interval_seconds)
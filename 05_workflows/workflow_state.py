@@ -0,0 +1,856 @@
+"""
+Workflow State Persistence
+==========================
+
+SQLite-backed state management for the Level 5 workflows.
+
+The database holds two tables:
+- ``workflow_states``: one slim header row per workflow (current stage, status,
+  timestamps), updated in place on every stage transition
+- ``workflow_stage_results``: an append-only log with one row per stage attempt
+  (status, timing, performance metrics and the stage payload), so the full
+  stage history is kept and each transition writes a constant amount of data
+
+Writes go through a configurable durability policy:
+- ``sync``: every write is committed before the call returns (default)
+- ``group-commit``: writes from many workflows are batched into one commit
+  every few milliseconds; callers still wait until their batch is on disk
+- ``async``: writes are queued and return immediately; the queue is flushed
+  periodically, when a workflow reaches a terminal stage, on ``flush()`` and at
+  shutdown, so at most one flush interval of updates can be lost on a crash
+
+A write to a workflow that ``archive_workflows()`` moved out first moves it
+back into the live tables, in the same transaction, so a rerun of an archived
+workflow continues its stage history instead of orphaning new rows.
+"""
+
+import atexit
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+DURABILITY_LEVELS = ("sync", "group-commit", "async")
+
+# Indexes backing WorkflowStateManager.query_workflows
+QUERY_INDEXES = {
+    "idx_states_status_updated": "status, updated_at",
+    "idx_states_type_status_updated": "workflow_type, status, updated_at",
+    "idx_states_stage_updated": "current_stage, updated_at",
+    "idx_states_created": "created_at",
+}
+
+ARCHIVE_INDEXES = {
+    "idx_archive_status_updated": "status, updated_at",
+    "idx_archive_type_status_updated": "workflow_type, status, updated_at",
+}
+
+# Columns query_workflows can sort by
+SORTABLE_COLUMNS = ("created_at", "updated_at", "workflow_id", "status", "current_stage")
+
+# Keep IN (...) lists below SQLite's bound-parameter limit
+_MAX_QUERY_PARAMS = 500
+
+@dataclass
+class WorkflowState:
+    """Represents the current state of a workflow."""
+    workflow_id: str
+    current_stage: str
+    stage_data: Dict[str, Any]
+    completed_stages: List[str]
+    failed_stages: List[str]
+    workflow_data: Dict[str, Any]
+    created_at: str
+    updated_at: str
+    status: str  # 'running', 'completed', 'failed', 'paused'
+    # Performance metrics of each stage's latest attempt (wall time, model
+    # latency, tokens, DB write time, retries)
+    stage_metrics: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for storage."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'WorkflowState':
+        """Create from dictionary."""
+        return cls(**data)
+
+@dataclass
+class _PendingWrite:
+    """A group of statements that must be committed together."""
+    statements: List[Tuple[str, tuple]]
+    # Workflow the statements write to, restored first if it was archived
+    workflow_id: Optional[str] = None
+    done: threading.Event = field(default_factory=threading.Event)
+    error: Optional[Exception] = None
+    # Position in the writer's queue, assigned on submit
+    seq: int = 0
+
+def _read_archived_records(cursor: sqlite3.Cursor, workflow_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Decompress the archive segments holding the given workflows."""
+    segments: Dict[int, List[str]] = {}
+    for start in range(0, len(workflow_ids), _MAX_QUERY_PARAMS):
+        chunk = workflow_ids[start:start + _MAX_QUERY_PARAMS]
+        cursor.execute(f'''
+            SELECT workflow_id, segment_id FROM workflow_archive_index
+            WHERE workflow_id IN ({", ".join("?" * len(chunk))})
+        ''', chunk)
+        for workflow_id, segment_id in cursor.fetchall():
+            segments.setdefault(segment_id, []).append(workflow_id)
+
+    records: Dict[str, Dict[str, Any]] = {}
+    for segment_id, wanted in segments.items():
+        cursor.execute('SELECT payload FROM workflow_archive_segments WHERE segment_id = ?', (segment_id,))
+        row = cursor.fetchone()
+        if not row:
+            continue
+        wanted_ids = set(wanted)
+        for record in json.loads(zlib.decompress(row[0]).decode("utf-8")):
+            if record["state"]["workflow_id"] in wanted_ids:
+                records[record["state"]["workflow_id"]] = record
+    return records
+
+def _restore_archived(conn: sqlite3.Connection, workflow_ids: List[str]):
+    """
+    Move archived workflows back into the live tables and drop their index
+    rows, inside the caller's transaction. Their copy in the segment is left
+    behind; without an index row nothing reads it.
+    """
+    records = _read_archived_records(conn.cursor(), workflow_ids)
+    for workflow_id, record in records.items():
+        state = record["state"]
+        conn.execute('''
+            INSERT OR REPLACE INTO workflow_states
+            (workflow_id, current_stage, stage_data, completed_stages,
+             failed_stages, workflow_data, workflow_type, created_at, updated_at, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            workflow_id,
+            state["current_stage"],
+            json.dumps(state["stage_data"]),
+            json.dumps(state["completed_stages"]),
+            json.dumps(state["failed_stages"]),
+            json.dumps(state["workflow_data"]),
+            state["workflow_data"].get("type"),
+            state["created_at"],
+            state["updated_at"],
+            state["status"]
+        ))
+        conn.execute('DELETE FROM workflow_stage_results WHERE workflow_id = ?', (workflow_id,))
+        conn.executemany('''
+            INSERT INTO workflow_stage_results
+            (workflow_id, stage, attempt, status, started_at, finished_at, duration_ms, payload, metrics)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (workflow_id, result["stage"], result["attempt"], result["status"], result["started_at"],
+             result["finished_at"], result["duration_ms"], json.dumps(result["payload"]),
+             json.dumps(result["metrics"]) if result["metrics"] else None)
+            for result in record["stage_history"]
+        ])
+        conn.execute('DELETE FROM workflow_archive_index WHERE workflow_id = ?', (workflow_id,))
+
+def _apply_writes(conn: sqlite3.Connection, writes: List[_PendingWrite]):
+    """Commit writes in one transaction, restoring the archived workflows they touch first."""
+    with conn:
+        # Take the write lock before checking the archive, so archive_workflows()
+        # cannot move a workflow out between the check and the write
+        conn.execute('BEGIN IMMEDIATE')
+        workflow_ids = list({write.workflow_id for write in writes if write.workflow_id})
+        if workflow_ids:
+            _restore_archived(conn, workflow_ids)
+        for write in writes:
+            for sql, params in write.statements:
+                conn.execute(sql, params)
+
+class _StateWriter:
+    """Background thread that commits queued writes in batches."""
+
+    def __init__(self, db_file: str, interval_ms: float):
+        self.db_file = db_file
+        self.interval = interval_ms / 1000
+        self._queue: List[_PendingWrite] = []
+        self._condition = threading.Condition()
+        # Writes submitted and writes committed (or failed) so far; flush waits for the two to meet
+        self._submitted = 0
+        self._committed = 0
+        # Errors of queued writes nobody waited for, until take_errors()
+        self._errors: List[Exception] = []
+        self._flush_requested = False
+        self._stopped = False
+        # Transactions committed, for checking that writes are batched
+        self.commits = 0
+        self._thread = threading.Thread(target=self._run, name="workflow-state-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, write: _PendingWrite, urgent: bool = False):
+        """Queue a write; urgent writes wake the writer immediately."""
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("Workflow state writer has been closed")
+            self._submitted += 1
+            write.seq = self._submitted
+            self._queue.append(write)
+            if urgent:
+                self._flush_requested = True
+            # Wake the writer for the first write of a batch or an urgent one; other
+            # writes just join the batch it is collecting
+            if urgent or len(self._queue) == 1:
+                self._condition.notify_all()
+
+    def flush(self):
+        """
+        Block until every write submitted so far has been committed, including
+        a batch the writer is committing right now.
+        """
+        with self._condition:
+            target = self._submitted
+            if self._committed < target:
+                self._flush_requested = True
+                self._condition.notify_all()
+            while self._committed < target:
+                self._condition.wait()
+
+    def take_errors(self) -> List[Exception]:
+        """Errors of failed writes since the last call."""
+        with self._condition:
+            errors, self._errors = self._errors, []
+        return errors
+
+    def close(self):
+        """Commit outstanding writes and stop the writer thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_file)
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopped:
+                    self._condition.wait()
+                # Let more writes accumulate for one interval unless a flush is
+                # requested; new writes arriving meanwhile do not cut it short
+                deadline = time.monotonic() + self.interval
+                while not self._flush_requested and not self._stopped:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._queue = self._queue, []
+                self._flush_requested = False
+                stopped = self._stopped
+            if batch:
+                self._commit(conn, batch)
+                with self._condition:
+                    self._committed = batch[-1].seq
+                    self._errors.extend(write.error for write in batch if write.error)
+                    self._condition.notify_all()
+            elif stopped:
+                break
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[_PendingWrite]):
+        self.commits += 1
+        try:
+            _apply_writes(conn, batch)
+        except Exception:
+            # The batch spans workflows; commit each write on its own so one
+            # bad write does not roll back everyone else's
+            for write in batch:
+                try:
+                    _apply_writes(conn, [write])
+                except Exception as e:
+                    print(f"Error committing workflow state write: {e}")
+                    write.error = e
+        for write in batch:
+            write.done.set()
+
+class WorkflowStateManager:
+    """Manages workflow state persistence and retrieval."""
+
+    def __init__(self, db_file: str = "workflow_states.db", durability: str = "sync",
+                 group_commit_interval_ms: float = 10, async_flush_interval_ms: float = 1000):
+        """
+        Initialize the state manager.
+
+        Args:
+            db_file: Path to the SQLite database file
+            durability: One of 'sync', 'group-commit' or 'async'
+            group_commit_interval_ms: How long a group commit waits to collect writes
+            async_flush_interval_ms: Upper bound on how long async writes stay queued
+        """
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level '{durability}', expected one of {DURABILITY_LEVELS}")
+
+        self.db_file = db_file
+        self.durability = durability
+        self.init_database()
+
+        self._writer: Optional[_StateWriter] = None
+        if durability == "group-commit":
+            self._writer = _StateWriter(db_file, group_commit_interval_ms)
+        elif durability == "async":
+            self._writer = _StateWriter(db_file, async_flush_interval_ms)
+        if self._writer:
+            atexit.register(self.close)
+
+    def init_database(self):
+        """Initialize the SQLite database for workflow states."""
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        # Incremental auto-vacuum only takes effect on a new, empty database;
+        # WAL lets readers and the background vacuum run alongside writers
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('PRAGMA journal_mode = WAL')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS workflow_states (
+                workflow_id TEXT PRIMARY KEY,
+                current_stage TEXT,
+                stage_data TEXT,
+                completed_stages TEXT,
+                failed_stages TEXT,
+                workflow_data TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                status TEXT,
+                workflow_type TEXT
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS workflow_stage_results (
+                result_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                workflow_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                attempt INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                duration_ms REAL,
+                payload TEXT,
+                metrics TEXT
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_stage_results_workflow
+            ON workflow_stage_results (workflow_id, stage)
+        ''')
+
+        # workflow_data.type is denormalized onto the header so it can be indexed;
+        # databases created before the column existed are migrated in place
+        cursor.execute('PRAGMA table_info(workflow_states)')
+        if "workflow_type" not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE workflow_states ADD COLUMN workflow_type TEXT')
+            cursor.execute('''
+                UPDATE workflow_states SET workflow_type = json_extract(workflow_data, '$.type')
+                WHERE json_valid(workflow_data)
+            ''')
+
+        cursor.execute('PRAGMA table_info(workflow_stage_results)')
+        if "metrics" not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE workflow_stage_results ADD COLUMN metrics TEXT')
+
+        for name, columns in QUERY_INDEXES.items():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON workflow_states ({columns})')
+
+        # Finished workflows moved out of the live tables by archive_workflows().
+        # Each segment holds a zlib-compressed JSON batch of states and their
+        # stage history; the index row keeps them queryable without decompressing
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS workflow_archive_segments (
+                segment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT,
+                workflow_count INTEGER,
+                oldest_updated_at TEXT,
+                newest_updated_at TEXT,
+                payload BLOB
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS workflow_archive_index (
+                workflow_id TEXT PRIMARY KEY,
+                segment_id INTEGER NOT NULL,
+                current_stage TEXT,
+                workflow_type TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                status TEXT
+            )
+        ''')
+
+        for name, columns in ARCHIVE_INDEXES.items():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON workflow_archive_index ({columns})')
+
+        conn.commit()
+        conn.close()
+
+    def _write(self, workflow_id: str, statements: List[Tuple[str, tuple]], urgent: bool = False):
+        """Apply a group of statements to one workflow according to the durability policy."""
+        write = _PendingWrite(statements, workflow_id)
+        if self._writer is None:
+            conn = sqlite3.connect(self.db_file)
+            try:
+                _apply_writes(conn, [write])
+            finally:
+                conn.close()
+            return
+
+        self._writer.submit(write, urgent=urgent)
+        if self.durability == "group-commit":
+            write.done.wait()
+            if write.error:
+                raise write.error
+
+    def flush(self):
+        """
+        Commit any queued writes (no-op for synchronous durability). Raises the
+        error of a queued write that could not be committed.
+        """
+        self._wait_for_writes()
+        errors = self._writer.take_errors() if self._writer else []
+        if errors:
+            raise errors[0]
+
+    def _wait_for_writes(self):
+        """Make every write submitted so far visible to reads."""
+        if self._writer:
+            self._writer.flush()
+
+    def close(self):
+        """Commit queued writes and stop the background writer."""
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+            atexit.unregister(self.close)
+
+    def save_state(self, state: WorkflowState):
+        """Save a full snapshot of the workflow state (header row) to the database."""
+        self._write(state.workflow_id, [('''
+            INSERT OR REPLACE INTO workflow_states
+            (workflow_id, current_stage, stage_data, completed_stages,
+             failed_stages, workflow_data, workflow_type, created_at, updated_at, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            state.workflow_id,
+            state.current_stage,
+            json.dumps(state.stage_data),
+            json.dumps(state.completed_stages),
+            json.dumps(state.failed_stages),
+            json.dumps(state.workflow_data),
+            state.workflow_data.get("type"),
+            state.created_at,
+            state.updated_at,
+            state.status
+        ))])
+
+    def set_workflow_data(self, workflow_id: str, workflow_data: Dict[str, Any]):
+        """Store the workflow input on the header row without rewriting anything else."""
+        self._write(workflow_id, [('''
+            UPDATE workflow_states SET workflow_data = ?, workflow_type = ?
+            WHERE workflow_id = ?
+        ''', (json.dumps(workflow_data), workflow_data.get("type"), workflow_id))])
+
+    def record_stage_result(self, workflow_id: str, stage: str, status: str,
+                            payload: Dict[str, Any], started_at: str, finished_at: str,
+                            duration_ms: float, workflow_status: str,
+                            metrics: Optional[Dict[str, Any]] = None):
+        """
+        Append one stage attempt and update the header row in place.
+
+        Only the new stage payload and metrics and the header's current stage,
+        status and timestamp are written, regardless of how many stages ran
+        before. The attempt number is assigned when the write is committed.
+        """
+        self._write(workflow_id, [
+            ('''
+                INSERT INTO workflow_stage_results
+                (workflow_id, stage, attempt, status, started_at, finished_at, duration_ms, payload, metrics)
+                SELECT ?, ?, COUNT(*) + 1, ?, ?, ?, ?, ?, ?
+                FROM workflow_stage_results WHERE workflow_id = ? AND stage = ?
+            ''', (
+                workflow_id,
+                stage,
+                status,
+                started_at,
+                finished_at,
+                duration_ms,
+                json.dumps(payload),
+                json.dumps(metrics) if metrics is not None else None,
+                workflow_id,
+                stage
+            )),
+            ('''
+                UPDATE workflow_states
+                SET current_stage = ?, status = ?, updated_at = ?
+                WHERE workflow_id = ?
+            ''', (stage, workflow_status, finished_at, workflow_id)),
+        ], urgent=workflow_status in ("completed", "failed"))
+
+    def update_stage_metrics(self, workflow_id: str, stage: str, metrics: Dict[str, Any]):
+        """
+        Merge ``metrics`` into the metrics of a stage's latest attempt.
+
+        Used for measurements only known after the attempt was recorded, such
+        as how long recording it took. The update is never urgent, so with
+        group-commit or async durability it rides along with the next batch.
+        """
+        self._write(workflow_id, [('''
+            UPDATE workflow_stage_results
+            SET metrics = json_patch(COALESCE(metrics, '{}'), ?)
+            WHERE result_id = (
+                SELECT MAX(result_id) FROM workflow_stage_results WHERE workflow_id = ? AND stage = ?
+            )
+        ''', (json.dumps(metrics), workflow_id, stage))])
+
+    def get_stage_history(self, workflow_id: str) -> List[Dict[str, Any]]:
+        """Return every recorded stage attempt for a workflow, oldest first."""
+        self._wait_for_writes()
+        history = self._load_stage_histories([workflow_id]).get(workflow_id)
+        if history is None:
+            record = self._load_archived_records([workflow_id]).get(workflow_id)
+            history = record["stage_history"] if record else []
+        return history
+
+    def load_state(self, workflow_id: str) -> Optional[WorkflowState]:
+        """Load workflow state from database."""
+        return self.load_states([workflow_id]).get(workflow_id)
+
+    def load_states(self, workflow_ids: List[str]) -> Dict[str, WorkflowState]:
+        """
+        Load many workflow states with one query per table.
+
+        Returns:
+            A dictionary of workflow_id to state; unknown IDs are omitted.
+        """
+        self._wait_for_writes()
+        conn = sqlite3.connect(self.db_file)
+        states = self._load_live_states(conn.cursor(), workflow_ids)
+        conn.close()
+
+        # Anything not in the live tables may have been archived
+        missing = [workflow_id for workflow_id in workflow_ids if workflow_id not in states]
+        if missing:
+            for workflow_id, record in self._load_archived_records(missing).items():
+                states[workflow_id] = WorkflowState.from_dict(record["state"])
+        return states
+
+    def _load_live_states(self, cursor: sqlite3.Cursor, workflow_ids: List[str]) -> Dict[str, WorkflowState]:
+        """Build the states of the given workflows from the live tables."""
+        rows: Dict[str, tuple] = {}
+        results: Dict[str, List[tuple]] = {}
+        for start in range(0, len(workflow_ids), _MAX_QUERY_PARAMS):
+            chunk = list(workflow_ids[start:start + _MAX_QUERY_PARAMS])
+            placeholders = ", ".join("?" * len(chunk))
+
+            cursor.execute(f'''
+                SELECT workflow_id, current_stage, stage_data, completed_stages, failed_stages,
+                       workflow_data, created_at, updated_at, status
+                FROM workflow_states WHERE workflow_id IN ({placeholders})
+            ''', chunk)
+            for row in cursor.fetchall():
+                rows[row[0]] = row[1:]
+
+            cursor.execute(f'''
+                SELECT workflow_id, stage, status, finished_at, payload, metrics
+                FROM workflow_stage_results
+                WHERE workflow_id IN ({placeholders})
+                ORDER BY result_id
+            ''', chunk)
+            for row in cursor.fetchall():
+                results.setdefault(row[0], []).append(row[1:])
+
+        states = {
+            workflow_id: self._build_state(workflow_id, row, results.get(workflow_id, []))
+            for workflow_id, row in rows.items()
+        }
+        return states
+
+    def query_workflows(self, status: Optional[Union[str, List[str]]] = None,
+                        current_stage: Optional[Union[str, List[str]]] = None,
+                        workflow_type: Optional[Union[str, List[str]]] = None,
+                        created_after: Optional[Union[str, datetime]] = None,
+                        created_before: Optional[Union[str, datetime]] = None,
+                        updated_after: Optional[Union[str, datetime]] = None,
+                        updated_before: Optional[Union[str, datetime]] = None,
+                        order_by: str = "updated_at", descending: bool = True,
+                        limit: Optional[int] = None,
+                        include_archived: bool = False) -> List[WorkflowState]:
+        """
+        Find workflows matching all of the given filters.
+
+        Args:
+            status: Status or list of statuses to match
+            current_stage: Stage or list of stages to match
+            workflow_type: Value(s) of ``workflow_data["type"]`` to match
+            created_after / created_before: Inclusive bounds on ``created_at``
+            updated_after / updated_before: Inclusive bounds on ``updated_at``
+            order_by: One of SORTABLE_COLUMNS
+            descending: Sort newest/highest first
+            limit: Maximum number of workflows to return
+            include_archived: Also search workflows moved out by archive_workflows()
+
+        Example:
+            # All failed financial workflows in the last hour
+            manager.query_workflows(status="failed", workflow_type="financial",
+                                    updated_after=datetime.now() - timedelta(hours=1))
+        """
+        if order_by not in SORTABLE_COLUMNS:
+            raise ValueError(f"Cannot sort by '{order_by}', expected one of {SORTABLE_COLUMNS}")
+
+        clauses: List[str] = []
+        params: List[Any] = []
+
+        for column, value in (("status", status), ("current_stage", current_stage),
+                              ("workflow_type", workflow_type)):
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+        for column, operator, value in (("created_at", ">=", created_after), ("created_at", "<=", created_before),
+                                        ("updated_at", ">=", updated_after), ("updated_at", "<=", updated_before)):
+            if value is None:
+                continue
+            clauses.append(f"{column} {operator} ?")
+            params.append(value.isoformat() if isinstance(value, datetime) else value)
+
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        order = f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+        limit_clause = " LIMIT ?" if limit is not None else ""
+        limit_params = [limit] if limit is not None else []
+
+        self._wait_for_writes()
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT workflow_id, {order_by} FROM workflow_states{where}{order}{limit_clause}",
+                       params + limit_params)
+        matches = cursor.fetchall()
+        if include_archived:
+            cursor.execute(f"SELECT workflow_id, {order_by} FROM workflow_archive_index{where}{order}{limit_clause}",
+                           params + limit_params)
+            matches += cursor.fetchall()
+            matches.sort(key=lambda match: (match[1] is not None, match[1]), reverse=descending)
+            if limit is not None:
+                matches = matches[:limit]
+        conn.close()
+
+        workflow_ids = [match[0] for match in matches]
+        states = self.load_states(workflow_ids)
+        return [states[workflow_id] for workflow_id in workflow_ids if workflow_id in states]
+
+    def archive_workflows(self, older_than: Union[str, datetime],
+                          statuses: Tuple[str, ...] = ("completed", "failed"),
+                          batch_size: int = 500) -> int:
+        """
+        Move one batch of finished workflows into a compressed archive segment.
+
+        Workflows whose status is in ``statuses`` and that were last updated
+        before ``older_than`` are selected, written to a new segment and
+        deleted from the live tables in one write transaction, so a workflow
+        rerun in the meantime is either archived as it was or left alone. Call
+        repeatedly until it returns 0 to archive everything eligible; keeping
+        each batch small keeps the write lock short.
+
+        Returns:
+            The number of workflows archived.
+        """
+        cutoff = older_than.isoformat() if isinstance(older_than, datetime) else older_than
+        placeholders = ", ".join("?" * len(statuses))
+
+        self._wait_for_writes()
+        # Autocommit mode, so the transaction can take the write lock up front with BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.db_file, isolation_level=None)
+        try:
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute(f'''
+                    SELECT workflow_id FROM workflow_states
+                    WHERE status IN ({placeholders}) AND updated_at < ?
+                    ORDER BY updated_at
+                    LIMIT ?
+                ''', (*statuses, cutoff, batch_size))
+                workflow_ids = [row[0] for row in cursor.fetchall()]
+                if not workflow_ids:
+                    return 0
+
+                states = self._load_live_states(cursor, workflow_ids)
+                histories = self._load_stage_histories(workflow_ids, cursor)
+                records = [
+                    {"state": state.to_dict(), "stage_history": histories.get(workflow_id, [])}
+                    for workflow_id, state in states.items()
+                ]
+                updated = sorted(state.updated_at for state in states.values())
+                payload = zlib.compress(json.dumps(records).encode("utf-8"), level=6)
+
+                cursor.execute('''
+                    INSERT INTO workflow_archive_segments
+                    (created_at, workflow_count, oldest_updated_at, newest_updated_at, payload)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (datetime.now().isoformat(), len(records), updated[0], updated[-1], payload))
+                segment_id = cursor.lastrowid
+
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO workflow_archive_index
+                    (workflow_id, segment_id, current_stage, workflow_type, created_at, updated_at, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', [
+                    (state.workflow_id, segment_id, state.current_stage, state.workflow_data.get("type"),
+                     state.created_at, state.updated_at, state.status)
+                    for state in states.values()
+                ])
+
+                archived = [(workflow_id,) for workflow_id in states]
+                cursor.executemany('DELETE FROM workflow_stage_results WHERE workflow_id = ?', archived)
+                cursor.executemany('DELETE FROM workflow_states WHERE workflow_id = ?', archived)
+            return len(records)
+        finally:
+            conn.close()
+
+    def _load_stage_histories(self, workflow_ids: List[str],
+                              cursor: Optional[sqlite3.Cursor] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Return the stage history of many workflows keyed by workflow ID (read through ``cursor`` if given)."""
+        conn = None
+        if cursor is None:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.cursor()
+
+        histories: Dict[str, List[Dict[str, Any]]] = {}
+        for start in range(0, len(workflow_ids), _MAX_QUERY_PARAMS):
+            chunk = workflow_ids[start:start + _MAX_QUERY_PARAMS]
+            cursor.execute(f'''
+                SELECT workflow_id, stage, attempt, status, started_at, finished_at, duration_ms, payload, metrics
+                FROM workflow_stage_results
+                WHERE workflow_id IN ({", ".join("?" * len(chunk))})
+                ORDER BY result_id
+            ''', chunk)
+            for row in cursor.fetchall():
+                histories.setdefault(row[0], []).append({
+                    "stage": row[1],
+                    "attempt": row[2],
+                    "status": row[3],
+                    "started_at": row[4],
+                    "finished_at": row[5],
+                    "duration_ms": row[6],
+                    "payload": json.loads(row[7]) if row[7] else {},
+                    "metrics": json.loads(row[8]) if row[8] else {}
+                })
+
+        if conn is not None:
+            conn.close()
+        return histories
+
+    def _load_archived_records(self, workflow_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Decompress the archive segments holding the given workflows."""
+        conn = sqlite3.connect(self.db_file)
+        records = _read_archived_records(conn.cursor(), workflow_ids)
+        conn.close()
+        return records
+
+    def incremental_vacuum(self, pages: int = 200) -> int:
+        """
+        Return up to ``pages`` free pages to the filesystem.
+
+        Only has an effect when the database uses ``auto_vacuum=INCREMENTAL``
+        (see enable_incremental_vacuum). Small page counts keep each step short
+        so concurrent writers are not blocked for long; SQLite treats 0 as
+        "all free pages".
+
+        Returns:
+            The number of free pages still left in the database file.
+        """
+        self._wait_for_writes()
+        conn = sqlite3.connect(self.db_file)
+        # executescript steps the pragma to completion; execute() frees a single page
+        conn.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+        remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        conn.close()
+        return remaining
+
+    def free_page_count(self) -> int:
+        """Return the number of unused pages held in the database file."""
+        conn = sqlite3.connect(self.db_file)
+        count = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        conn.close()
+        return count
+
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Switch an existing database to incremental auto-vacuum.
+
+        New databases are created in this mode; older files need a one-off full
+        VACUUM, which rewrites the file and blocks writers while it runs.
+
+        Returns:
+            True if the database had to be converted.
+        """
+        self._wait_for_writes()
+        conn = sqlite3.connect(self.db_file)
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            conn.close()
+            return False
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+        conn.close()
+        return True
+
+    def _build_state(self, workflow_id: str, row: tuple, results: List[tuple]) -> WorkflowState:
+        """Combine a header row with its stage results into a WorkflowState."""
+        stage_data = json.loads(row[1]) if row[1] else {}
+        completed_stages = json.loads(row[2]) if row[2] else []
+        failed_stages = json.loads(row[3]) if row[3] else []
+        stage_metrics: Dict[str, Dict[str, Any]] = {}
+
+        # Workflows written before the stage results table existed only have
+        # the header snapshot; otherwise the append-only log is authoritative
+        if results:
+            # A stage's latest attempt decides whether it counts as completed or failed
+            latest_status: Dict[str, str] = {}
+            for result in results:
+                latest_status.pop(result[0], None)
+                latest_status[result[0]] = result[1]
+                stage_metrics.pop(result[0], None)
+                if result[4]:
+                    stage_metrics[result[0]] = json.loads(result[4])
+            completed_stages = [s for s, st in latest_status.items() if st == "completed"]
+            failed_stages = [s for s, st in latest_status.items() if st == "failed"]
+            latest = results[-1]
+            # An explicit save_state after the last stage (e.g. a pause) wins
+            if not (row[6] and latest[2] and row[6] > latest[2]):
+                stage_data = json.loads(latest[3]) if latest[3] else {}
+
+        return WorkflowState(
+            workflow_id=workflow_id,
+            current_stage=row[0],
+            stage_data=stage_data,
+            completed_stages=completed_stages,
+            failed_stages=failed_stages,
+            workflow_data=json.loads(row[4]) if row[4] else {},
+            created_at=row[5],
+            updated_at=row[6],
+            status=row[7],
+            stage_metrics=stage_metrics
+        )
+
+    def list_workflows(self) -> List[str]:
+        """List all workflow IDs."""
+        self._wait_for_writes()
+        conn = sqlite3.connect(self.db_file)
+        cursor = conn.cursor()
+
+        cursor.execute('SELECT workflow_id FROM workflow_states')
+        workflow_ids = [row[0] for row in cursor.fetchall()]
+
+        conn.close()
+        return workflow_ids
@@ -0,0 +1,104 @@
+"""
+Tests for workflow state persistence: durability levels, write batching and
+failure isolation.
+
+    python -m pytest workflow_state_test.py -q
+"""
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from workflow_state import WorkflowState, WorkflowStateManager, _PendingWrite
+
+def _state(workflow_id: str, status: str = "running", updated_at: str = None) -> WorkflowState:
+    now = updated_at or datetime.now().isoformat()
+    return WorkflowState(workflow_id, "planning", {}, [], [], {"type": "standard"}, now, now, status)
+
+@pytest.fixture
+def manager_factory(tmp_path):
+    managers = []
+
+    def create(**kwargs):
+        manager = WorkflowStateManager(str(tmp_path / "states.db"), **kwargs)
+        managers.append(manager)
+        return manager
+    yield create
+    for manager in managers:
+        manager.close()
+
+def test_async_reads_see_own_writes_while_a_batch_is_committing(manager_factory):
+    manager = manager_factory(durability="async", async_flush_interval_ms=5)
+    manager.save_state(_state("wf"))
+    now = datetime.now().isoformat()
+    for i in range(10):
+        # Large payloads keep the writer busy committing while the read flushes
+        manager.record_stage_result("wf", f"stage_{i}", "completed", {"blob": "x" * 500_000},
+                                    now, now, 1.0, "running")
+        assert f"stage_{i}" in manager.load_state("wf").completed_stages
+
+def test_async_writes_are_batched_into_one_commit_per_interval(manager_factory):
+    manager = manager_factory(durability="async", async_flush_interval_ms=1000)
+    for i in range(20):
+        manager.save_state(_state(f"wf_{i}"))
+    manager.flush()
+    assert manager._writer.commits == 1
+    assert len(manager.load_states([f"wf_{i}" for i in range(20)])) == 20
+
+def test_group_commit_batches_concurrent_writers(manager_factory):
+    manager = manager_factory(durability="group-commit", group_commit_interval_ms=200)
+    threads = [threading.Thread(target=manager.save_state, args=(_state(f"wf_{i}"),)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Every caller waited for its commit, and the writes shared one or two transactions
+    assert len(manager.load_states([f"wf_{i}" for i in range(20)])) == 20
+    assert manager._writer.commits <= 2
+
+def test_failed_write_does_not_roll_back_the_rest_of_its_batch(manager_factory):
+    manager = manager_factory(durability="async", async_flush_interval_ms=1000)
+    manager.save_state(_state("good"))
+    manager._writer.submit(_PendingWrite([("INSERT INTO missing_table VALUES (1)", ())]))
+    manager.save_state(_state("also_good"))
+    with pytest.raises(Exception, match="missing_table"):
+        manager.flush()
+    assert set(manager.load_states(["good", "also_good"])) == {"good", "also_good"}
+    # The error is reported once
+    manager.flush()
+
+def _archived_workflow(manager, workflow_id: str = "wf") -> None:
+    old = "2020-01-01T00:00:00"
+    manager.save_state(_state(workflow_id, updated_at=old))
+    manager.record_stage_result(workflow_id, "planning", "completed", {"plan": 1}, old, old, 1.0, "running")
+    manager.record_stage_result(workflow_id, "execution", "completed", {"done": 1}, old, old, 1.0, "completed")
+    assert manager.archive_workflows(older_than="2021-01-01") == 1
+
+def test_archive_round_trip(manager_factory):
+    manager = manager_factory()
+    _archived_workflow(manager)
+    assert manager.list_workflows() == []
+    state = manager.load_state("wf")
+    assert state.status == "completed"
+    assert state.completed_stages == ["planning", "execution"]
+    assert [entry["stage"] for entry in manager.get_stage_history("wf")] == ["planning", "execution"]
+    assert [s.workflow_id for s in manager.query_workflows(status="completed", include_archived=True)] == ["wf"]
+
+@pytest.mark.parametrize("durability", ["sync", "group-commit", "async"])
+def test_write_to_archived_workflow_restores_it(manager_factory, durability):
+    manager = manager_factory(durability=durability)
+    _archived_workflow(manager)
+    now = datetime.now().isoformat()
+    manager.record_stage_result("wf", "execution", "failed", {"error": "rerun"}, now, now, 1.0, "failed")
+
+    state = manager.load_state("wf")
+    assert state.status == "failed"
+    assert state.completed_stages == ["planning"]
+    assert state.failed_stages == ["execution"]
+    # The new attempt continues the archived history instead of starting over
+    history = manager.get_stage_history("wf")
+    assert [(entry["stage"], entry["attempt"]) for entry in history] == [
+        ("planning", 1), ("execution", 1), ("execution", 2)]
+    assert manager.list_workflows() == ["wf"]
+    assert len(manager.query_workflows(include_archived=True)) == 1
@@ -308,37 +308,45 @@ def test_workflow_state_inspection():
     # Initialize state manager
     state_manager = WorkflowStateManager()
     
-    # List all workflows
-    workflow_ids = state_manager.list_workflows()
+    # Load all workflows in bulk rather than one query per workflow
+    states = state_manager.query_workflows(order_by="created_at", descending=False)
     
-    print(f"📋 Found {len(workflow_ids)} workflows in database")
+    print(f"📋 Found {len(states)} workflows in database")
     
-    if workflow_ids:
+    if states:
         print("\n📊 Workflow State Analysis")
         print("-" * 30)
         
-        for workflow_id in workflow_ids:
-            state = state_manager.load_state(workflow_id)
-            if state:
-                print(f"\n🆔 Workflow: {workflow_id}")
-                print(f"   📊 Status: {state.status}")
-                print(f"   🔄 Current Stage: {state.current_stage}")
-                print(f"   ✅ Completed Stages: {len(state.completed_stages)}")
-                print(f"   ❌ Failed Stages: {len(state.failed_stages)}")
-                print(f"   📅 Created: {state.created_at}")
-                print(f"   📅 Updated: {state.updated_at}")
-                
-                # Show stage data summary
-                if state.stage_data:
-                    print(f"   📊 Stage Data Keys: {list(state.stage_data.keys())}")
-                
-                # Calculate workflow age
-                try:
-                    created = datetime.fromisoformat(state.created_at)
-                    age = datetime.now() - created
-                    print(f"   ⏰ Age: {age}")
-                except:
-                    print(f"   ⏰ Age: Unknown")
+        for state in states:
+            workflow_id = state.workflow_id
+            print(f"\n🆔 Workflow: {workflow_id}")
+            print(f"   📊 Status: {state.status}")
+            print(f"   🔄 Current Stage: {state.current_stage}")
+            print(f"   ✅ Completed Stages: {len(state.completed_stages)}")
+            print(f"   ❌ Failed Stages: {len(state.failed_stages)}")
+            print(f"   📅 Created: {state.created_at}")
+            print(f"   📅 Updated: {state.updated_at}")
+            
+            # Show stage data summary
+            if state.stage_data:
+                print(f"   📊 Stage Data Keys: {list(state.stage_data.keys())}")
+            
+            # Calculate workflow age
+            try:
+                created = datetime.fromisoformat(state.created_at)
+                age = datetime.now() - created
+                print(f"   ⏰ Age: {age}")
+            except:
+                print(f"   ⏰ Age: Unknown")
+        
+        # Targeted lookups go through the indexed query API
+        failed_recently = state_manager.query_workflows(
+            status="failed", updated_after=datetime.now() - timedelta(hours=1)
+        )
+        print(f"\n❌ Failed in the last hour: {len(failed_recently)}")
+        for workflow_type in ("financial", "data_processing", "standard"):
+            matching = state_manager.query_workflows(workflow_type=workflow_type, limit=5)
+            print(f"🔎 Latest {workflow_type} workflows: {[s.workflow_id for s in matching]}")
     else:
         print("📋 No workflows found in database")
 
@@ -12,160 +12,96 @@ This example demonstrates a Level 5 Agno system with complex agentic workflows:
 """
 
 import os
+import sys
+from functools import lru_cache
+from pathlib import Path
 import json
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
-from dotenv import load_dotenv
-from agno.agent import Agent
-from agno.workflow import Workflow
-from agno.models.openai import OpenAIChat
-from agno.tools.reasoning import ReasoningTools
-from agno.tools.calculator import CalculatorTools
-from agno.memory.v2.db.sqlite import SqliteMemoryDb
-from agno.memory.v2.memory import Memory
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
+from prompt_inputs import PromptInput, PromptInputBuilder
+from executors import StageExecutor, shared_executor
+from stage_cache import StageCache, model_identity, stage_cache_key
+from workflow_state import WorkflowState, WorkflowStateManager
 
-# Load environment variables
-load_dotenv()
+# Make the shared helpers at the repository root importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.agent_factory import AgentTemplate, shared_memory_db
+from shared.hedging import HedgePolicy, enable_hedging
+from shared.models import create_model
+from shared.rate_limit import limit_memory_in_background
+from shared.retry import RetryPolicy, call_with_retry
+from shared.startup import load_environment
+from shared.tracing import start_span
 
-@dataclass
-class WorkflowState:
-    """Represents the current state of a workflow."""
-    workflow_id: str
-    current_stage: str
-    stage_data: Dict[str, Any]
-    completed_stages: List[str]
-    failed_stages: List[str]
-    workflow_data: Dict[str, Any]
-    created_at: str
-    updated_at: str
-    status: str  # 'running', 'completed', 'failed', 'paused'
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for storage."""
-        return asdict(self)
-    
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'WorkflowState':
-        """Create from dictionary."""
-        return cls(**data)
+# agno is imported inside the agent factories below, so the UI backend and the
+# job queue can import WORKFLOW_STAGES without loading it; Agent is only needed
+# for annotations
+if TYPE_CHECKING:
+    from agno.agent import Agent
 
-class WorkflowStateManager:
-    """Manages workflow state persistence and retrieval."""
-    
-    def __init__(self, db_file: str = "workflow_states.db"):
-        self.db_file = db_file
-        self.init_database()
-    
-    def init_database(self):
-        """Initialize the SQLite database for workflow states."""
-        import sqlite3
-        
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS workflow_states (
-                workflow_id TEXT PRIMARY KEY,
-                current_stage TEXT,
-                stage_data TEXT,
-                completed_stages TEXT,
-                failed_stages TEXT,
-                workflow_data TEXT,
-                created_at TEXT,
-                updated_at TEXT,
-                status TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
-    def save_state(self, state: WorkflowState):
-        """Save workflow state to database."""
-        import sqlite3
-        
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO workflow_states 
-            (workflow_id, current_stage, stage_data, completed_stages, 
-             failed_stages, workflow_data, created_at, updated_at, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            state.workflow_id,
-            state.current_stage,
-            json.dumps(state.stage_data),
-            json.dumps(state.completed_stages),
-            json.dumps(state.failed_stages),
-            json.dumps(state.workflow_data),
-            state.created_at,
-            state.updated_at,
-            state.status
-        ))
-        
-        conn.commit()
-        conn.close()
-    
-    def load_state(self, workflow_id: str) -> Optional[WorkflowState]:
-        """Load workflow state from database."""
-        import sqlite3
-        
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT current_stage, stage_data, completed_stages, failed_stages,
-                   workflow_data, created_at, updated_at, status
-            FROM workflow_states WHERE workflow_id = ?
-        ''', (workflow_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            return WorkflowState(
-                workflow_id=workflow_id,
-                current_stage=row[0],
-                stage_data=json.loads(row[1]),
-                completed_stages=json.loads(row[2]),
-                failed_stages=json.loads(row[3]),
-                workflow_data=json.loads(row[4]),
-                created_at=row[5],
-                updated_at=row[6],
-                status=row[7]
-            )
-        return None
-    
-    def list_workflows(self) -> List[str]:
-        """List all workflow IDs."""
-        import sqlite3
-        
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT workflow_id FROM workflow_states')
-        workflow_ids = [row[0] for row in cursor.fetchall()]
-        
-        conn.close()
-        return workflow_ids
+# Stages executed by ComplexWorkflow, in order
+WORKFLOW_STAGES = ["planning", "data_processing", "business_logic", "approval", "finalization"]
 
-def create_workflow_agent():
-    """Create a specialized agent for workflow orchestration."""
-    
-    memory = Memory(
-        model=OpenAIChat(id="gpt-4o"),
-        db=SqliteMemoryDb(table_name="workflow_memories", db_file="memory_workflow.db"),
-        delete_memories=True,
-        clear_memories=True,
-    )
-    
-    agent = Agent(
+# The stages whose results each stage builds on; re-running a stage re-runs
+# everything that depends on it
+STAGE_DEPENDENCIES = {
+    "planning": [],
+    "data_processing": ["planning"],
+    "business_logic": ["planning"],
+    "approval": ["business_logic"],
+    "finalization": ["data_processing", "business_logic", "approval"],
+}
+
+def stage_dependents(stage: str) -> List[str]:
+    """``stage`` and every stage that depends on it, directly or not, in workflow order."""
+    if stage not in STAGE_DEPENDENCIES:
+        raise ValueError(f"Unknown stage '{stage}', expected one of {WORKFLOW_STAGES}")
+    affected = {stage}
+    for candidate in WORKFLOW_STAGES:
+        if any(dependency in affected for dependency in STAGE_DEPENDENCIES[candidate]):
+            affected.add(candidate)
+    return [s for s in WORKFLOW_STAGES if s in affected]
+
+def _new_stage_metrics(retries: int = 0) -> Dict[str, Any]:
+    """Empty per-stage performance counters."""
+    return {
+        "wall_ms": 0.0,        # stage start until its result is recorded
+        "agent_ms": 0.0,       # time inside agent.run (model calls, tools, memory updates)
+        "model_ms": 0.0,       # time spent waiting on model responses
+        "model_calls": 0,
+        "input_tokens": 0,
+        "cached_tokens": 0,    # input tokens served from the provider's prompt cache
+        "output_tokens": 0,
+        "total_tokens": 0,
+        "db_write_ms": 0.0,    # time blocked on workflow state writes
+        "retries": retries,    # earlier attempts of this stage
+        "model_retries": 0,    # agent runs retried after a transient model error
+        "backoff_ms": 0.0,     # time spent waiting between those retries
+        "cached": False,       # agent output served from the stage cache
+        "prompt_tokens_saved": 0,  # by summarizing large workflow input collections
+    }
+
+def _stage_model():
+    """A stage agent's model, hedged when AGNO_HEDGE_PERCENTILE is set."""
+    model = create_model("gpt-4o")
+    hedge_policy = HedgePolicy.from_env()
+    if hedge_policy is not None:
+        # Installed once per template, so every workflow shares its hedger and latency history
+        enable_hedging(model, hedge_policy)
+    return model
+
+@lru_cache(maxsize=None)
+def workflow_agent_template():
+    """Build the Workflow Orchestrator agent's tools, instructions and model once."""
+    load_environment(__file__)
+    from agno.tools.reasoning import ReasoningTools
+    from agno.tools.calculator import CalculatorTools
+    
+    return AgentTemplate(
         name="Workflow Orchestrator",
         role="A specialized agent that orchestrates complex multi-step workflows with state management",
-        model=OpenAIChat(id="gpt-4o"),
+        model=_stage_model(),
         tools=[
             ReasoningTools(add_instructions=True),
             CalculatorTools(),
@@ -181,29 +117,37 @@ def create_workflow_agent():
         ],
         markdown=True,
         show_tool_calls=True,
-        memory=memory,
-        user_id="workflow_orchestrator",
         enable_agentic_memory=True,
         enable_user_memories=True,
         enable_session_summaries=True,
     )
-    
-    return agent
 
-def create_data_processing_agent():
-    """Create an agent specialized in data processing workflows."""
+def create_workflow_agent():
+    """Create a specialized agent for workflow orchestration."""
+    template = workflow_agent_template()
+    from agno.memory.v2.memory import Memory
     
     memory = Memory(
-        model=OpenAIChat(id="gpt-4o"),
-        db=SqliteMemoryDb(table_name="data_memories", db_file="memory_data.db"),
+        model=template.model,
+        db=shared_memory_db(table_name="workflow_memories", db_file="memory_workflow.db"),
         delete_memories=True,
         clear_memories=True,
     )
+    limit_memory_in_background(memory)
     
-    agent = Agent(
+    return template.new_session(memory=memory, user_id="workflow_orchestrator")
+
+@lru_cache(maxsize=None)
+def data_processing_agent_template():
+    """Build the Data Processor agent's tools, instructions and model once."""
+    load_environment(__file__)
+    from agno.tools.reasoning import ReasoningTools
+    from agno.tools.calculator import CalculatorTools
+    
+    return AgentTemplate(
         name="Data Processor",
         role="A data processing specialist that handles data transformation, validation, and analysis workflows",
-        model=OpenAIChat(id="gpt-4o"),
+        model=_stage_model(),
         tools=[
             ReasoningTools(add_instructions=True),
             CalculatorTools(),
@@ -219,29 +163,37 @@ def create_data_processing_agent():
         ],
         markdown=True,
         show_tool_calls=True,
-        memory=memory,
-        user_id="data_processor",
         enable_agentic_memory=True,
         enable_user_memories=True,
         enable_session_summaries=True,
     )
-    
-    return agent
 
-def create_approval_agent():
-    """Create an agent specialized in approval and decision workflows."""
+def create_data_processing_agent():
+    """Create an agent specialized in data processing workflows."""
+    template = data_processing_agent_template()
+    from agno.memory.v2.memory import Memory
     
     memory = Memory(
-        model=OpenAIChat(id="gpt-4o"),
-        db=SqliteMemoryDb(table_name="approval_memories", db_file="memory_approval.db"),
+        model=template.model,
+        db=shared_memory_db(table_name="data_memories", db_file="memory_data.db"),
         delete_memories=True,
         clear_memories=True,
     )
+    limit_memory_in_background(memory)
     
-    agent = Agent(
+    return template.new_session(memory=memory, user_id="data_processor")
+
+@lru_cache(maxsize=None)
+def approval_agent_template():
+    """Build the Approval Manager agent's tools, instructions and model once."""
+    load_environment(__file__)
+    from agno.tools.reasoning import ReasoningTools
+    from agno.tools.calculator import CalculatorTools
+    
+    return AgentTemplate(
         name="Approval Manager",
         role="An approval specialist that manages multi-level approval workflows and decision gates",
-        model=OpenAIChat(id="gpt-4o"),
+        model=_stage_model(),
         tools=[
             ReasoningTools(add_instructions=True),
             CalculatorTools(),
@@ -257,24 +209,53 @@ def create_approval_agent():
         ],
         markdown=True,
         show_tool_calls=True,
-        memory=memory,
-        user_id="approval_manager",
         enable_agentic_memory=True,
         enable_user_memories=True,
         enable_session_summaries=True,
     )
+
+def create_approval_agent():
+    """Create an agent specialized in approval and decision workflows."""
+    template = approval_agent_template()
+    from agno.memory.v2.memory import Memory
+    
+    memory = Memory(
+        model=template.model,
+        db=shared_memory_db(table_name="approval_memories", db_file="memory_approval.db"),
+        delete_memories=True,
+        clear_memories=True,
+    )
+    limit_memory_in_background(memory)
     
-    return agent
+    return template.new_session(memory=memory, user_id="approval_manager")
 
 class ComplexWorkflow:
     """A complex workflow with multiple stages, state management, and error handling."""
     
-    def __init__(self, workflow_id: str, state_manager: WorkflowStateManager):
+    def __init__(self, workflow_id: str, state_manager: WorkflowStateManager,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 stage_cache: Optional[StageCache] = None,
+                 prompt_builder: Optional[PromptInputBuilder] = None,
+                 executor: Optional[StageExecutor] = None):
         self.workflow_id = workflow_id
         self.state_manager = state_manager
+        # Transient model errors (rate limits, timeouts, 5xx) are retried with backoff
+        self.retry_policy = retry_policy or RetryPolicy.from_env()
+        # Agent outputs of recurring inputs can be reused (off unless configured)
+        self.stage_cache = stage_cache or StageCache.from_env()
+        self._cached_stages: List[str] = []
+        # The workflow input is rendered for prompts once per run, within a token budget
+        self.prompt_builder = prompt_builder or PromptInputBuilder()
+        self._prompt_input: Optional[PromptInput] = None
+        # CPU-heavy stage work runs inline unless a process pool is configured
+        self.executor = executor or shared_executor()
+        self._shared_input: Any = None
         self.workflow_orchestrator = create_workflow_agent()
         self.data_processor = create_data_processing_agent()
         self.approval_manager = create_approval_agent()
+        self._stage_started_at: Optional[datetime] = None
+        self._stage_timer: Optional[float] = None
+        self._stage_metrics: Dict[str, Any] = _new_stage_metrics()
         
         # Initialize or load workflow state
         self.state = self._initialize_state()
@@ -304,19 +285,120 @@ class ComplexWorkflow:
         print(f"🚀 Creating new workflow: {self.workflow_id}")
         return new_state
     
+    def _begin_stage(self, stage: str):
+        """Start timing a stage attempt and reset its metrics."""
+        previous = self.state.stage_metrics.get(stage)
+        if previous is not None:
+            retries = previous.get("retries", 0) + 1
+        else:
+            retries = int(stage in self.state.completed_stages or stage in self.state.failed_stages)
+        self._stage_started_at = datetime.now()
+        self._stage_timer = time.perf_counter()
+        self._stage_metrics = _new_stage_metrics(retries)
+    
+    def _run_agent(self, agent: "Agent", prompt: str):
+        """
+        Run an agent and add its latency and token usage to the current stage.
+
+        Transient model errors are retried with jittered exponential backoff;
+        anything else, or the last failed attempt, fails the stage.
+        """
+        def on_retry(attempt: int, error: BaseException, delay: float):
+            self._stage_metrics["model_retries"] += 1
+            self._stage_metrics["backoff_ms"] += delay * 1000
+            print(f"⚠️ {agent.name}: transient error ({error}); retry {attempt} in {delay:.2f}s")
+        
+        started = time.perf_counter()
+        response = call_with_retry(lambda: agent.run(prompt), self.retry_policy, on_retry)
+        self._stage_metrics["agent_ms"] += (time.perf_counter() - started) * 1000
+        
+        # agno reports one entry per model call in the run
+        run_metrics = response.metrics or {}
+        self._stage_metrics["model_calls"] += len(run_metrics.get("time", []))
+        self._stage_metrics["model_ms"] += sum(run_metrics.get("time", [])) * 1000
+        for key in ("input_tokens", "cached_tokens", "output_tokens", "total_tokens"):
+            self._stage_metrics[key] += sum(run_metrics.get(key, []))
+        return response
+    
+    def _run_stage_agent(self, stage: str, agent: "Agent", template: AgentTemplate, prompt: str) -> str:
+        """
+        The stage agent's answer to ``prompt``. With a stage cache, an answer
+        stored for the same stage, agent configuration, input, prompt budget
+        and model is reused.
+        """
+        self._stage_metrics["prompt_tokens_saved"] = self._prompt_input.tokens_saved
+        if self.stage_cache is None:
+            return self._run_agent(agent, prompt).content
+        
+        key = stage_cache_key(stage, template.config_hash(), self._prompt_input.fingerprint,
+                              self.prompt_builder.token_budget, model_identity(template.model))
+        cached = self.stage_cache.get(key)
+        if cached is not None:
+            self._stage_metrics["cached"] = True
+            self._cached_stages.append(stage)
+            print(f"♻️  {stage}: reusing the output cached at "
+                  f"{datetime.fromtimestamp(cached['cached_at']).isoformat(timespec='seconds')}")
+            return cached["content"]
+        
+        content = self._run_agent(agent, prompt).content
+        self.stage_cache.put(key, stage, {"content": content})
+        return content
+    
     def _update_state(self, stage: str, stage_data: Dict[str, Any], status: str = "running"):
-        """Update workflow state."""
+        """Record a stage attempt and its metrics, and update the workflow header."""
+        finished_at = datetime.now()
+        started_at = self._stage_started_at or finished_at
+        duration_ms = (finished_at - started_at).total_seconds() * 1000
+        
+        metrics = self._stage_metrics
+        if self._stage_timer is not None:
+            metrics["wall_ms"] = (time.perf_counter() - self._stage_timer) * 1000
+        metrics = {key: round(value, 2) if isinstance(value, float) else value for key, value in metrics.items()}
+
+        # The workflow only completes when its final stage does
+        if status == "failed":
+            workflow_status = "failed"
+        elif status == "completed" and stage == WORKFLOW_STAGES[-1]:
+            workflow_status = "completed"
+        else:
+            workflow_status = "running"
+
         self.state.current_stage = stage
         self.state.stage_data = stage_data
-        self.state.updated_at = datetime.now().isoformat()
-        self.state.status = status
-        
+        self.state.updated_at = finished_at.isoformat()
+        self.state.status = workflow_status
+
+        # A stage's latest attempt decides which list it is in, as when loading the state
+        if stage in self.state.completed_stages:
+            self.state.completed_stages.remove(stage)
+        if stage in self.state.failed_stages:
+            self.state.failed_stages.remove(stage)
         if status == "completed":
             self.state.completed_stages.append(stage)
         elif status == "failed":
             self.state.failed_stages.append(stage)
+
+        write_started = time.perf_counter()
+        with start_span("workflow.state.write", **{"db.system": "sqlite", "workflow.stage": stage,
+                                                   "durability": self.state_manager.durability}) as span:
+            self.state_manager.record_stage_result(
+                workflow_id=self.workflow_id,
+                stage=stage,
+                status=status,
+                payload=stage_data,
+                started_at=started_at.isoformat(),
+                finished_at=self.state.updated_at,
+                duration_ms=duration_ms,
+                workflow_status=workflow_status,
+                metrics=metrics
+            )
+            span.set_attribute("db.bytes", len(json.dumps(stage_data)))
         
-        self.state_manager.save_state(self.state)
+        # The time to record the attempt is only known once it is written
+        metrics["db_write_ms"] = round(metrics["db_write_ms"] + (time.perf_counter() - write_started) * 1000, 2)
+        self.state_manager.update_stage_metrics(self.workflow_id, stage, {"db_write_ms": metrics["db_write_ms"]})
+        self.state.stage_metrics[stage] = metrics
+        self._stage_timer = None
     
     def _log_stage(self, stage: str, message: str, data: Dict[str, Any] = None):
         """Log workflow stage information."""
@@ -328,39 +410,141 @@ class ComplexWorkflow:
     
     def run_workflow(self, workflow_input: Dict[str, Any]) -> Dict[str, Any]:
         """Execute the complete workflow."""
+        with start_span("workflow.run", **{"workflow.id": self.workflow_id,
+                                           "workflow.type": workflow_input.get("type")}) as span:
+            result = self._execute_workflow(workflow_input)
+            span.set_attribute("workflow.status", result["status"])
+            return result
+    
+    def _execute_workflow(self, workflow_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Run every stage in order, stopping at the first failure."""
         
         print(f"🚀 Starting Complex Workflow: {self.workflow_id}")
         print("=" * 60)
         
+        # Keep the input on the header so workflows can be queried by type
+        if self.state.workflow_data != workflow_input:
+            self.state.workflow_data = workflow_input
+            self.state_manager.set_workflow_data(self.workflow_id, workflow_input)
+        
+        return self._run_stages(WORKFLOW_STAGES, workflow_input)
+    
+    def retry_stage(self, stage: Optional[str] = None,
+                    workflow_input: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Retry a failed stage without repeating the work that succeeded.
+        
+        Only the stage, the stages that depend on it and stages that have not
+        completed yet are executed; other completed stages keep their results.
+        
+        Args:
+            stage: The stage to retry; defaults to the most recently failed one.
+            workflow_input: Defaults to the input stored with the workflow.
+        """
+        if stage is None:
+            failed = [s for s in self.state.failed_stages if s in STAGE_DEPENDENCIES]
+            pending = [s for s in WORKFLOW_STAGES if s not in self.state.completed_stages]
+            if failed:
+                stage = failed[-1]
+            elif self.state.failed_stages and pending:
+                # An unexpected error outside a stage: continue from the first unfinished one
+                stage = pending[0]
+            else:
+                raise ValueError(f"Workflow {self.workflow_id} has no failed stage to retry")
+        return self.rerun_from(stage, workflow_input)
+    
+    def rerun_from(self, stage: str, workflow_input: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Re-execute ``stage`` and everything that depends on it, plus any stage
+        that has not completed yet, e.g. after changing a stage's inputs.
+        
+        Args:
+            stage: The first stage to execute again.
+            workflow_input: Defaults to the input stored with the workflow.
+        """
+        rerun = set(stage_dependents(stage))
+        stages = [s for s in WORKFLOW_STAGES if s in rerun or s not in self.state.completed_stages]
+        if workflow_input is None:
+            workflow_input = self.state.workflow_data
+        elif self.state.workflow_data != workflow_input:
+            self.state.workflow_data = workflow_input
+            self.state_manager.set_workflow_data(self.workflow_id, workflow_input)
+        
+        skipped = [s for s in WORKFLOW_STAGES if s not in stages]
+        print(f"🔁 Re-running workflow {self.workflow_id} from '{stage}': {', '.join(stages)}")
+        if skipped:
+            print(f"⏭️  Keeping completed stages: {', '.join(skipped)}")
+        print("=" * 60)
+        
+        with start_span("workflow.rerun", **{"workflow.id": self.workflow_id, "workflow.stage": stage,
+                                             "workflow.stages": ",".join(stages)}) as span:
+            result = self._run_stages(stages, workflow_input)
+            span.set_attribute("workflow.status", result["status"])
+            return result
+    
+    def run_stage(self, stage: str, workflow_input: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Execute a single stage, e.g. one leased from the job queue. Earlier
+        stages' results are read from the persisted workflow state.
+        
+        Args:
+            stage: The stage to execute.
+            workflow_input: Defaults to the input stored with the workflow.
+        """
+        if stage not in STAGE_DEPENDENCIES:
+            raise ValueError(f"Unknown stage '{stage}', expected one of {WORKFLOW_STAGES}")
+        if workflow_input is None:
+            workflow_input = self.state.workflow_data
+        elif self.state.workflow_data != workflow_input:
+            self.state.workflow_data = workflow_input
+            self.state_manager.set_workflow_data(self.workflow_id, workflow_input)
+        
+        with start_span("workflow.run_stage", **{"workflow.id": self.workflow_id, "workflow.stage": stage}) as span:
+            result = self._run_stages([stage], workflow_input)
+            span.set_attribute("workflow.status", result["status"])
+            return result
+    
+    def _run_stages(self, stages: List[str], workflow_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Run ``stages`` in order, stopping at the first failure."""
+        stage_handlers = {
+            "planning": self._execute_planning_stage,
+            "data_processing": self._execute_data_processing_stage,
+            "business_logic": self._execute_business_logic_stage,
+            "approval": self._execute_approval_stage,
+            "finalization": self._execute_finalization_stage,
+        }
+        
+        self._cached_stages = []
+        # Stage tasks on a process pool read the input from shared memory
+        self._shared_input = self.executor.share(workflow_input)
         try:
-            # Stage 1: Workflow Analysis and Planning
-            result = self._execute_planning_stage(workflow_input)
-            if not result["success"]:
-                return self._handle_workflow_failure("planning", result["error"])
-            
-            # Stage 2: Data Processing and Validation
-            result = self._execute_data_processing_stage(workflow_input)
-            if not result["success"]:
-                return self._handle_workflow_failure("data_processing", result["error"])
-            
-            # Stage 3: Business Logic Execution
-            result = self._execute_business_logic_stage(workflow_input)
-            if not result["success"]:
-                return self._handle_workflow_failure("business_logic", result["error"])
-            
-            # Stage 4: Approval and Decision Making
-            result = self._execute_approval_stage(workflow_input)
-            if not result["success"]:
-                return self._handle_workflow_failure("approval", result["error"])
-            
-            # Stage 5: Finalization and Reporting
-            result = self._execute_finalization_stage(workflow_input)
-            if not result["success"]:
-                return self._handle_workflow_failure("finalization", result["error"])
-            
-            # Workflow completed successfully
-            self._update_state("finalization", result["data"], "completed")
+            self._prompt_input = self.executor.run(self.prompt_builder.build, self._shared_input)
+            if self._prompt_input.summarized:
+                print(f"✂️  Workflow input trimmed for prompts: {self._prompt_input.full_tokens} -> "
+                      f"{self._prompt_input.tokens} tokens (summarized {', '.join(self._prompt_input.summarized)})")
+            for stage in stages:
+                with start_span("workflow.stage", **{"workflow.id": self.workflow_id,
+                                                     "workflow.stage": stage}) as span:
+                    self._begin_stage(stage)
+                    result = stage_handlers[stage](workflow_input)
+                    span.set_attributes({f"stage.{key}": value for key, value in self._stage_metrics.items()})
+                    span.set_attribute("stage.success", result["success"])
+                if not result["success"]:
+                    return self._handle_workflow_failure(stage, result["error"])
+            
+            if stages[-1] != WORKFLOW_STAGES[-1]:
+                # Only part of the workflow ran (a single stage leased from the job queue)
+                return {
+                    "success": True,
+                    "workflow_id": self.workflow_id,
+                    "status": "running",
+                    "completed_stages": self.state.completed_stages,
+                    "stage_result": result["data"],
+                    "cached_stages": list(self._cached_stages),
+                }
             
+            # Workflow completed successfully (the finalization stage already
+            # persisted the completed state)
             print("\n🎉 Workflow completed successfully!")
             print("=" * 60)
             
@@ -370,6 +554,7 @@ class ComplexWorkflow:
                 "status": "completed",
                 "completed_stages": self.state.completed_stages,
                 "final_result": result["data"],
+                "cached_stages": list(self._cached_stages),
                 "workflow_summary": self._generate_workflow_summary()
             }
             
@@ -377,6 +562,9 @@ class ComplexWorkflow:
             error_msg = f"Unexpected error in workflow: {str(e)}"
             print(f"\n❌ {error_msg}")
             return self._handle_workflow_failure("unexpected", error_msg)
+        finally:
+            self.executor.release(self._shared_input)
+            self._shared_input = None
     
     def _execute_planning_stage(self, workflow_input: Dict[str, Any]) -> Dict[str, Any]:
         """Execute the workflow planning stage."""
@@ -388,7 +576,7 @@ class ComplexWorkflow:
             planning_prompt = f"""
             Analyze the following workflow requirements and create a detailed execution plan:
             
-            Workflow Input: {json.dumps(workflow_input, indent=2)}
+            Workflow Input: {self._prompt_input.text}
             
             Please provide:
             1. Workflow stage breakdown
@@ -398,11 +586,12 @@ class ComplexWorkflow:
             5. Success criteria
             """
             
-            response = self.workflow_orchestrator.run(planning_prompt)
+            plan = self._run_stage_agent(stage, self.workflow_orchestrator, workflow_agent_template(),
+                                         planning_prompt)
             
             planning_data = {
-                "plan": response.content,
-                "input_analysis": workflow_input,
+                "plan": plan,
+                "input_analysis": self._prompt_input.value,
                 "planning_timestamp": datetime.now().isoformat()
             }
             
@@ -426,7 +615,7 @@ class ComplexWorkflow:
             data_prompt = f"""
             Design a data processing workflow for the following requirements:
             
-            Workflow Input: {json.dumps(workflow_input, indent=2)}
+            Workflow Input: {self._prompt_input.text}
             
             Please provide:
             1. Data transformation pipeline design
@@ -436,16 +625,27 @@ class ComplexWorkflow:
             5. Data security considerations
             """
             
-            response = self.data_processor.run(data_prompt)
-            
-            # Simulate processing time
-            time.sleep(1)
+            pipeline_design = self._run_stage_agent(stage, self.data_processor, data_processing_agent_template(),
+                                                    data_prompt)
             
+            # Validate and transform the records column-wise, on the stage
+            # executor (numpy is only imported once a workflow reaches this stage)
+            from data_engine import process_workflow_input
+
+            validation_rules = ["data_format", "data_range", "data_completeness"]
+            report = self.executor.run(process_workflow_input, self._shared_input, validation_rules)
+            print(f"⚙️ Processed {report['rows']} records in {report['elapsed_ms']:.0f} ms "
+                  f"({report['rows_per_sec'] or 0} rows/s), {report['valid_rows']} valid")
+            threshold = workflow_input.get("quality_threshold")
+            if threshold is not None and report["quality"] is not None and report["quality"] < threshold:
+                print(f"⚠️ Data quality {report['quality']:.1%} is below the threshold of {threshold:.1%}")
+
             processing_data = {
-                "pipeline_design": response.content,
-                "validation_rules": ["data_format", "data_range", "data_completeness"],
+                "pipeline_design": pipeline_design,
+                "validation_rules": validation_rules,
+                "processing_report": report,
                 "processing_timestamp": datetime.now().isoformat(),
-                "records_processed": len(workflow_input.get("data", []))
+                "records_processed": report["rows"]
             }
             
             self._update_state(stage, processing_data, "completed")
@@ -473,12 +673,23 @@ class ComplexWorkflow:
                 business_logic = self._execute_approval_workflow(workflow_input)
             else:
                 business_logic = self._execute_standard_workflow(workflow_input)
+
+            # Evaluate the compiled rules over the line items, on the stage
+            # executor (numpy is only imported once a workflow reaches this stage)
+            from rules import evaluate_rules, rule_set
+
+            business_logic["rules"] = [rule.name for rule in rule_set(business_logic["type"])]
+            rule_report = self.executor.run(evaluate_rules, business_logic["type"], self._shared_input)
+            print(f"📏 Applied {len(rule_report['rules'])} rules to {rule_report['records']} records in "
+                  f"{rule_report['elapsed_ms']:.0f} ms: {rule_report['rejected']} rejected, "
+                  f"{rule_report['flagged']} flagged")
             
             business_data = {
                 "business_logic": business_logic,
                 "workflow_type": workflow_type,
                 "execution_timestamp": datetime.now().isoformat(),
-                "business_rules_applied": len(business_logic.get("rules", []))
+                "business_rules_applied": len(rule_report["rules"]),
+                "rule_evaluation": rule_report
             }
             
             self._update_state(stage, business_data, "completed")
@@ -501,7 +712,7 @@ class ComplexWorkflow:
             approval_prompt = f"""
             Design an approval workflow for the following requirements:
             
-            Workflow Input: {json.dumps(workflow_input, indent=2)}
+            Workflow Input: {self._prompt_input.text}
             
             Please provide:
             1. Approval hierarchy design
@@ -511,13 +722,11 @@ class ComplexWorkflow:
             5. Audit trail design
             """
             
-            response = self.approval_manager.run(approval_prompt)
-            
-            # Simulate approval process
-            time.sleep(1)
+            approval_design = self._run_stage_agent(stage, self.approval_manager, approval_agent_template(),
+                                                    approval_prompt)
             
             approval_data = {
-                "approval_design": response.content,
+                "approval_design": approval_design,
                 "approval_levels": ["Level 1", "Level 2", "Level 3"],
                 "approval_timestamp": datetime.now().isoformat(),
                 "approval_status": "approved"
@@ -539,16 +748,12 @@ class ComplexWorkflow:
         self._log_stage(stage, "Starting finalization and reporting")
         
         try:
-            # Generate final workflow report
+            # Generate final workflow report from the measured stage metrics
             finalization_data = {
                 "workflow_summary": f"Workflow {self.workflow_id} completed successfully",
                 "total_stages": len(self.state.completed_stages),
                 "completion_timestamp": datetime.now().isoformat(),
-                "performance_metrics": {
-                    "total_duration": "5 minutes",
-                    "stages_completed": len(self.state.completed_stages),
-                    "success_rate": "100%"
-                }
+                "performance_metrics": self._aggregate_stage_metrics()
             }
             
             self._update_state(stage, finalization_data, "completed")
@@ -565,7 +770,6 @@ class ComplexWorkflow:
         """Execute financial-specific business logic."""
         return {
             "type": "financial",
-            "rules": ["amount_validation", "budget_check", "approval_threshold"],
             "calculations": ["total_amount", "tax_calculation", "final_amount"],
             "compliance": ["SOX", "GAAP", "Internal Controls"]
         }
@@ -574,7 +778,6 @@ class ComplexWorkflow:
         """Execute approval-specific business logic."""
         return {
             "type": "approval",
-            "rules": ["role_based_access", "delegation_rules", "escalation_criteria"],
             "workflow": ["submit", "review", "approve", "notify"],
             "compliance": ["audit_trail", "documentation", "timeline_tracking"]
         }
@@ -583,7 +786,6 @@ class ComplexWorkflow:
         """Execute standard business logic."""
         return {
             "type": "standard",
-            "rules": ["business_validation", "data_integrity", "process_compliance"],
             "workflow": ["input_validation", "processing", "output_generation"],
             "quality": ["error_handling", "logging", "monitoring"]
         }
@@ -595,10 +797,8 @@ class ComplexWorkflow:
         print(f"\n❌ Workflow failed at stage: {stage}")
         print(f"🔍 Error: {error}")
         print("\n🔄 Recovery Options:")
-        print("1. Retry the failed stage")
-        print("2. Skip to the next stage")
-        print("3. Pause workflow for manual intervention")
-        print("4. Rollback to previous successful stage")
+        print("1. Retry the failed stage and its dependents: workflow.retry_stage()")
+        print("2. Re-run from an earlier stage: workflow.rerun_from('<stage>')")
         
         return {
             "success": False,
@@ -606,7 +806,8 @@ class ComplexWorkflow:
             "status": "failed",
             "failed_stage": stage,
             "error": error,
-            "recovery_options": ["retry", "skip", "pause", "rollback"]
+            "recovery_options": ["retry", "rerun_from"],
+            "cached_stages": list(self._cached_stages)
         }
     
     def _generate_workflow_summary(self) -> str:
@@ -622,9 +823,11 @@ class ComplexWorkflow:
         **Stages Completed**: {len(self.state.completed_stages)}
         - {', '.join(self.state.completed_stages)}
         
-        **Performance**: All stages completed successfully
         **Total Duration**: {self._calculate_duration()}
         
+        **Stage Performance**:
+        {self._format_stage_metrics()}
+        
         **Key Achievements**:
         - Comprehensive workflow planning and analysis
         - Data processing and validation completed
@@ -633,6 +836,53 @@ class ComplexWorkflow:
         - Finalization and reporting generated
         """
     
+    def _aggregate_stage_metrics(self) -> Dict[str, Any]:
+        """Totals across the stages recorded so far, and the stage that took longest."""
+        stage_metrics = self.state.stage_metrics
+        totals = {
+            key: round(sum(m.get(key, 0) for m in stage_metrics.values()), 2)
+            for key in ("wall_ms", "model_ms", "db_write_ms", "input_tokens", "cached_tokens", "total_tokens",
+                        "retries", "model_retries", "prompt_tokens_saved")
+        }
+        attempted = len(self.state.completed_stages) + len(self.state.failed_stages)
+        slowest = max(stage_metrics, key=lambda s: stage_metrics[s].get("wall_ms", 0), default=None)
+        return {
+            "stage_time_ms": totals["wall_ms"],
+            "model_time_ms": totals["model_ms"],
+            "db_write_ms": totals["db_write_ms"],
+            "total_tokens": totals["total_tokens"],
+            "cached_input_tokens": totals["cached_tokens"],
+            "uncached_input_tokens": totals["input_tokens"] - totals["cached_tokens"],
+            "prompt_cache_hit_rate": (f"{totals['cached_tokens'] / totals['input_tokens']:.0%}"
+                                      if totals["input_tokens"] else "n/a"),
+            "retries": totals["retries"],
+            "model_retries": totals["model_retries"],
+            "prompt_tokens_saved": totals["prompt_tokens_saved"],
+            "cached_stages": [stage for stage in WORKFLOW_STAGES if stage_metrics.get(stage, {}).get("cached")],
+            "stages_completed": len(self.state.completed_stages),
+            "success_rate": f"{len(self.state.completed_stages) / attempted:.0%}" if attempted else "n/a",
+            "slowest_stage": slowest,
+        }
+    
+    def _format_stage_metrics(self) -> str:
+        """One line per stage with its share of the total stage time."""
+        stage_metrics = self.state.stage_metrics
+        total_ms = sum(m.get("wall_ms", 0) for m in stage_metrics.values()) or 1
+        lines = []
+        for stage in WORKFLOW_STAGES:
+            m = stage_metrics.get(stage)
+            if not m:
+                continue
+            lines.append(
+                f"- {stage}: {m['wall_ms']:.0f} ms ({m['wall_ms'] / total_ms:.0%}) | "
+                f"model {m['model_ms']:.0f} ms over {m['model_calls']} calls | "
+                f"{m['total_tokens']} tokens ({m.get('cached_tokens', 0)} of {m['input_tokens']} input cached) | "
+                f"DB {m['db_write_ms']:.1f} ms | retries {m['retries']} | model retries {m.get('model_retries', 0)}"
+                + (" | cached" if m.get("cached") else "")
+                + (f" | {m['prompt_tokens_saved']} prompt tokens saved" if m.get("prompt_tokens_saved") else "")
+            )
+        return "\n        ".join(lines) if lines else "- No stage metrics recorded"
+    
     def _calculate_duration(self) -> str:
         """Calculate the total duration of the workflow."""
         try:
@@ -710,11 +960,8 @@ def demonstrate_complex_workflows():
     print("\n📋 Workflow States Summary")
     print("=" * 40)
     
-    workflow_ids = state_manager.list_workflows()
-    for workflow_id in workflow_ids:
-        state = state_manager.load_state(workflow_id)
-        if state:
-            print(f"🆔 {workflow_id}: {state.status} (Stage: {state.current_stage})")
+    for state in state_manager.query_workflows(order_by="created_at", descending=False):
+        print(f"🆔 {state.workflow_id}: {state.status} (Stage: {state.current_stage})")
     
     print("\n🎉 Complex workflows demonstration completed!")
     print("\n💡 Key Features Demonstrated:")
@@ -0,0 +1,677 @@
+#!/usr/bin/env python3
+"""
+Agno Examples Benchmark Suite
+=============================
+
+End-to-end benchmarks for the five example levels:
+
+- basic:     Level 1 agent answering a calculation with a tool call
+- knowledge: Level 2 agent searching its knowledge base
+- memory:    Level 3 agent storing a fact and recalling it in the same session
+- team:      Level 4 team delegating a task to a member
+- workflow:  Level 5 multi-stage workflow with persisted state
+- session:   creating a Level 1 agent session from its pre-built template
+- hedge:     a hedged model call next to an unhedged one, under heavy-tailed latency,
+             through the OpenAI client (against a local endpoint with the stub)
+- executor:  the CPU-heavy stage work of a data-heavy workflow mix, inline and on
+             process pools of increasing size
+
+Each scenario runs in its own subprocess and working directory, so peak RSS
+and DB I/O are attributed to that scenario alone. Per scenario the report has
+p50/p95/p99 latency, throughput, peak RSS and DB I/O. Results are saved as
+JSON and can be compared against a stored baseline to catch regressions.
+
+The import time of every example module is also checked against a budget, so
+start-up stays fast: importing an example must not pull in agno eagerly.
+
+The deterministic stub model is used unless AGNO_MODEL_BACKEND is already set,
+so the numbers measure the framework's own overhead.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scenarios basic,workflow --iterations 50
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baseline.json"
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+# Metrics compared against the baseline, and whether higher values are better
+COMPARED_METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_ops": True,
+    "peak_rss_mb": False,
+}
+
+# Stub model tool scripts that make each scenario exercise its level's features
+SCENARIO_TOOL_SCRIPTS = {
+    "basic": [[{"name": "multiply", "arguments": {"a": 12, "b": 7}}]],
+    "knowledge": [[{"name": "search_knowledge_base", "arguments": {"query": "remote work hours"}}]],
+    "memory": [[{"name": "add_memory", "arguments": {"memory": "The user's favourite colour is teal",
+                                                      "topics": ["preferences"]}}]],
+    "team": [[{"name": "transfer_task_to_member", "arguments": {
+        "member_id": "developer",
+        "task_description": "Outline the backend for a task tracker",
+        "expected_output": "A short technical plan",
+    }}]],
+    "workflow": [],
+    "session": [],
+    "hedge": [],
+    "executor": [],
+}
+
+# Stub settings a scenario needs unless the caller sets them: hedging only
+# pays off when a few calls are much slower than the rest
+SCENARIO_ENV = {
+    "hedge": {
+        "AGNO_STUB_LATENCY_MS": "100",
+        "AGNO_STUB_LATENCY_JITTER_MS": "150",
+        "AGNO_STUB_LATENCY_DISTRIBUTION": "lognormal",
+    },
+}
+
+# Unmeasured calls that give the hedger a latency history before timing starts
+HEDGE_PRIMING_CALLS = 30
+
+# The executor scenario's workflow mix: how many inputs, and records in each
+EXECUTOR_MIX_INPUTS = 8
+EXECUTOR_MIX_RECORDS = 50_000
+
+# Example modules whose import time is checked, by folder
+EXAMPLE_MODULES = {
+    "01_basic_agent": "basic_agent",
+    "02_knowledge_agent": "knowledge_agent",
+    "03_memory_agent": "memory_agent",
+    "04_team_agents": "team_agents",
+    "05_workflows": "workflows",
+}
+
+def _example_path(folder: str):
+    path = str(REPO_ROOT / folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+def _per_thread(factory: Callable[[], Any]) -> Callable[[], Any]:
+    """Agents are not thread-safe, so each benchmark thread builds its own."""
+    local = threading.local()
+
+    def get():
+        if not hasattr(local, "instance"):
+            local.instance = factory()
+        return local.instance
+    return get
+
+def _openai_compatible_server(sample_latency: Callable[[], float]) -> str:
+    """
+    Serve minimal chat completions on localhost, each after a sampled delay,
+    so the OpenAI client's own connection handling is measured without a
+    provider. Returns the base URL.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, like the provider, so clients that reuse connections can
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(sample_latency())
+            body = json.dumps({
+                "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+                "model": "gpt-4o",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "Benchmark answer."}}],
+                "usage": {"prompt_tokens": 20, "completion_tokens": 3, "total_tokens": 23},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/v1"
+
+def scenario_basic() -> Callable[[int], None]:
+    _example_path("01_basic_agent")
+    from basic_agent import create_basic_agent
+
+    agent = _per_thread(create_basic_agent)
+    agent()
+
+    def run(i: int):
+        agent().run(f"What is {i} multiplied by 7?")
+    return run
+
+def scenario_knowledge() -> Callable[[int], None]:
+    _example_path("02_knowledge_agent")
+    from knowledge_agent import create_knowledge_agent, load_documents_to_knowledge
+
+    def build():
+        knowledge_agent = create_knowledge_agent()
+        load_documents_to_knowledge(knowledge_agent)
+        return knowledge_agent
+
+    agent = _per_thread(build)
+    agent()
+    questions = [
+        "What are the core work hours for remote employees?",
+        "How should I handle lost equipment?",
+        "What are the best practices for API authentication?",
+    ]
+
+    def run(i: int):
+        agent().run(questions[i % len(questions)])
+    return run
+
+def scenario_memory() -> Callable[[int], None]:
+    _example_path("03_memory_agent")
+    from memory_agent import create_memory_agent
+
+    agent = _per_thread(lambda: create_memory_agent(f"benchmark-{threading.get_ident()}"))
+    agent()
+
+    def run(i: int):
+        memory_agent = agent()
+        memory_agent.run(f"Please remember that my favourite number is {i}.")
+        memory_agent.run("What is my favourite number?")
+    return run
+
+def scenario_team() -> Callable[[int], None]:
+    _example_path("04_team_agents")
+    from team_agents import create_team
+
+    team = _per_thread(create_team)
+    team()
+
+    def run(i: int):
+        team().run(f"Plan a task tracker for a team of {5 + i % 20} people.")
+    return run
+
+def scenario_workflow() -> Callable[[int], None]:
+    _example_path("05_workflows")
+    from workflows import ComplexWorkflow, WorkflowStateManager
+
+    manager = WorkflowStateManager("benchmark_workflows.db")
+
+    def run(i: int):
+        workflow = ComplexWorkflow(f"benchmark-{threading.get_ident()}-{i}", manager)
+        workflow.run_workflow({
+            "name": f"Benchmark workflow {i}",
+            "type": "data_analysis",
+            "priority": "medium",
+            "requirements": ["Summarise quarterly sales"],
+        })
+    return run
+
+def scenario_session() -> Callable[[int], None]:
+    _example_path("01_basic_agent")
+    from basic_agent import basic_agent_template, create_basic_agent
+
+    basic_agent_template()
+
+    def run(i: int):
+        create_basic_agent()
+    return run
+
+def scenario_hedge() -> Callable[[int], None]:
+    import copy
+
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    from agno.agent import Agent
+    from shared.hedging import HedgePolicy, enable_hedging
+    from shared.models import create_model, get_model_backend
+
+    # Twin models with the same latency distribution; only one is hedged
+    if get_model_backend() == "stub":
+        # The real client, against a local endpoint with the stub's latencies
+        from agno.models.openai import OpenAIChat
+        from shared.stub_model import StubModel
+
+        base_url = _openai_compatible_server(StubModel.from_env().sample_latency)
+        hedged_model = OpenAIChat(id="gpt-4o", base_url=base_url, api_key="benchmark")
+        plain_model = OpenAIChat(id="gpt-4o", base_url=base_url, api_key="benchmark")
+    else:
+        hedged_model = create_model("gpt-4o")
+        plain_model = copy.deepcopy(hedged_model)
+    hedger = enable_hedging(hedged_model, HedgePolicy.from_env() or HedgePolicy())
+    hedged = _per_thread(lambda: Agent(model=hedged_model))
+    plain = _per_thread(lambda: Agent(model=plain_model))
+    for i in range(HEDGE_PRIMING_CALLS):
+        hedged().run(f"Warm-up question {i}")
+    primed = hedger.stats()
+
+    hedged_ms: List[float] = []
+    plain_ms: List[float] = []
+    lock = threading.Lock()
+
+    def run(i: int):
+        start = time.perf_counter()
+        plain().run(f"Question {i}")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with lock:
+            plain_ms.append(elapsed_ms)
+        start = time.perf_counter()
+        hedged().run(f"Question {i}")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with lock:
+            hedged_ms.append(elapsed_ms)
+
+    def report() -> Dict[str, Any]:
+        stats = hedger.stats()
+        calls = stats["calls"] - primed["calls"]
+        hedges = stats["hedged"] - primed["hedged"]
+        unhedged_p99, hedged_p99 = percentile(plain_ms, 99), percentile(hedged_ms, 99)
+        return {
+            "unhedged_p99_ms": round(unhedged_p99, 2),
+            "hedged_p99_ms": round(hedged_p99, 2),
+            "p99_improvement": round(1 - hedged_p99 / unhedged_p99, 4) if unhedged_p99 else 0.0,
+            "hedge_rate": round(hedges / calls, 4) if calls else 0.0,
+            "hedge_wins": stats["hedge_wins"] - primed["hedge_wins"],
+            "extra_calls": hedges,
+            "hedge_delay_ms": stats["hedge_delay_ms"],
+        }
+
+    # The worker adds this to the scenario's results
+    run.report = report
+    return run
+
+def _data_heavy_mix() -> List[Dict[str, Any]]:
+    """Alternating financial (line items) and data processing (records) workflow inputs."""
+    import random
+
+    rng = random.Random(5)
+    mix = []
+    for i in range(EXECUTOR_MIX_INPUTS):
+        if i % 2:
+            mix.append({"type": "financial", "budget": 30_000, "line_items": [
+                {"item": f"LI-{n}", "amount": round(rng.uniform(-50, 40_000), 2)}
+                for n in range(EXECUTOR_MIX_RECORDS)]})
+        else:
+            mix.append({"type": "data_processing", "transformations": ["clean", "aggregate", "calculate_metrics"],
+                        "data": [{"region": rng.choice(["north", "south", "east", "west"]),
+                                  "units": rng.randint(0, 100), "price": round(rng.uniform(1, 500), 2)}
+                                 for _ in range(EXECUTOR_MIX_RECORDS)]})
+    return mix
+
+def scenario_executor() -> Callable[[int], None]:
+    _example_path("05_workflows")
+    from data_engine import VALIDATION_KERNELS, process_workflow_input
+    from executors import ProcessExecutor, StageExecutor
+    from prompt_inputs import PromptInputBuilder
+    from rules import evaluate_rules
+
+    mix = _data_heavy_mix()
+    builder = PromptInputBuilder()
+
+    def stage_work(executor, workflow_input: Dict[str, Any]):
+        # The CPU-heavy work ComplexWorkflow hands to its executor
+        handle = executor.share(workflow_input)
+        try:
+            executor.run(builder.build, handle)
+            executor.run(process_workflow_input, handle, list(VALIDATION_KERNELS))
+            executor.run(evaluate_rules, workflow_input["type"], handle)
+        finally:
+            executor.release(handle)
+
+    def run_mix(executor) -> float:
+        """Seconds to run the whole mix, one thread per workflow input."""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(mix)) as pool:
+            list(pool.map(lambda workflow_input: stage_work(executor, workflow_input), mix))
+        return time.perf_counter() - start
+
+    cores = os.cpu_count() or 1
+    process = ProcessExecutor(workers=cores)
+    run_mix(process)  # start the workers and their imports before timing
+
+    def run(i: int):
+        run_mix(process)
+
+    def report() -> Dict[str, Any]:
+        inline_seconds = run_mix(StageExecutor())
+        scaling = {}
+        workers = 1
+        while True:
+            executor = ProcessExecutor(workers=workers)
+            run_mix(executor)
+            seconds = run_mix(executor)
+            executor.shutdown()
+            scaling[str(workers)] = {
+                "inputs_per_sec": round(len(mix) / seconds, 2),
+                "speedup": round(inline_seconds / seconds, 2),
+            }
+            if workers >= cores:
+                break
+            workers = min(workers * 2, cores)
+        process.shutdown()
+        return {
+            "cores": cores,
+            "mix_inputs": len(mix),
+            "records_per_input": EXECUTOR_MIX_RECORDS,
+            "inline_inputs_per_sec": round(len(mix) / inline_seconds, 2),
+            "process_workers": scaling,
+        }
+
+    # The worker adds this to the scenario's results
+    run.report = report
+    return run
+
+SCENARIOS: Dict[str, Callable[[], Callable[[int], None]]] = {
+    "basic": scenario_basic,
+    "knowledge": scenario_knowledge,
+    "memory": scenario_memory,
+    "team": scenario_team,
+    "workflow": scenario_workflow,
+    "session": scenario_session,
+    "hedge": scenario_hedge,
+    "executor": scenario_executor,
+}
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of ``values`` (pct in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def read_process_io() -> Dict[str, int]:
+    """Storage-level I/O counters for this process (Linux only)."""
+    counters = {}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                key, value = line.split(":")
+                counters[key.strip()] = int(value)
+    except OSError:
+        pass
+    return counters
+
+def database_bytes(directory: Path) -> int:
+    """Total size of the SQLite files (including WAL/journal) in a directory."""
+    return sum(p.stat().st_size for p in directory.rglob("*.db*") if p.is_file())
+
+def run_scenario_worker(name: str, iterations: int, warmup: int, concurrency: int) -> Dict[str, Any]:
+    """Run one scenario in the current process and return its measurements."""
+    setup_start = time.perf_counter()
+    run = SCENARIOS[name]()
+    for i in range(warmup):
+        run(-1 - i)
+    setup_seconds = time.perf_counter() - setup_start
+
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    def timed(i: int):
+        start = time.perf_counter()
+        try:
+            run(i)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            return
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    io_before = read_process_io()
+    db_before = database_bytes(Path.cwd())
+    wall_start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, range(iterations)))
+    else:
+        for i in range(iterations):
+            timed(i)
+    wall_seconds = time.perf_counter() - wall_start
+    io_after = read_process_io()
+
+    io_delta = {key: io_after[key] - io_before.get(key, 0) for key in io_after}
+    result = {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "succeeded": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "setup_seconds": round(setup_seconds, 3),
+        "wall_seconds": round(wall_seconds, 3),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "throughput_ops": round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                             / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+        "db_io": {
+            "read_bytes": io_delta.get("read_bytes"),
+            "write_bytes": io_delta.get("write_bytes"),
+            "read_syscalls": io_delta.get("syscr"),
+            "write_syscalls": io_delta.get("syscw"),
+            "db_growth_bytes": database_bytes(Path.cwd()) - db_before,
+        },
+    }
+    report = getattr(run, "report", None)
+    if report is not None:
+        result[name] = report()
+    return result
+
+def run_scenario(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Run a scenario in a fresh subprocess and working directory."""
+    with tempfile.TemporaryDirectory(prefix=f"agno-bench-{name}-") as workdir:
+        result_file = Path(workdir) / "result.json"
+        log_file = Path(workdir) / "output.log"
+        env = dict(os.environ)
+        env.setdefault("AGNO_STUB_TOOL_SCRIPT", json.dumps(SCENARIO_TOOL_SCRIPTS[name]))
+        for key, value in SCENARIO_ENV.get(name, {}).items():
+            env.setdefault(key, value)
+
+        command = [
+            sys.executable, str(Path(__file__).resolve()),
+            "--worker", name,
+            "--iterations", str(args.iterations),
+            "--warmup", str(args.warmup),
+            "--concurrency", str(args.concurrency),
+            "--result-file", str(result_file),
+        ]
+        with open(log_file, "w") as log:
+            completed = subprocess.run(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+                                       timeout=args.timeout)
+
+        if completed.returncode != 0 or not result_file.exists():
+            output_tail = log_file.read_text(errors="replace").strip().splitlines()[-5:]
+            return {"error": f"exit code {completed.returncode}", "output_tail": output_tail}
+        return json.loads(result_file.read_text())
+
+def measure_import_ms(folder: str, module: str) -> Optional[float]:
+    """Cumulative import time of ``module`` in a fresh interpreter, via -X importtime."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=REPO_ROOT / folder, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return None
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    for line in completed.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000
+    return None
+
+def check_import_times(budget_ms: float) -> Dict[str, Any]:
+    """Measure every example module's import time and flag those over ``budget_ms``."""
+    imports = {}
+    for folder, module in EXAMPLE_MODULES.items():
+        import_ms = measure_import_ms(folder, module)
+        imports[module] = {
+            "import_ms": round(import_ms, 1) if import_ms is not None else None,
+            "over_budget": import_ms is None or import_ms > budget_ms,
+        }
+    return imports
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return a description of every metric that regressed by more than ``threshold``."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous or "error" in previous:
+            continue
+        if "error" in current:
+            regressions.append(f"{name}: failed ({current['error']}), baseline succeeded")
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change < -threshold) if higher_is_better else (change > threshold):
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+def print_report(results: Dict[str, Any]):
+    print("\n📊 Benchmark Results")
+    print("=" * 96)
+    print(f"{'scenario':<10} {'ok/err':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'ops/s':>8} {'rss MB':>8} {'write KB':>9} {'db +KB':>8}")
+    print("-" * 96)
+    for name, r in results["scenarios"].items():
+        if "error" in r:
+            print(f"{name:<10} ❌ {r['error']}")
+            for line in r.get("output_tail", []):
+                print(f"{'':<13}{line[:80]}")
+            continue
+        io = r["db_io"]
+        write_kb = f"{io['write_bytes'] / 1024:.0f}" if io["write_bytes"] is not None else "n/a"
+        print(f"{name:<10} {r['succeeded']:>4}/{r['errors']:<3} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+              f"{r['p99_ms']:>9.1f} {r['throughput_ops']:>8.2f} {r['peak_rss_mb']:>8.1f} "
+              f"{write_kb:>9} {io['db_growth_bytes'] / 1024:>8.0f}")
+        if r["first_error"]:
+            print(f"{'':<13}⚠️ {r['first_error'][:80]}")
+
+    hedging = results["scenarios"].get("hedge", {}).get("hedge")
+    if hedging:
+        print("\n🪃 Hedging")
+        print(f"   p99 {hedging['unhedged_p99_ms']:.1f} ms unhedged -> {hedging['hedged_p99_ms']:.1f} ms hedged "
+              f"({hedging['p99_improvement']:.0%} lower)")
+        print(f"   hedge rate {hedging['hedge_rate']:.1%} ({hedging['extra_calls']} extra calls, "
+              f"{hedging['hedge_wins']} won by the duplicate), hedge delay {hedging['hedge_delay_ms']} ms")
+
+    executor = results["scenarios"].get("executor", {}).get("executor")
+    if executor:
+        print(f"\n🧮 Stage executors ({executor['mix_inputs']} inputs x {executor['records_per_input']} records, "
+              f"{executor['cores']} cores)")
+        print(f"   inline       {executor['inline_inputs_per_sec']:>8.2f} inputs/s")
+        for workers, r in executor["process_workers"].items():
+            print(f"   {workers:>2} processes  {r['inputs_per_sec']:>8.2f} inputs/s  ({r['speedup']:.2f}x inline)")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Agno example agents, team and workflows.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--iterations", type=int, default=20, help="Measured iterations per scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured warm-up iterations per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="Threads issuing iterations in parallel")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds before a scenario is abandoned")
+    parser.add_argument("--output", help="Where to write the JSON results (default: benchmarks/results/)")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative change that counts as a regression (default: 0.2 = 20%%)")
+    parser.add_argument("--import-budget-ms", type=float, default=100,
+                        help="Maximum import time of an example module (default: %(default)s ms)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("AGNO_MODEL_BACKEND", "stub")
+
+    if args.worker:
+        result = run_scenario_worker(args.worker, args.iterations, args.warmup, args.concurrency)
+        Path(args.result_file).write_text(json.dumps(result))
+        return 0
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    print("🏁 Running Agno benchmarks")
+    print(f"   Backend: {os.environ['AGNO_MODEL_BACKEND']} | iterations: {args.iterations} | "
+          f"warm-up: {args.warmup} | concurrency: {args.concurrency}")
+
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "backend": os.environ["AGNO_MODEL_BACKEND"],
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"iterations": args.iterations, "warmup": args.warmup, "concurrency": args.concurrency},
+        "scenarios": {},
+    }
+    for name in names:
+        print(f"⏱️  {name}...", flush=True)
+        results["scenarios"][name] = run_scenario(name, args)
+
+    print_report(results)
+
+    results["imports"] = check_import_times(args.import_budget_ms)
+    print(f"\n📦 Import time (budget {args.import_budget_ms:.0f} ms)")
+    for module, entry in results["imports"].items():
+        if entry["import_ms"] is None:
+            print(f"   ❌ {module}: import failed")
+        else:
+            print(f"   {'❌' if entry['over_budget'] else '✅'} {module}: {entry['import_ms']:.1f} ms")
+    slow_imports = [module for module, entry in results["imports"].items() if entry["over_budget"]]
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\n💾 Results saved to {output}")
+
+    if slow_imports:
+        print(f"\n🚨 Over the import budget: {', '.join(slow_imports)}")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2))
+        print(f"📌 Baseline updated: {baseline_path}")
+        return 1 if slow_imports else 0
+
+    if not baseline_path.exists():
+        print("ℹ️ No baseline found; run with --save-baseline to store one.")
+        return 1 if slow_imports else 0
+
+    regressions = compare_to_baseline(results, json.loads(baseline_path.read_text()), args.threshold)
+    if regressions:
+        print(f"\n🚨 {len(regressions)} regression(s) against {baseline_path}:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+    print(f"\n✅ No regressions against {baseline_path} (threshold {args.threshold:.0%})")
+    return 1 if slow_imports else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""
+Shared helpers used by every example in the Agno learning series.
+
+Each example folder adds the repository root to ``sys.path`` before importing
+from this package, so the examples can still be run from their own folder.
+"""
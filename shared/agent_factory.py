@@ -0,0 +1,221 @@
+"""
+Agent templates: build the session-independent parts of an agent once and
+stamp out per-session agents from them.
+
+Building an agent from scratch instantiates its toolkits, parses every tool
+function's signature and docstring into a JSON schema, and creates a model
+client. None of that depends on the session, so an ``AgentTemplate`` does it
+once:
+
+- the model instance is shared by every session stamped from the template
+- toolkit functions are processed once; each session gets shallow copies of
+  them, because agno records the owning agent on the Function when a run starts
+- instructions are frozen into a tuple and the settings into a read-only mapping
+- the system message is kept cache-friendly: agno places memories and session
+  summaries in the middle of it, so they are moved to the end, leaving a
+  static prefix that is byte-identical across calls and sessions. Provider
+  prompt caching (OpenAI caches prompts of 1024+ tokens) matches on exactly
+  that prefix, after the tool schemas, which agno already sends in a fixed order
+
+Per-session pieces (memory, knowledge, session ids) are passed to
+``new_session`` as overrides. A ``session_context`` callback can add its own
+per-turn text to the dynamic end of the system message:
+
+    template = AgentTemplate(name="Helper", model=create_model("gpt-4o"),
+                             tools=[CalculatorTools()], instructions=["Be concise"])
+    agent = template.new_session(session_id="abc")
+    print(template.stats())   # build time, session construction, prefix variants
+
+Memory databases are shared too: ``shared_memory_db`` returns one
+SqliteMemoryDb (and so one SQLAlchemy engine) per table and file, and
+``shared_agent_storage`` does the same for agno's session storage.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Sequence, Set, Tuple
+
+if TYPE_CHECKING:
+    from agno.agent import Agent
+    from agno.memory.v2.db.sqlite import SqliteMemoryDb
+    from agno.models.base import Model
+    from agno.storage.sqlite import SqliteStorage
+    from agno.models.message import Message
+
+# Called as session_context(agent, session_id, user_id) before every model run
+SessionContext = Callable[["Agent", str, Optional[str]], Optional[str]]
+
+# Per-user and per-session text that agno writes into the system message
+_DYNAMIC_SYSTEM_BLOCKS = re.compile(
+    r"You have access to memories from previous interactions.*?over the past memories\.\n*"
+    r"|You have the capability to retain memories from previous interactions.*?with the user yet\.\n*"
+    r"|Here is a brief summary of your previous interactions:.*?over the past summary\.\n*",
+    re.DOTALL,
+)
+
+def split_system_message(content: str) -> Tuple[str, str]:
+    """Split a system message into its static prefix and its per-session blocks."""
+    dynamic = _DYNAMIC_SYSTEM_BLOCKS.findall(content)
+    if not dynamic:
+        return content, ""
+    static = _DYNAMIC_SYSTEM_BLOCKS.sub("", content)
+    return static.strip(), "\n\n".join(block.strip() for block in dynamic)
+
+class AgentTemplate:
+    """The immutable, session-independent parts of an agent."""
+
+    def __init__(self, name: str, model: "Model", tools: Sequence[Any] = (),
+                 instructions: Sequence[str] = (), **settings: Any):
+        started = time.perf_counter()
+        self.name = name
+        self.model = model
+        self.tools = tuple(_prepare_tool(tool) for tool in tools)
+        self.instructions = tuple(instructions)
+        self.settings = MappingProxyType(dict(settings))
+        self.build_ms = (time.perf_counter() - started) * 1000
+
+        self._lock = threading.Lock()
+        self._sessions = 0
+        self._session_total_ms = 0.0
+        self._session_max_ms = 0.0
+        self._system_prefixes: Set[str] = set()
+        self._config_hash: Optional[str] = None
+
+    def new_session(self, session_context: Optional[SessionContext] = None, **overrides: Any) -> "Agent":
+        """
+        Create an agent from the template.
+
+        Args:
+            session_context: Optional callback whose text is appended to the
+                dynamic end of the system message on every run.
+            **overrides: Agent arguments for this session only, e.g. memory,
+                session_name or user_id. They take precedence over the template.
+        """
+        from agno.agent import Agent
+
+        started = time.perf_counter()
+        kwargs: Dict[str, Any] = dict(self.settings)
+        kwargs.update(
+            name=self.name,
+            model=self.model,
+            tools=[_copy_tool(tool) for tool in self.tools],
+            instructions=list(self.instructions),
+        )
+        kwargs.update(overrides)
+        agent = Agent(**kwargs)
+        agent.get_system_message = self._cache_friendly_system_message(agent, session_context)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._sessions += 1
+            self._session_total_ms += elapsed_ms
+            self._session_max_ms = max(self._session_max_ms, elapsed_ms)
+        return agent
+
+    def _cache_friendly_system_message(self, agent: "Agent", session_context: Optional[SessionContext]):
+        """Wrap an agent's get_system_message so per-session blocks come last."""
+        build = agent.get_system_message
+
+        def get_system_message(session_id: str, user_id: Optional[str] = None) -> Optional["Message"]:
+            message = build(session_id, user_id)
+            if message is None or not isinstance(message.content, str):
+                return message
+            static, dynamic = split_system_message(message.content)
+            if session_context is not None:
+                extra = session_context(agent, session_id, user_id)
+                dynamic = "\n\n".join(part for part in (dynamic, extra) if part)
+            with self._lock:
+                self._system_prefixes.add(hashlib.sha256(static.encode("utf-8")).hexdigest())
+            message.content = f"{static}\n\n{dynamic}" if dynamic else static
+            return message
+        return get_system_message
+
+    def config_hash(self) -> str:
+        """
+        A hash of everything that shapes the agent's answers: model, instructions,
+        tools and settings. Results cached per agent are keyed on it.
+        """
+        if self._config_hash is None:
+            config = {
+                "name": self.name,
+                "model": [type(self.model).__name__, getattr(self.model, "id", None)],
+                "instructions": self.instructions,
+                "tools": [_tool_signature(tool) for tool in self.tools],
+                "settings": dict(self.settings),
+            }
+            # Objects without a JSON form (storage, knowledge) count by their type
+            encoded = json.dumps(config, sort_keys=True, default=lambda value: type(value).__name__)
+            self._config_hash = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+        return self._config_hash
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Template build time and per-session construction times, in milliseconds,
+        and how many distinct static system prompt prefixes were sent (1 means
+        every call could hit the provider's prompt cache).
+        """
+        with self._lock:
+            sessions = self._sessions
+            return {
+                "name": self.name,
+                "build_ms": round(self.build_ms, 3),
+                "sessions": sessions,
+                "mean_session_ms": round(self._session_total_ms / sessions, 3) if sessions else 0.0,
+                "max_session_ms": round(self._session_max_ms, 3),
+                "system_prefix_variants": len(self._system_prefixes),
+            }
+
+def _prepare_tool(tool: Any) -> Any:
+    """Process a toolkit's functions up front so sessions skip the schema parsing."""
+    from agno.tools.toolkit import Toolkit
+
+    if isinstance(tool, Toolkit):
+        for function in tool.functions.values():
+            function.process_entrypoint()
+            function.skip_entrypoint_processing = True
+    return tool
+
+def _tool_signature(tool: Any) -> Any:
+    """A toolkit's function names and parameter schemas, or a plain tool's name."""
+    from agno.tools.toolkit import Toolkit
+
+    if isinstance(tool, Toolkit):
+        return {name: function.parameters for name, function in sorted(tool.functions.items())}
+    return getattr(tool, "name", None) or getattr(tool, "__name__", type(tool).__name__)
+
+def _copy_tool(tool: Any) -> Any:
+    """Give a session its own Function objects; entrypoints and schemas stay shared."""
+    from agno.tools.toolkit import Toolkit
+
+    if not isinstance(tool, Toolkit):
+        return tool
+    session_tool = copy.copy(tool)
+    session_tool.functions = type(tool.functions)(
+        (name, function.model_copy()) for name, function in tool.functions.items()
+    )
+    return session_tool
+
+@lru_cache(maxsize=None)
+def _memory_db(table_name: str, db_file: str) -> "SqliteMemoryDb":
+    from agno.memory.v2.db.sqlite import SqliteMemoryDb
+    return SqliteMemoryDb(table_name=table_name, db_file=db_file)
+
+def shared_memory_db(table_name: str, db_file: str) -> "SqliteMemoryDb":
+    """One SqliteMemoryDb per table and database file, shared by every session."""
+    return _memory_db(table_name, os.path.abspath(db_file))
+
+@lru_cache(maxsize=None)
+def _agent_storage(table_name: str, db_file: str) -> "SqliteStorage":
+    from agno.storage.sqlite import SqliteStorage
+    return SqliteStorage(table_name=table_name, db_file=db_file)
+
+def shared_agent_storage(table_name: str, db_file: str) -> "SqliteStorage":
+    """One SqliteStorage (agent sessions and their run history) per table and database file."""
+    return _agent_storage(table_name, os.path.abspath(db_file))
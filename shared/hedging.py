@@ -0,0 +1,248 @@
+"""
+Hedged model requests: cut tail latency by racing a duplicate call.
+
+Most model calls finish close to the median, but a few take many times
+longer. With hedging enabled, a call that is still running when it passes the
+``percentile`` of recent latencies gets a duplicate request. Whichever answers
+first wins, and the other one is abandoned. Only the slowest few percent of
+calls are duplicated, so the extra spend is small, and ``max_hedge_rate`` caps
+it outright.
+
+Hedging is installed on a model instance, so every agent sharing the model
+(e.g. all sessions stamped from one AgentTemplate) is hedged:
+
+    hedger = enable_hedging(agent.model, HedgePolicy(percentile=95, max_hedge_rate=0.1))
+    agent.run("...")
+    print(hedger.stats())   # calls, hedge rate, wins by the duplicate, extra calls
+
+Synchronous calls (``invoke``, what ``Agent.run`` uses) race on a small,
+bounded thread pool owned by the hedger, so both requests go through the
+model's own sync client. A sync request cannot be interrupted: the loser runs
+to completion in the background and its answer is dropped, and a call that
+finds every pool thread busy is simply not hedged. Async calls (``ainvoke``)
+race as tasks on the caller's event loop, and the loser is cancelled, which
+closes its connection. Streaming calls are not hedged.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Deque, Dict, Optional, Set
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    from agno.models.base import Model
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """When to send a duplicate request, and how many duplicates are allowed."""
+    # Hedge calls still running at this percentile of recent latencies
+    percentile: float = 95.0
+    # At most this share of calls may be hedged (the cap on extra spend)
+    max_hedge_rate: float = 0.1
+    # Latencies needed before hedging starts, and how many recent ones to keep
+    min_samples: int = 20
+    window: int = 200
+    # Never hedge earlier than this, however fast recent calls were
+    min_delay_s: float = 0.05
+    # Threads racing sync calls; sync calls beyond this run unhedged
+    max_workers: int = 32
+
+    @classmethod
+    def from_env(cls) -> Optional["HedgePolicy"]:
+        """
+        A policy from AGNO_HEDGE_PERCENTILE and AGNO_HEDGE_MAX_RATE, or None
+        when AGNO_HEDGE_PERCENTILE is not set (hedging is off by default).
+        """
+        percentile = os.getenv("AGNO_HEDGE_PERCENTILE")
+        if not percentile:
+            return None
+        return cls(percentile=float(percentile),
+                   max_hedge_rate=float(os.getenv("AGNO_HEDGE_MAX_RATE", cls.max_hedge_rate)))
+
+class Hedger:
+    """Replaces a model's invoke/ainvoke with hedged versions and counts the outcome."""
+
+    def __init__(self, model: "Model", policy: HedgePolicy):
+        self.model = model
+        self.policy = policy
+        # Whatever the model called before hedging was installed (e.g. a rate limiter)
+        self._invoke = model.invoke
+        self._ainvoke = model.ainvoke
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=policy.window)
+        self._calls = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._cancelled = 0
+        # Created on the first hedged sync call; _busy counts its threads in use
+        self._pool: Optional["ThreadPoolExecutor"] = None
+        self._pool_size = 0
+        self._busy = 0
+
+    def __deepcopy__(self, memo):
+        # agno deep-copies models (e.g. Memory keeps its own copy); the copy
+        # gets its own hedger and statistics
+        from copy import deepcopy
+        copied = Hedger(deepcopy(self.model, memo), self.policy)
+        copied._invoke = deepcopy(self._invoke, memo)
+        copied._ainvoke = deepcopy(self._ainvoke, memo)
+        return copied
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little history."""
+        with self._lock:
+            if len(self._latencies) < self.policy.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        rank = min(len(ordered) - 1, int(round((len(ordered) - 1) * self.policy.percentile / 100)))
+        return max(self.policy.min_delay_s, ordered[rank])
+
+    def invoke(self, *args: Any, **kwargs: Any) -> Any:
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        delay = self.hedge_delay()
+        with self._lock:
+            self._calls += 1
+        if delay is None or not self._take_thread():
+            return self._timed_sync(*args, **kwargs)
+
+        primary = self._submit(*args, **kwargs)
+        done, _ = wait({primary}, timeout=delay)
+        if done or not self._claim_hedge(thread=True):
+            return primary.result()
+
+        hedge = self._submit(*args, **kwargs)
+        pending: Set["Future"] = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                # A running sync request cannot be stopped; the loser finishes
+                # on its thread and its answer is dropped
+                self._count_win(future is hedge, len(pending))
+                return future.result()
+        raise error
+
+    async def ainvoke(self, *args: Any, **kwargs: Any) -> Any:
+        import asyncio
+
+        delay = self.hedge_delay()
+        with self._lock:
+            self._calls += 1
+        primary = asyncio.ensure_future(self._timed_async(*args, **kwargs))
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._claim_hedge():
+            return await primary
+
+        hedge = asyncio.ensure_future(self._timed_async(*args, **kwargs))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                for loser in pending:
+                    loser.cancel()
+                self._count_win(task is hedge, len(pending))
+                return task.result()
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls made, how many were hedged, and how often the duplicate won."""
+        delay = self.hedge_delay()
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "hedged": self._hedged,
+                "hedge_rate": round(self._hedged / self._calls, 4) if self._calls else 0.0,
+                "hedge_wins": self._hedge_wins,
+                "cancelled": self._cancelled,
+                "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+            }
+
+    def _claim_hedge(self, thread: bool = False) -> bool:
+        """Count a hedge if the spend cap (and, for a sync call, a free pool thread) allows one more."""
+        with self._lock:
+            if self._hedged + 1 > self.policy.max_hedge_rate * self._calls:
+                return False
+            if thread and self._busy >= self._pool_size:
+                return False
+            self._hedged += 1
+            self._busy += thread
+            return True
+
+    def _count_win(self, by_hedge: bool, losers: int):
+        with self._lock:
+            self._cancelled += losers
+            if by_hedge:
+                self._hedge_wins += 1
+
+    def _take_thread(self) -> bool:
+        """Reserve a pool thread for a sync call, creating the pool on first use."""
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._pool_size = max(2, self.policy.max_workers)
+                self._pool = ThreadPoolExecutor(max_workers=self._pool_size, thread_name_prefix="hedge")
+            if self._busy >= self._pool_size:
+                return False
+            self._busy += 1
+            return True
+
+    def _submit(self, *args: Any, **kwargs: Any) -> "Future":
+        """Run a sync call on a reserved pool thread, in the caller's context (e.g. its trace span)."""
+        return self._pool.submit(contextvars.copy_context().run, self._pooled_sync, *args, **kwargs)
+
+    def _pooled_sync(self, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return self._timed_sync(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._busy -= 1
+
+    async def _timed_async(self, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        result = await self._ainvoke(*args, **kwargs)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - started)
+        return result
+
+    def _timed_sync(self, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        result = self._invoke(*args, **kwargs)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - started)
+        return result
+
+def enable_hedging(model: "Model", policy: Optional[HedgePolicy] = None) -> Hedger:
+    """
+    Hedge a model's non-streaming calls. Calling it again for the same model
+    returns the existing hedger with the new policy applied.
+    """
+    policy = policy or HedgePolicy()
+    hedger = get_hedger(model)
+    if hedger is not None:
+        hedger.policy = policy
+        return hedger
+    hedger = Hedger(model, policy)
+    model.invoke = hedger.invoke
+    model.ainvoke = hedger.ainvoke
+    return hedger
+
+def get_hedger(model: "Model") -> Optional[Hedger]:
+    """The hedger installed on ``model``, if any."""
+    hedger = getattr(model.__dict__.get("invoke"), "__self__", None)
+    return hedger if isinstance(hedger, Hedger) else None
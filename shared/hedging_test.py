@@ -0,0 +1,104 @@
+"""
+Tests for hedged model calls: when a duplicate is sent, which answer wins,
+and what happens to the loser.
+
+    python -m pytest shared/hedging_test.py -q
+"""
+
+import asyncio
+import threading
+import time
+
+from shared.hedging import HedgePolicy, enable_hedging, get_hedger
+
+class FakeModel:
+    """Answers after the next delay from ``delays``, in call order."""
+
+    def __init__(self, *delays: float):
+        self.delays = list(delays)
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    def _next_delay(self) -> float:
+        with self._lock:
+            return self.delays.pop(0)
+
+    def invoke(self, prompt: str):
+        delay = self._next_delay()
+        time.sleep(delay)
+        return delay
+
+    async def ainvoke(self, prompt: str):
+        delay = self._next_delay()
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return delay
+
+POLICY = HedgePolicy(percentile=50, max_hedge_rate=1.0, min_samples=3, min_delay_s=0.01)
+
+def _primed(model: FakeModel, policy: HedgePolicy = POLICY):
+    """Enable hedging and give it a history of 10 ms calls."""
+    hedger = enable_hedging(model, policy)
+    for _ in range(policy.min_samples):
+        model.invoke("warm-up")
+    return hedger
+
+def test_no_hedging_until_enough_history():
+    model = FakeModel(0.05)
+    hedger = enable_hedging(model, POLICY)
+    assert model.invoke("q") == 0.05
+    assert hedger.stats()["hedged"] == 0
+
+def test_sync_duplicate_wins_over_a_slow_call():
+    model = FakeModel(0.01, 0.01, 0.01, 1.0, 0.01)
+    hedger = _primed(model)
+    started = time.perf_counter()
+    assert model.invoke("q") == 0.01
+    # Answered by the duplicate, without waiting for the slow call
+    assert time.perf_counter() - started < 0.5
+    stats = hedger.stats()
+    assert (stats["hedged"], stats["hedge_wins"], stats["cancelled"]) == (1, 1, 1)
+
+def test_sync_fast_call_is_not_hedged():
+    model = FakeModel(0.01, 0.01, 0.01, 0.005)
+    hedger = _primed(model)
+    assert model.invoke("q") == 0.005
+    assert hedger.stats()["hedged"] == 0
+
+def test_hedge_rate_is_capped():
+    # Three slow calls after priming; at 10% of calls only none of them may be hedged
+    model = FakeModel(0.01, 0.01, 0.01, 0.05, 0.05, 0.05)
+    hedger = _primed(model, HedgePolicy(percentile=50, max_hedge_rate=0.1, min_samples=3, min_delay_s=0.01))
+    for _ in range(3):
+        assert model.invoke("q") == 0.05
+    assert hedger.stats()["hedged"] == 0
+
+def test_sync_calls_beyond_the_pool_are_not_hedged():
+    policy = HedgePolicy(percentile=50, max_hedge_rate=1.0, min_samples=3, min_delay_s=0.01, max_workers=2)
+    model = FakeModel(0.01, 0.01, 0.01, *[0.2] * 8)
+    hedger = _primed(model, policy)
+    threads = [threading.Thread(target=model.invoke, args=("q",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Never more requests in flight than pool threads plus the calls run on their callers
+    assert hedger.stats()["hedged"] <= 2
+    assert hedger._busy == 0
+
+def test_async_loser_is_cancelled():
+    model = FakeModel(0.01, 0.01, 0.01, 1.0, 0.01)
+    hedger = _primed(model)
+    assert asyncio.run(model.ainvoke("q")) == 0.01
+    assert model.cancelled == 1
+    assert hedger.stats()["cancelled"] == 1
+
+def test_enable_hedging_twice_keeps_one_hedger():
+    model = FakeModel()
+    hedger = enable_hedging(model, POLICY)
+    policy = HedgePolicy(percentile=99)
+    assert enable_hedging(model, policy) is hedger
+    assert get_hedger(model).policy == policy
@@ -0,0 +1,94 @@
+"""
+Model Backends
+==============
+
+Every example builds its models through ``create_model`` so the backend can be
+chosen with configuration instead of code changes:
+
+    AGNO_MODEL_BACKEND=openai   # default: OpenAIChat, needs OPENAI_API_KEY
+    AGNO_MODEL_BACKEND=stub     # deterministic offline StubModel, no network
+
+``create_embedder`` picks the matching embedding model the same way.
+
+The stub is meant for measuring the framework's own overhead and running the
+examples and test scripts as repeatable load tests. It can be tuned with:
+
+    AGNO_STUB_LATENCY_MS=250              # mean simulated latency
+    AGNO_STUB_LATENCY_JITTER_MS=50        # spread around the mean
+    AGNO_STUB_LATENCY_DISTRIBUTION=normal # fixed | uniform | normal | lognormal
+    AGNO_STUB_OUTPUT_TOKENS=128           # length of generated answers
+    AGNO_STUB_SEED=42                     # seed for latency sampling
+    AGNO_STUB_TOOL_SCRIPT='[[{"name": "add", "arguments": {"a": 1, "b": 2}}]]'
+    AGNO_STUB_ERROR_RATE=0.1              # share of calls failing with a transient 503
+
+With either backend, AGNO_RATE_LIMIT_RPM / AGNO_RATE_LIMIT_TPM put every model
+behind one shared rate limiter (see shared/rate_limit.py).
+"""
+
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from agno.embedder.base import Embedder
+    from agno.models.base import Model
+
+MODEL_BACKENDS = ("openai", "stub")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return max(1, len(text) // 4) if text else 0
+
+def get_model_backend() -> str:
+    """Return the configured model backend name."""
+    backend = os.getenv("AGNO_MODEL_BACKEND", "openai").strip().lower()
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown AGNO_MODEL_BACKEND '{backend}', expected one of {MODEL_BACKENDS}")
+    return backend
+
+def requires_api_key() -> bool:
+    """Whether the configured backend needs OPENAI_API_KEY."""
+    return get_model_backend() == "openai"
+
+def create_model(model_id: str = "gpt-4o") -> "Model":
+    """
+    Create the chat model used by the examples.
+
+    Args:
+        model_id: Provider model ID; the stub uses it to label its responses.
+    """
+    # Provider and agno model modules are imported on first use to keep
+    # importing the examples cheap
+    if get_model_backend() == "stub":
+        from shared.stub_model import StubModel
+        model = StubModel.from_env(model_id)
+    else:
+        from agno.models.openai import OpenAIChat
+        model = OpenAIChat(id=model_id)
+
+    from shared.rate_limit import limit_model, shared_rate_limiter
+    limiter = shared_rate_limiter()
+    if limiter is not None:
+        limit_model(model, limiter)
+    return model
+
+def create_embedder(dimensions: int = 256) -> "Embedder":
+    """
+    Create the embedding model used for semantic search (memory retrieval).
+
+    Args:
+        dimensions: Vector size. text-embedding-3 models can return shortened
+            vectors, which keeps similarity search fast in pure Python.
+    """
+    if get_model_backend() == "stub":
+        from shared.stub_model import StubEmbedder
+        return StubEmbedder(dimensions=dimensions)
+
+    from agno.embedder.openai import OpenAIEmbedder
+    return OpenAIEmbedder(id="text-embedding-3-small", dimensions=dimensions)
+
+def __getattr__(name: str):
+    # StubModel lives in shared.stub_model so importing this module stays cheap
+    if name in ("StubModel", "StubEmbedder"):
+        from shared import stub_model
+        return getattr(stub_model, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,318 @@
+"""
+A shared rate limiter for model calls.
+
+Every model instance calls the provider on its own, so once workflows, team
+members and memory managers run concurrently they overshoot the provider's
+rate limits together, and the 429s set off retries that make it worse. A
+RateLimiter admits calls through two token buckets, requests per minute and
+tokens per minute, refilled continuously like the provider's own limits:
+
+- a call reserves its estimated tokens (prompt plus the output allowance,
+  which is how OpenAI counts them) and waits until both buckets have room
+- when the response arrives, the reservation is corrected to the tokens the
+  provider reported
+- waiting calls are admitted by priority, then in arrival order, so
+  user-facing agent runs go ahead of background memory and summary work
+
+``create_model`` puts every model behind one process-wide limiter when
+AGNO_RATE_LIMIT_RPM or AGNO_RATE_LIMIT_TPM is set. agno gives each Memory's
+memory manager and session summarizer a deep copy of the model; copies share
+the limiter at the original's priority, and ``limit_memory_in_background``
+moves a Memory's copies to background priority. With AGNO_RATE_LIMIT_FILE the
+bucket levels live in a locked file, so several processes on one machine
+share one budget (POSIX only; priorities then apply within each process).
+
+    limiter = RateLimiter(requests_per_minute=500, tokens_per_minute=30_000)
+    limit_model(agent.model, limiter)
+    print(limiter.stats())   # admitted calls, tokens, queue time per priority
+"""
+
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from shared.models import estimate_tokens
+from shared.tracing import start_span
+
+if TYPE_CHECKING:
+    from agno.models.base import Model
+
+# Lower values are admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+# Output tokens reserved for a call when the model sets no max_tokens
+DEFAULT_OUTPUT_TOKENS = 512
+# Waiting calls re-check the buckets at least this often (other processes may refill them)
+MAX_POLL_S = 1.0
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets with prioritised admission."""
+
+    def __init__(self, requests_per_minute: float = math.inf, tokens_per_minute: float = math.inf,
+                 state_file: Optional[str] = None):
+        """
+        Args:
+            requests_per_minute: Sustained request rate; also the burst size.
+            tokens_per_minute: Sustained token rate; also the burst size.
+            state_file: Keep the bucket levels in this file so that every
+                process using it shares the budget.
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.state_file = os.path.abspath(state_file) if state_file else None
+        self._cond = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []
+        self._tickets = itertools.count()
+        self._levels = {"requests": requests_per_minute, "tokens": tokens_per_minute, "updated": time.time()}
+        self._stats: Dict[int, Dict[str, float]] = {}
+        self._tokens_reserved = 0
+        self._tokens_used = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["RateLimiter"]:
+        """
+        A limiter from AGNO_RATE_LIMIT_RPM, AGNO_RATE_LIMIT_TPM and
+        AGNO_RATE_LIMIT_FILE, or None when neither limit is set.
+        """
+        rpm, tpm = os.getenv("AGNO_RATE_LIMIT_RPM"), os.getenv("AGNO_RATE_LIMIT_TPM")
+        if not rpm and not tpm:
+            return None
+        return cls(requests_per_minute=float(rpm) if rpm else math.inf,
+                   tokens_per_minute=float(tpm) if tpm else math.inf,
+                   state_file=os.getenv("AGNO_RATE_LIMIT_FILE") or None)
+
+    def acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """
+        Wait until one request and ``tokens`` tokens may be spent, and spend them.
+
+        Returns the seconds spent waiting.
+        """
+        # A call larger than the whole bucket would never fit; let it drain the bucket instead
+        tokens = min(tokens, self.tokens_per_minute)
+        started = time.perf_counter()
+        with self._cond:
+            ticket = (priority, next(self._tickets))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._waiting[0] == ticket:
+                        wait = self._take(tokens)
+                        if wait <= 0:
+                            break
+                    self._cond.wait(min(wait, MAX_POLL_S) if wait is not None else MAX_POLL_S)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+            waited = time.perf_counter() - started
+            self._tokens_reserved += tokens
+            stats = self._stats.setdefault(priority, {"calls": 0, "queued": 0, "wait_s": 0.0, "max_wait_s": 0.0})
+            stats["calls"] += 1
+            stats["wait_s"] += waited
+            stats["max_wait_s"] = max(stats["max_wait_s"], waited)
+            if waited > 0.001:
+                stats["queued"] += 1
+        return waited
+
+    async def acquire_async(self, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """``acquire`` without blocking the event loop."""
+        import asyncio
+        return await asyncio.to_thread(self.acquire, tokens, priority)
+
+    def settle(self, reserved: int, used: Optional[int]):
+        """Correct a reservation to the tokens the call actually used."""
+        if used is None:
+            return
+        reserved = min(reserved, self.tokens_per_minute)
+        with self._cond:
+            self._tokens_used += used
+            with self._state() as levels:
+                self._refill(levels)
+                levels["tokens"] = min(self.tokens_per_minute, levels["tokens"] + reserved - used)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Admitted calls and their queue time per priority, and reserved versus used tokens."""
+        with self._cond:
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "waiting": len(self._waiting),
+                "tokens_reserved": self._tokens_reserved,
+                "tokens_used": self._tokens_used,
+                "priorities": {
+                    PRIORITY_NAMES.get(priority, str(priority)): {
+                        "calls": int(s["calls"]),
+                        "queued": int(s["queued"]),
+                        "mean_wait_ms": round(s["wait_s"] / s["calls"] * 1000, 2) if s["calls"] else 0.0,
+                        "max_wait_ms": round(s["max_wait_s"] * 1000, 2),
+                    }
+                    for priority, s in sorted(self._stats.items())
+                },
+            }
+
+    def _take(self, tokens: int) -> float:
+        """Spend one request and ``tokens`` if both buckets allow; otherwise the seconds until they will."""
+        with self._state() as levels:
+            self._refill(levels)
+            wait = max(_seconds_until(levels["requests"], 1, self.requests_per_minute),
+                       _seconds_until(levels["tokens"], tokens, self.tokens_per_minute))
+            if wait <= 0:
+                levels["requests"] -= 1
+                levels["tokens"] -= tokens
+            return wait
+
+    def _refill(self, levels: Dict[str, float]):
+        now = time.time()
+        elapsed = max(0.0, now - levels["updated"])
+        levels["requests"] = min(self.requests_per_minute, levels["requests"] + elapsed * self.requests_per_minute / 60)
+        levels["tokens"] = min(self.tokens_per_minute, levels["tokens"] + elapsed * self.tokens_per_minute / 60)
+        levels["updated"] = now
+
+    @contextmanager
+    def _state(self) -> Iterator[Dict[str, float]]:
+        """The bucket levels: in memory, or read from and written back to the locked state file."""
+        if self.state_file is None:
+            yield self._levels
+            return
+
+        import fcntl
+
+        with open(self.state_file, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    levels = json.loads(f.read())
+                except ValueError:
+                    levels = dict(self._levels)
+                yield levels
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(levels))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def _seconds_until(level: float, amount: float, per_minute: float) -> float:
+    if math.isinf(per_minute) or level >= amount:
+        return 0.0
+    return (amount - level) * 60 / per_minute
+
+def estimate_call_tokens(model: "Model", messages: Optional[List[Any]], tools: Optional[List[Any]] = None) -> int:
+    """Tokens a call counts against the limit: the prompt plus the output allowance."""
+    prompt = "\n".join(str(m.content) for m in messages or [] if getattr(m, "content", None) is not None)
+    tool_text = json.dumps(tools, default=str) if tools else ""
+    output = getattr(model, "max_completion_tokens", None) or getattr(model, "max_tokens", None)
+    return estimate_tokens(prompt) + estimate_tokens(tool_text) + (output or DEFAULT_OUTPUT_TOKENS)
+
+def used_tokens(response: Any) -> Optional[int]:
+    """Total tokens reported in a provider response or stream chunk, if any."""
+    usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage", None)
+    if not usage:
+        return None
+    if isinstance(usage, dict):
+        total = usage.get("total_tokens")
+        return total if total is not None else usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+    return getattr(usage, "total_tokens", None)
+
+class RateLimitGate:
+    """Replaces a model's invoke methods with ones that are admitted by a RateLimiter first."""
+
+    def __init__(self, model: "Model", limiter: RateLimiter, priority: int = PRIORITY_INTERACTIVE):
+        self.model = model
+        self.limiter = limiter
+        self.priority = priority
+
+    def __deepcopy__(self, memo):
+        # agno deep-copies models (Memory's managers, a Team's reasoning
+        # model); the copy shares the limiter and keeps the priority
+        from copy import deepcopy
+        return RateLimitGate(deepcopy(self.model, memo), self.limiter, self.priority)
+
+    def invoke(self, messages: List[Any], *args: Any, **kwargs: Any) -> Any:
+        reserved = self._admit(messages, kwargs.get("tools"))
+        response = type(self.model).invoke(self.model, messages, *args, **kwargs)
+        self.limiter.settle(reserved, used_tokens(response))
+        return response
+
+    async def ainvoke(self, messages: List[Any], *args: Any, **kwargs: Any) -> Any:
+        reserved = await self._admit_async(messages, kwargs.get("tools"))
+        response = await type(self.model).ainvoke(self.model, messages, *args, **kwargs)
+        self.limiter.settle(reserved, used_tokens(response))
+        return response
+
+    def invoke_stream(self, messages: List[Any], *args: Any, **kwargs: Any) -> Iterator[Any]:
+        reserved = self._admit(messages, kwargs.get("tools"))
+        used = None
+        for chunk in type(self.model).invoke_stream(self.model, messages, *args, **kwargs):
+            used = used_tokens(chunk) or used
+            yield chunk
+        self.limiter.settle(reserved, used)
+
+    async def ainvoke_stream(self, messages: List[Any], *args: Any, **kwargs: Any):
+        reserved = await self._admit_async(messages, kwargs.get("tools"))
+        used = None
+        async for chunk in type(self.model).ainvoke_stream(self.model, messages, *args, **kwargs):
+            used = used_tokens(chunk) or used
+            yield chunk
+        self.limiter.settle(reserved, used)
+
+    def _admit(self, messages: List[Any], tools: Optional[List[Any]]) -> int:
+        reserved = estimate_call_tokens(self.model, messages, tools)
+        with start_span("rate_limit.wait", priority=PRIORITY_NAMES.get(self.priority), tokens=reserved) as span:
+            waited = self.limiter.acquire(reserved, self.priority)
+            span.set_attribute("wait_ms", round(waited * 1000, 3))
+        return reserved
+
+    async def _admit_async(self, messages: List[Any], tools: Optional[List[Any]]) -> int:
+        reserved = estimate_call_tokens(self.model, messages, tools)
+        with start_span("rate_limit.wait", priority=PRIORITY_NAMES.get(self.priority), tokens=reserved) as span:
+            waited = await self.limiter.acquire_async(reserved, self.priority)
+            span.set_attribute("wait_ms", round(waited * 1000, 3))
+        return reserved
+
+def limit_model(model: "Model", limiter: RateLimiter, priority: int = PRIORITY_INTERACTIVE) -> RateLimitGate:
+    """
+    Admit a model's calls through ``limiter``. Install it before hedging, so
+    duplicate hedge requests are admitted too.
+    """
+    gate = RateLimitGate(model, limiter, priority)
+    model.invoke = gate.invoke
+    model.ainvoke = gate.ainvoke
+    model.invoke_stream = gate.invoke_stream
+    model.ainvoke_stream = gate.ainvoke_stream
+    return gate
+
+def get_gate(model: "Model") -> Optional[RateLimitGate]:
+    """The gate installed on ``model``, if any."""
+    # Hedging replaces invoke and ainvoke on top of the gate, but not the streaming methods
+    gate = getattr(model.__dict__.get("invoke_stream"), "__self__", None)
+    return gate if isinstance(gate, RateLimitGate) else None
+
+def limit_memory_in_background(memory: Any) -> None:
+    """
+    Admit the calls of an agno Memory's memory manager and session
+    summarizer at background priority. Each holds its own copy of the model,
+    so the agent's calls keep their priority.
+    """
+    for manager in (memory.memory_manager, memory.summary_manager):
+        gate = get_gate(manager.model) if manager is not None and manager.model is not None else None
+        if gate is not None:
+            gate.priority = PRIORITY_BACKGROUND
+
+@lru_cache(maxsize=None)
+def shared_rate_limiter() -> Optional[RateLimiter]:
+    """The process-wide limiter configured by AGNO_RATE_LIMIT_*, or None."""
+    return RateLimiter.from_env()
@@ -0,0 +1,72 @@
+"""
+Tests for the shared rate limiter: admission order by priority, and which
+model copies run at background priority.
+
+    python -m pytest shared/rate_limit_test.py -q
+"""
+
+import copy
+import threading
+import time
+
+from shared.hedging import enable_hedging
+from shared.rate_limit import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    RateLimiter,
+    get_gate,
+    limit_memory_in_background,
+    limit_model,
+)
+from shared.stub_model import StubModel
+
+def test_waiting_calls_are_admitted_by_priority():
+    # 10 tokens a second; the first call drains the bucket
+    limiter = RateLimiter(tokens_per_minute=600)
+    limiter.acquire(600)
+    admitted = []
+
+    def acquire(priority):
+        limiter.acquire(5, priority)
+        admitted.append(priority)
+
+    background = threading.Thread(target=acquire, args=(PRIORITY_BACKGROUND,))
+    background.start()
+    time.sleep(0.05)
+    interactive = threading.Thread(target=acquire, args=(PRIORITY_INTERACTIVE,))
+    interactive.start()
+    background.join()
+    interactive.join()
+    # The interactive call arrived later but went first
+    assert admitted == [PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND]
+    assert limiter.stats()["priorities"]["background"]["queued"] == 1
+
+def test_copies_keep_the_priority_of_the_original():
+    limiter = RateLimiter(requests_per_minute=1000)
+    model = StubModel.from_env("gpt-4o")
+    limit_model(model, limiter)
+    copied = get_gate(copy.deepcopy(model))
+    # e.g. a Team's reasoning model: still interactive, on the same limiter
+    assert copied.priority == PRIORITY_INTERACTIVE
+    assert copied.limiter is limiter
+
+def test_memory_models_run_in_background():
+    from agno.memory.v2.memory import Memory
+
+    limiter = RateLimiter(requests_per_minute=1000)
+    model = StubModel.from_env("gpt-4o")
+    limit_model(model, limiter)
+    enable_hedging(model)
+    memory = Memory(model=model)
+    limit_memory_in_background(memory)
+
+    assert get_gate(model).priority == PRIORITY_INTERACTIVE
+    assert get_gate(memory.memory_manager.model).priority == PRIORITY_BACKGROUND
+    assert get_gate(memory.summary_manager.model).priority == PRIORITY_BACKGROUND
+
+def test_memory_without_a_limiter_is_left_alone():
+    from agno.memory.v2.memory import Memory
+
+    memory = Memory(model=StubModel.from_env("gpt-4o"))
+    limit_memory_in_background(memory)
+    assert get_gate(memory.memory_manager.model) is None
@@ -0,0 +1,90 @@
+"""
+Retrying transient model errors with jittered exponential backoff.
+
+Rate limits, timeouts, dropped connections and 5xx responses usually succeed
+when tried again a moment later; a malformed request or an authentication
+error never does. ``call_with_retry`` retries only the first kind, waiting
+``random(0, min(max_delay, base_delay * 2**attempt))`` between attempts ("full
+jitter"), so many workflows hitting the same rate limit do not retry in step.
+
+    policy = RetryPolicy(max_attempts=4, base_delay_s=0.5)
+    response = call_with_retry(lambda: agent.run(prompt), policy)
+
+agno's own ``Agent(retries=...)`` retries every provider error without jitter,
+so the examples leave it at 0 and use this instead.
+"""
+
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+TRANSIENT_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+# Exception class names from provider SDKs that mean "try again later"
+_TRANSIENT_ERROR_NAMES = frozenset({
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+    "ServiceUnavailableError", "ModelRateLimitError",
+})
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how long to retry a transient failure."""
+    max_attempts: int = 3
+    base_delay_s: float = 0.5
+    max_delay_s: float = 8.0
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """Build a policy from AGNO_RETRY_MAX_ATTEMPTS, AGNO_RETRY_BASE_DELAY_S and AGNO_RETRY_MAX_DELAY_S."""
+        return cls(
+            max_attempts=int(os.getenv("AGNO_RETRY_MAX_ATTEMPTS", cls.max_attempts)),
+            base_delay_s=float(os.getenv("AGNO_RETRY_BASE_DELAY_S", cls.base_delay_s)),
+            max_delay_s=float(os.getenv("AGNO_RETRY_MAX_DELAY_S", cls.max_delay_s)),
+        )
+
+    def delay(self, attempt: int, rng: Optional[random.Random] = None) -> float:
+        """Seconds to wait after failed attempt number ``attempt`` (0-based)."""
+        ceiling = min(self.max_delay_s, self.base_delay_s * (2 ** attempt))
+        return (rng or random).uniform(0, ceiling)
+
+def is_transient(error: BaseException) -> bool:
+    """Whether ``error`` is likely to go away if the call is retried."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in _TRANSIENT_ERROR_NAMES:
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status in TRANSIENT_STATUS_CODES
+
+def call_with_retry(call: Callable[[], T], policy: RetryPolicy,
+                    on_retry: Optional[Callable[[int, BaseException, float], None]] = None) -> T:
+    """
+    Call ``call``, retrying transient errors according to ``policy``.
+
+    Args:
+        call: The operation to run.
+        policy: Attempts and backoff.
+        on_retry: Called as on_retry(attempt, error, delay_s) before each
+            wait, e.g. to log or count retries.
+
+    Non-transient errors, and the last transient one, are raised unchanged.
+    """
+    attempt = 0
+    while True:
+        try:
+            return call()
+        except Exception as e:
+            if attempt + 1 >= policy.max_attempts or not is_transient(e):
+                raise
+            delay = policy.delay(attempt)
+            if on_retry is not None:
+                on_retry(attempt + 1, e, delay)
+            time.sleep(delay)
+            attempt += 1
@@ -0,0 +1,83 @@
+"""
+Tests for retrying transient model errors: which errors count as transient,
+and how call_with_retry retries them.
+
+    python -m pytest shared/retry_test.py -q
+"""
+
+import random
+
+import pytest
+
+from shared.retry import RetryPolicy, call_with_retry, is_transient
+
+class RateLimitError(Exception):
+    """Named like the provider SDK's error."""
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+class ResponseError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = Response(status_code)
+
+NO_WAIT = RetryPolicy(max_attempts=3, base_delay_s=0, max_delay_s=0)
+
+@pytest.mark.parametrize("error", [
+    TimeoutError(), ConnectionResetError(), RateLimitError(),
+    StatusError(429), StatusError(503), ResponseError(500), ResponseError(408),
+])
+def test_transient_errors(error):
+    assert is_transient(error)
+
+@pytest.mark.parametrize("error", [
+    ValueError("bad request"), StatusError(400), StatusError(401), ResponseError(404), KeyError("x"),
+])
+def test_permanent_errors(error):
+    assert not is_transient(error)
+
+def _failing(*errors, result="ok"):
+    """A call raising ``errors`` in turn, then returning ``result``; counts its calls."""
+    remaining = list(errors)
+
+    def call():
+        call.count += 1
+        if remaining:
+            raise remaining.pop(0)
+        return result
+    call.count = 0
+    return call
+
+def test_transient_errors_are_retried_until_success():
+    call = _failing(StatusError(429), TimeoutError())
+    retries = []
+    assert call_with_retry(call, NO_WAIT, on_retry=lambda attempt, e, delay: retries.append(attempt)) == "ok"
+    assert call.count == 3
+    assert retries == [1, 2]
+
+def test_permanent_error_is_raised_at_once():
+    call = _failing(StatusError(400))
+    with pytest.raises(StatusError):
+        call_with_retry(call, NO_WAIT)
+    assert call.count == 1
+
+def test_last_transient_error_is_raised_after_max_attempts():
+    call = _failing(*[StatusError(503)] * 5)
+    with pytest.raises(StatusError, match="503"):
+        call_with_retry(call, NO_WAIT)
+    assert call.count == NO_WAIT.max_attempts
+
+def test_delay_is_full_jitter_below_the_capped_exponential():
+    policy = RetryPolicy(base_delay_s=0.5, max_delay_s=3.0)
+    rng = random.Random(1)
+    for attempt, ceiling in ((0, 0.5), (1, 1.0), (2, 2.0), (3, 3.0), (10, 3.0)):
+        delays = [policy.delay(attempt, rng) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert max(delays) > ceiling * 0.8
@@ -0,0 +1,59 @@
+"""
+Start-up helpers that keep the example entry points fast.
+
+Importing an example module only costs the standard library. agno, the model
+provider and python-dotenv are loaded when an agent is first created, and the
+interactive scripts can build their agent in the background while the user
+reads the banner and types a first command.
+"""
+
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Set, TypeVar
+
+T = TypeVar("T")
+
+_loaded_dirs: Set[Path] = set()
+_env_lock = threading.Lock()
+
+def load_environment(module_file: str):
+    """
+    Load the nearest .env at or above ``module_file``'s folder, once per folder,
+    and enable tracing if AGNO_TRACE_FILE is configured.
+
+    Existing environment variables are never overridden, matching load_dotenv().
+    """
+    directory = Path(module_file).resolve().parent
+    with _env_lock:
+        if directory in _loaded_dirs:
+            return
+        _loaded_dirs.add(directory)
+
+        for candidate in (directory, *directory.parents):
+            env_file = candidate / ".env"
+            if env_file.is_file():
+                from dotenv import load_dotenv
+                load_dotenv(env_file)
+                break
+
+    from shared.tracing import configure_tracing
+    configure_tracing()
+
+def load_in_background(factory: Callable[[], T]) -> "Future[T]":
+    """
+    Run ``factory`` on a daemon thread and return a Future for its result.
+
+    Daemon threads do not hold up interpreter exit, so quitting before the
+    value is ready is instant.
+    """
+    future: "Future[T]" = Future()
+
+    def run():
+        try:
+            future.set_result(factory())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="background-loader", daemon=True).start()
+    return future
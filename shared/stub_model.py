@@ -0,0 +1,318 @@
+"""
+Deterministic offline model and embedder used when AGNO_MODEL_BACKEND=stub.
+
+See shared/models.py for how it is selected and configured.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+from agno.embedder.base import Embedder
+from agno.exceptions import ModelProviderError
+from agno.models.base import Model
+from agno.models.message import Message
+from agno.models.response import ModelResponse
+from pydantic import BaseModel
+
+from shared.models import estimate_tokens
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+# Simulated provider-side prompt caching, modelled on OpenAI's: prompts of at
+# least 1024 tokens are cached, and hits are counted in 128-token blocks of the
+# longest previously seen prefix (tool schemas first, then the messages)
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_BLOCK_TOKENS = 128
+PREFIX_CACHE_MAX_BLOCKS = 65536
+
+_prefix_cache: "OrderedDict[str, None]" = OrderedDict()
+_prefix_cache_lock = threading.Lock()
+
+_FILLER_WORDS = (
+    "workflow", "agent", "stage", "plan", "review", "data", "result", "team",
+    "memory", "context", "approval", "summary", "quality", "process", "report",
+)
+
+@dataclass
+class StubModel(Model):
+    """
+    A deterministic, offline stand-in for a chat model.
+
+    Answers are derived from a hash of the conversation, so the same prompt
+    always produces the same text and token counts. Latency is sampled from a
+    seeded distribution, and an optional tool-call script makes the model call
+    the agent's tools before answering.
+    """
+    id: str = "stub-gpt-4o"
+    name: str = "StubModel"
+    provider: str = "Stub"
+
+    # Structured output requests are answered with JSON that matches the schema
+    supports_json_schema_outputs: bool = True
+
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    latency_distribution: str = "fixed"
+    output_tokens: int = 64
+    seed: int = 0
+    # Each step is a list of tool calls ({"name": ..., "arguments": {...}}) made
+    # in one model turn; step N is issued after N rounds of tool results
+    tool_call_script: List[List[Dict[str, Any]]] = field(default_factory=list)
+    # Report cached input tokens the way a provider with prompt caching would
+    prefix_cache: bool = True
+    # Share of calls that fail with a transient 503, to exercise retry handling
+    error_rate: float = 0.0
+
+    def __post_init__(self):
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution '{self.latency_distribution}', expected one of {LATENCY_DISTRIBUTIONS}"
+            )
+        self._rng = random.Random(self.seed)
+        self._error_rng = random.Random(self.seed + 1)
+
+    @classmethod
+    def from_env(cls, model_id: str = "gpt-4o") -> "StubModel":
+        """Build a stub configured from the AGNO_STUB_* environment variables."""
+        script = json.loads(os.getenv("AGNO_STUB_TOOL_SCRIPT", "[]"))
+        return cls(
+            id=f"stub-{model_id}",
+            latency_ms=float(os.getenv("AGNO_STUB_LATENCY_MS", "0")),
+            latency_jitter_ms=float(os.getenv("AGNO_STUB_LATENCY_JITTER_MS", "0")),
+            latency_distribution=os.getenv("AGNO_STUB_LATENCY_DISTRIBUTION", "fixed"),
+            output_tokens=int(os.getenv("AGNO_STUB_OUTPUT_TOKENS", "64")),
+            seed=int(os.getenv("AGNO_STUB_SEED", "0")),
+            tool_call_script=[step if isinstance(step, list) else [step] for step in script],
+            prefix_cache=os.getenv("AGNO_STUB_PREFIX_CACHE", "1") != "0",
+            error_rate=float(os.getenv("AGNO_STUB_ERROR_RATE", "0")),
+        )
+
+    def sample_latency(self) -> float:
+        """Draw one simulated response latency, in seconds."""
+        mean, spread = self.latency_ms, self.latency_jitter_ms
+        if self.latency_distribution == "uniform":
+            value = self._rng.uniform(mean - spread, mean + spread)
+        elif self.latency_distribution == "normal":
+            value = self._rng.gauss(mean, spread)
+        elif self.latency_distribution == "lognormal" and mean > 0:
+            # Parameterised so the distribution's mean and std match the settings
+            sigma = math.sqrt(math.log(1 + (spread / mean) ** 2))
+            value = self._rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+        else:
+            value = mean
+        return max(0.0, value) / 1000
+
+    def _generate(self, messages: List[Message], response_format: Optional[Any] = None,
+                  tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Build the raw response dictionary for one model turn."""
+        if self.error_rate and self._error_rng.random() < self.error_rate:
+            raise ModelProviderError("Service temporarily unavailable (simulated)", status_code=503,
+                                     model_name=self.name, model_id=self.id)
+        prompt = "\n".join(str(m.content) for m in messages if m.content is not None)
+        tool_text = json.dumps(tools, sort_keys=True, default=str) if tools else ""
+        input_tokens = estimate_tokens(prompt) + estimate_tokens(tool_text)
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        usage = {"input_tokens": input_tokens}
+        if self.prefix_cache:
+            usage["cached_tokens"] = self._cached_prefix_tokens(messages, tool_text, input_tokens)
+
+        # Count tool rounds since the latest user message to find the script step
+        tool_rounds = 0
+        for message in reversed(messages):
+            if message.role == "user":
+                break
+            if message.role == "assistant" and message.tool_calls:
+                tool_rounds += 1
+
+        available = {t.get("function", {}).get("name") for t in tools or []}
+        if tool_rounds < len(self.tool_call_script):
+            calls = [c for c in self.tool_call_script[tool_rounds] if c.get("name") in available]
+            if calls:
+                tool_calls = [
+                    {
+                        "id": f"call_{digest[:8]}_{tool_rounds}_{i}",
+                        "type": "function",
+                        "function": {"name": c["name"], "arguments": json.dumps(c.get("arguments", {}))},
+                    }
+                    for i, c in enumerate(calls)
+                ]
+                return {
+                    "content": None,
+                    "tool_calls": tool_calls,
+                    "usage": {**usage, "output_tokens": 8 * len(calls)},
+                }
+
+        user_messages = [m for m in messages if m.role == "user"]
+        question = str(user_messages[-1].content).strip() if user_messages else ""
+        text = self._answer_text(digest, question)
+
+        parsed = None
+        schema = _response_schema(response_format)
+        if schema is not None:
+            value = _value_for_schema(schema, schema.get("$defs", {}), text)
+            content = json.dumps(value)
+            if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+                parsed = response_format.model_validate(value)
+        else:
+            content = text
+
+        return {
+            "content": content,
+            "parsed": parsed,
+            "tool_calls": [],
+            "usage": {**usage, "output_tokens": estimate_tokens(content)},
+        }
+
+    def _cached_prefix_tokens(self, messages: List[Message], tool_text: str, input_tokens: int) -> int:
+        """Tokens of this request's prefix that an earlier request already sent."""
+        if input_tokens < PREFIX_CACHE_MIN_TOKENS:
+            return 0
+        request = tool_text + "".join(f"\n{m.role}: {m.content}" for m in messages if m.content is not None)
+        block_chars = PREFIX_CACHE_BLOCK_TOKENS * 4
+        # Chain the block hashes so a block only matches after an identical prefix
+        chain = hashlib.sha256(self.id.encode("utf-8"))
+        keys = []
+        for start in range(0, len(request) - block_chars + 1, block_chars):
+            chain.update(request[start:start + block_chars].encode("utf-8"))
+            keys.append(chain.hexdigest())
+
+        with _prefix_cache_lock:
+            hits = 0
+            for key in keys:
+                if key not in _prefix_cache:
+                    break
+                hits += 1
+            for key in keys:
+                _prefix_cache[key] = None
+                _prefix_cache.move_to_end(key)
+            while len(_prefix_cache) > PREFIX_CACHE_MAX_BLOCKS:
+                _prefix_cache.popitem(last=False)
+
+        cached = min(hits * PREFIX_CACHE_BLOCK_TOKENS, input_tokens)
+        return cached if cached >= PREFIX_CACHE_MIN_TOKENS else 0
+
+    def _answer_text(self, digest: str, question: str) -> str:
+        """Deterministic answer text of roughly ``output_tokens`` tokens."""
+        words = [f"[{self.id} {digest[:8]}]"]
+        if question:
+            words.append(f"Re: {question.splitlines()[0][:80]}.")
+        seed = int(digest[:8], 16)
+        while sum(len(w) + 1 for w in words) < self.output_tokens * 4:
+            words.append(_FILLER_WORDS[seed % len(_FILLER_WORDS)])
+            seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+        return " ".join(words)
+
+    def invoke(self, messages: List[Message], response_format: Optional[Any] = None,
+               tools: Optional[List[Dict[str, Any]]] = None, tool_choice: Optional[Any] = None) -> Dict[str, Any]:
+        time.sleep(self.sample_latency())
+        return self._generate(messages, response_format, tools)
+
+    async def ainvoke(self, messages: List[Message], response_format: Optional[Any] = None,
+                      tools: Optional[List[Dict[str, Any]]] = None, tool_choice: Optional[Any] = None) -> Dict[str, Any]:
+        await asyncio.sleep(self.sample_latency())
+        return self._generate(messages, response_format, tools)
+
+    def invoke_stream(self, messages: List[Message], response_format: Optional[Any] = None,
+                      tools: Optional[List[Dict[str, Any]]] = None,
+                      tool_choice: Optional[Any] = None) -> Iterator[Dict[str, Any]]:
+        time.sleep(self.sample_latency())
+        yield from _stream_chunks(self._generate(messages, response_format, tools))
+
+    async def ainvoke_stream(self, messages: List[Message], response_format: Optional[Any] = None,
+                             tools: Optional[List[Dict[str, Any]]] = None,
+                             tool_choice: Optional[Any] = None) -> AsyncIterator[Dict[str, Any]]:
+        await asyncio.sleep(self.sample_latency())
+        for chunk in _stream_chunks(self._generate(messages, response_format, tools)):
+            yield chunk
+
+    def parse_provider_response(self, response: Dict[str, Any], **kwargs) -> ModelResponse:
+        model_response = ModelResponse(role="assistant")
+        model_response.content = response.get("content")
+        model_response.parsed = response.get("parsed")
+        model_response.tool_calls = response.get("tool_calls") or []
+        model_response.response_usage = response.get("usage")
+        return model_response
+
+    def parse_provider_response_delta(self, response: Dict[str, Any]) -> ModelResponse:
+        return self.parse_provider_response(response)
+
+def _stream_chunks(response: Dict[str, Any], words_per_chunk: int = 8) -> Iterator[Dict[str, Any]]:
+    """Split a generated response into streaming deltas; usage comes last."""
+    if response.get("tool_calls"):
+        yield {"tool_calls": response["tool_calls"]}
+    content = response.get("content") or ""
+    words = content.split(" ")
+    for start in range(0, len(words), words_per_chunk):
+        text = " ".join(words[start:start + words_per_chunk])
+        yield {"content": text if start == 0 else " " + text}
+    yield {"usage": response.get("usage")}
+
+def _response_schema(response_format: Optional[Union[Dict[str, Any], Type[BaseModel]]]) -> Optional[Dict[str, Any]]:
+    """Extract a JSON schema from an agno response_format, if it has one."""
+    if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+        return response_format.model_json_schema()
+    if isinstance(response_format, dict):
+        if response_format.get("type") == "json_schema":
+            return response_format.get("json_schema", {}).get("schema", {})
+        if response_format.get("type") == "json_object":
+            return {"type": "object", "properties": {}}
+    return None
+
+def _value_for_schema(schema: Dict[str, Any], defs: Dict[str, Any], text: str) -> Any:
+    """Produce a minimal value that satisfies a (pydantic-generated) JSON schema."""
+    if "$ref" in schema:
+        return _value_for_schema(defs.get(schema["$ref"].split("/")[-1], {}), defs, text)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return _value_for_schema(options[0], defs, text)
+    if "default" in schema and schema["default"] is not None:
+        return schema["default"]
+    if "enum" in schema:
+        return schema["enum"][0]
+
+    schema_type = schema.get("type", "object")
+    if schema_type == "object":
+        return {name: _value_for_schema(prop, defs, text) for name, prop in schema.get("properties", {}).items()}
+    if schema_type == "array":
+        return []
+    if schema_type == "string":
+        return text
+    if schema_type in ("integer", "number"):
+        return 0
+    if schema_type == "boolean":
+        return False
+    return None
+
+@dataclass
+class StubEmbedder(Embedder):
+    """
+    A deterministic, offline stand-in for an embedding model.
+
+    Words and word pairs are hashed into a fixed number of signed buckets
+    (feature hashing), so texts that share vocabulary get similar vectors.
+    """
+    id: str = "stub-embedding"
+    dimensions: int = 256
+
+    def get_embedding(self, text: str) -> List[float]:
+        words = [w for w in "".join(c if c.isalnum() else " " for c in text.lower()).split() if len(w) > 1]
+        vector = [0.0] * self.dimensions
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), {"prompt_tokens": estimate_tokens(text), "total_tokens": estimate_tokens(text)}
@@ -0,0 +1,358 @@
+"""
+Tracing
+=======
+
+A small OpenTelemetry-style tracing layer for the examples. Spans nest through
+``contextvars``, so a trace follows one request from the workflow down to
+individual model calls:
+
+    workflow.run -> workflow.stage -> agent.run / team.run -> model.call
+                                                           -> tool.call
+                                                           -> memory.db.*
+
+Tracing is off unless ``AGNO_TRACE_FILE`` is set (or ``configure_tracing`` is
+called with a path). Finished spans are appended to that file as JSON lines
+using OTLP-like field names, so no collector is needed:
+
+    AGNO_TRACE_FILE=traces.jsonl python workflows.py
+    python -m shared.tracing traces.jsonl     # slowest span names by self time
+
+When tracing is enabled, agno's Agent, Team, model, tool and memory DB classes
+are wrapped once so their work shows up as child spans. agno updates memories
+on a thread pool of its own, so while it does the run's span is handed to the
+memory calls it submits. When tracing is disabled nothing is patched and ``start_span``
+yields a shared no-op span.
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Buffered spans are written at most this often, or once this many have accumulated
+EXPORT_INTERVAL_S = 1.0
+EXPORT_BATCH_SPANS = 512
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("agno_current_span", default=None)
+
+class Span:
+    """One timed operation in a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns", "attributes", "status",
+                 "error")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = "OK"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException):
+        self.status = "ERROR"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.error},
+        }
+
+class _NoOpSpan:
+    """Stand-in yielded when tracing is disabled; every method does nothing."""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+_NOOP_SPAN = _NoOpSpan()
+
+class FileSpanExporter:
+    """Appends finished spans to a JSON-lines file in batches."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._flushed_at = time.monotonic()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if (len(self._buffer) >= EXPORT_BATCH_SPANS
+                    or time.monotonic() - self._flushed_at >= EXPORT_INTERVAL_S):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._flushed_at = time.monotonic()
+        if not self._buffer:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(self._buffer) + "\n")
+        self._buffer = []
+
+_exporter: Optional[FileSpanExporter] = None
+
+def tracing_enabled() -> bool:
+    return _exporter is not None
+
+def configure_tracing(path: Optional[str] = None) -> bool:
+    """
+    Enable tracing to ``path`` (default: the AGNO_TRACE_FILE environment variable).
+
+    Safe to call more than once; the first path wins.
+
+    Returns:
+        True if tracing is enabled.
+    """
+    global _exporter
+    if _exporter is not None:
+        return True
+    path = path or os.getenv("AGNO_TRACE_FILE")
+    if not path:
+        return False
+    _exporter = FileSpanExporter(path)
+    atexit.register(_exporter.flush)
+    _instrument_agno()
+    return True
+
+@contextmanager
+def start_span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Time the enclosed block as a child of the current span."""
+    if _exporter is None:
+        yield _NOOP_SPAN
+        return
+
+    span = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_ns = time.time_ns()
+        _exporter.export(span)
+
+def _run_totals(metrics: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum agno's per-model-call run metrics into span attributes."""
+    if not metrics:
+        return {}
+    return {
+        f"llm.{key}": sum(metrics.get(key, []))
+        for key in ("input_tokens", "output_tokens", "total_tokens", "cached_tokens")
+        if metrics.get(key)
+    }
+
+class _SpanPassingMemory:
+    """
+    Stands in for an agent's or team's memory while agno updates it on a
+    thread pool, running the submitted memory calls under the span of the run
+    that submitted them.
+    """
+
+    _POOLED_METHODS = ("create_user_memories", "create_session_summary")
+
+    def __init__(self, memory: Any, span: Span):
+        self._memory = memory
+        self._span = span
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._memory, name)
+        if name not in self._POOLED_METHODS:
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            token = _current_span.set(self._span)
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                _current_span.reset(token)
+        return call
+
+def _instrument_agno():
+    """Wrap agno's run, model, tool and memory DB entry points with spans (once)."""
+    from agno.agent import Agent
+    from agno.models.base import Model
+    from agno.team import Team
+    from agno.tools.function import FunctionCall
+
+    from agno.agent import Agent
+    from agno.models.base import Model
+    from agno.team import Team
+    from agno.tools.function import FunctionCall
+
+    def wrap_run(cls, span_name):
+        original = cls.run
+
+        @functools.wraps(original)
+        def run(self, *args, **kwargs):
+            # Streaming runs return lazily consumed iterators; only time blocking runs
+            if kwargs.get("stream"):
+                return original(self, *args, **kwargs)
+            with start_span(span_name, **{f"{span_name.split('.')[0]}.name": self.name}) as span:
+                response = original(self, *args, **kwargs)
+                span.set_attributes(_run_totals(getattr(response, "metrics", None)))
+                content = getattr(response, "content", None)
+                span.set_attribute("response.bytes", len(str(content).encode("utf-8")) if content else 0)
+                return response
+        cls.run = run
+
+    wrap_run(Agent, "agent.run")
+    wrap_run(Team, "team.run")
+
+    def wrap_memory_updates(cls):
+        original = cls._make_memories_and_summaries
+
+        @functools.wraps(original)
+        def make_memories_and_summaries(self, *args, **kwargs):
+            span, memory = _current_span.get(), self.memory
+            if span is None or memory is None:
+                yield from original(self, *args, **kwargs)
+                return
+            # The pool's threads start with an empty context, so pass the span explicitly
+            self.memory = _SpanPassingMemory(memory, span)
+            try:
+                yield from original(self, *args, **kwargs)
+            finally:
+                self.memory = memory
+        cls._make_memories_and_summaries = make_memories_and_summaries
+
+    wrap_memory_updates(Agent)
+    wrap_memory_updates(Team)
+
+    process_model_response = Model._process_model_response
+
+    @functools.wraps(process_model_response)
+    def traced_model_response(self, messages, assistant_message, *args, **kwargs):
+        with start_span("model.call", **{"llm.model": self.id, "llm.provider": self.provider}) as span:
+            span.set_attribute("request.bytes", sum(len(str(m.content).encode("utf-8")) for m in messages
+                                                    if m.content is not None))
+            result = process_model_response(self, messages, assistant_message, *args, **kwargs)
+            metrics = assistant_message.metrics
+            span.set_attributes({
+                "llm.input_tokens": metrics.input_tokens,
+                "llm.output_tokens": metrics.output_tokens,
+                "llm.cached_tokens": metrics.cached_tokens,
+                "llm.uncached_input_tokens": metrics.input_tokens - metrics.cached_tokens,
+                "llm.tool_calls": len(assistant_message.tool_calls or []),
+                "response.bytes": len(assistant_message.get_content_string().encode("utf-8")),
+            })
+            return result
+    Model._process_model_response = traced_model_response
+
+    execute = FunctionCall.execute
+
+    @functools.wraps(execute)
+    def traced_execute(self):
+        with start_span("tool.call", **{"tool.name": self.function.name}) as span:
+            span.set_attribute("tool.arguments.bytes", len(json.dumps(self.arguments or {}, default=str)))
+            result = execute(self)
+            span.set_attributes({
+                "tool.status": result.status,
+                "tool.result.bytes": len(str(result.result).encode("utf-8")) if result.result is not None else 0,
+            })
+            if result.status != "success":
+                span.status, span.error = "ERROR", result.error
+            return result
+    FunctionCall.execute = traced_execute
+
+    try:
+        from agno.memory.v2.db.sqlite import SqliteMemoryDb
+    except ImportError:
+        return
+
+    def wrap_memory_op(method_name, operation, measure):
+        original = getattr(SqliteMemoryDb, method_name)
+
+        @functools.wraps(original)
+        def traced(self, *args, **kwargs):
+            with start_span(f"memory.db.{operation}", **{"db.system": "sqlite", "db.table": self.table_name}) as span:
+                result = original(self, *args, **kwargs)
+                span.set_attributes(measure(args, kwargs, result))
+                return result
+        setattr(SqliteMemoryDb, method_name, traced)
+
+    def memory_bytes(rows):
+        return sum(len(json.dumps(row.memory, default=str)) for row in rows)
+
+    wrap_memory_op("read_memories", "read",
+                   lambda args, kwargs, rows: {"db.rows": len(rows), "db.bytes": memory_bytes(rows)})
+    wrap_memory_op("upsert_memory", "upsert",
+                   lambda args, kwargs, result: {"db.rows": 1,
+                                                 "db.bytes": memory_bytes([args[0] if args else kwargs["memory"]])})
+    wrap_memory_op("delete_memory", "delete", lambda args, kwargs, result: {"db.rows": 1})
+
+def summarize(path: str, top: int = 15) -> List[Dict[str, Any]]:
+    """
+    Aggregate a trace file by span name.
+
+    Self time is a span's duration minus the time of its direct children, so
+    the top entries point at where time is actually spent.
+    """
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                spans.append(json.loads(line))
+
+    child_ms: Dict[str, float] = {}
+    for span in spans:
+        if span["parentSpanId"]:
+            child_ms[span["parentSpanId"]] = child_ms.get(span["parentSpanId"], 0.0) + span["durationMs"]
+
+    by_name: Dict[str, Dict[str, Any]] = {}
+    for span in spans:
+        entry = by_name.setdefault(span["name"], {"name": span["name"], "count": 0, "total_ms": 0.0,
+                                                  "self_ms": 0.0, "max_ms": 0.0, "errors": 0})
+        entry["count"] += 1
+        entry["total_ms"] += span["durationMs"]
+        entry["self_ms"] += max(0.0, span["durationMs"] - child_ms.get(span["spanId"], 0.0))
+        entry["max_ms"] = max(entry["max_ms"], span["durationMs"])
+        entry["errors"] += span["status"]["code"] == "ERROR"
+
+    return sorted(by_name.values(), key=lambda e: e["self_ms"], reverse=True)[:top]
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m shared.tracing <trace_file.jsonl>")
+        sys.exit(1)
+    print(f"{'span':<28} {'count':>6} {'total ms':>11} {'self ms':>11} {'max ms':>9} {'errors':>6}")
+    for entry in summarize(sys.argv[1]):
+        print(f"{entry['name']:<28} {entry['count']:>6} {entry['total_ms']:>11.1f} {entry['self_ms']:>11.1f} "
+              f"{entry['max_ms']:>9.1f} {entry['errors']:>6}")